@@ -1,9 +1,19 @@
-import pandas as pd
-import datetime
-import os
+import time
 import json
-import calendar
 import locale
+import argparse
+import multiprocessing
+
+import export_data
+import validation
+import metrics
+import rollups
+import phasing
+import scenarios
+import spa_cache
+import publish
+import budget_model
+import ingest
 
 # Essayer de mettre en français pour les noms de mois, sinon fallback anglais
 try:
@@ -14,291 +24,46 @@ except:
     except:
         pass
 
-def analyze():
+def analyze(export_formats=None, export_dir="exports", fiscal_start_month=1, force_publish=False,
+            phasing_profile=phasing.DEFAULT_PROFILE, store_dir=None, workers=1):
     print("Chargement des données globales...")
-    
-    # Structure de données finale : DATA[annee][mois] = { ... données ... }
-    GLOBAL_DATA = {}
-
-    # ---------------------------------------------------------
-    # 1. CHARGEMENT FERIES
-    # ---------------------------------------------------------
-    feries_dates = set()
-    warning_feries = ""
-    feries_path = r"\\SRV-APP01\kpi\Suivi_Budget\Feries.xlsx"
-    
-    try:
-        # Tentative directe de lecture (contourne les soucis potentiels de os.path.exists sur réseau)
-        df_feries = pd.read_excel(feries_path)
-        col_feries = df_feries.columns[0]
-        # On stocke en string YYYY-MM-DD pour faciliter la sérialisation/comparaison
-        feries_list = pd.to_datetime(df_feries[col_feries]).dt.date.tolist()
-        feries_dates = set(feries_list)
-        print(f"Jours fériés chargés: {len(feries_dates)}")
-
-    except Exception as e:
-        print(f"Erreur Feries ({feries_path}): {e}")
-        warning_feries = f"⚠️ Attention : Erreur lors de la lecture du fichier Feries : {e}"
-
-    # ---------------------------------------------------------
-    # 2. CHARGEMENT BUDGET
-    # ---------------------------------------------------------
-    # Nouveau chemin réseau
-    budget_path = r"\\SRV-APP01\kpi\Suivi_Budget\Budget.xlsx"
-    df_budget = pd.DataFrame()
-    warning_budget = ""
+    t_start = time.perf_counter()
 
-    try:
-        # Tentative directe de lecture
-        df_budget = pd.read_excel(budget_path, header=None, names=["MoisNum", "Annee", "MoisNom", "Budget"])
-        print(f"Lignes Budget chargées: {len(df_budget)}")
-    except Exception as e:
-        print(f"Erreur Budget ({budget_path}): {e}")
-        warning_budget = f"⚠️ Attention : Erreur lors de la lecture du fichier Budget : {e}"
-
-    # ---------------------------------------------------------
-    # 3. CHARGEMENT RESULTATS
-    # ---------------------------------------------------------
-    # Nouveau chemin et nom: resultats.xls
-    # Colonnes : A=Date, B=Ignore, C=Cmd (cacdej), D=Exp (caexpj), E=Prod (caprodj)
-    results_path = r"\\SRV-APP01\kpi\Suivi_Budget\resultat.xls"
-    df_res = pd.DataFrame()
-    warning_results = ""
+    # 1-3. CHARGEMENT ET CONTROLE DES SOURCES (Feries, Budget, Résultats ou historique + deltas)
+    sources = budget_model.load_sources(store_dir=store_dir)
 
-    try:
-        # On lit les 5 premières colonnes
-        # On suppose qu'il y a une ligne d'en-tête, donc header=0. Si pas d'en-tête, mettre header=None.
-        # Avec names=..., on renomme les colonnes lues.
-        df_res = pd.read_excel(results_path, header=0, usecols="A:E", names=["datj", "ignore", "cacdej", "caexpj", "caprodj"])
-        # On supprime la colonne inutile
-        df_res.drop(columns=["ignore"], inplace=True)
-        
-        # Conversion dates
-        df_res['datj'] = pd.to_datetime(df_res['datj'], errors='coerce')
-        # Nettoyage
-        df_res.dropna(subset=['datj'], inplace=True)
-        
-        print(f"Lignes Résultats chargées: {len(df_res)}")
-        if not df_res.empty:
-            print(f"Aperçu dates: du {df_res['datj'].min()} au {df_res['datj'].max()}")
-
-    except Exception as e:
-        print(f"Erreur Résultats ({results_path}): {e}")
-        warning_results = f"⚠️ Attention : Erreur lors de la lecture du fichier Résultats : {e}"
-
-    # Calcul date max (Mise à jour)
-    last_update_str = "Inconnue"
-    if not df_res.empty:
-        max_date = df_res['datj'].max()
-        last_update_str = max_date.strftime("%d/%m/%Y")
-    
-    # ---------------------------------------------------------
+    # 4. CONSTRUCTION DE L'ARBRE DE DONNEES (indicateurs, phasage, scénarios, agrégats, cubes)
+    model = budget_model.build_model(sources, fiscal_start_month, phasing_profile, workers=workers)
 
-    # ---------------------------------------------------------
-    # 4. CONSTRUCTION DE L'ARBRE DE DONNEES
-    # ---------------------------------------------------------
-    
-    # Identification de toutes les années/mois uniques présents dans Budget OU Résultats
-    # Set de tuples (annee, mois)
-    all_periods = set()
-    
-    # Périodes du Budget
-    if not df_budget.empty:
-        for _, row in df_budget.iterrows():
-            try:
-                y = int(row['Annee'])
-                m = int(row['MoisNum'])
-                all_periods.add((y, m))
-            except:
-                pass
-                
-    # Périodes des Résultats
-    if not df_res.empty:
-        # Créer colonnes temp
-        temp_years = df_res['datj'].dt.year
-        temp_months = df_res['datj'].dt.month
-        for y, m in zip(temp_years, temp_months):
-            all_periods.add((y, m))
-            
-    sorted_periods = sorted(list(all_periods))
-    print(f"Périodes identifiées (Année, Mois): {sorted_periods}")
-
-    for year, month in sorted_periods:
-        year_str = str(year)
-        month_str = str(month)
-        
-        if year_str not in GLOBAL_DATA:
-            GLOBAL_DATA[year_str] = {}
-            
-        # --- A. RECUPERATION BUDGET ---
-        budget_val = 0
-        if not df_budget.empty:
-            # Filtre
-            mask = (df_budget['Annee'] == year) & (df_budget['MoisNum'] == month)
-            b_row = df_budget[mask]
-            if not b_row.empty:
-                budget_val = float(b_row.iloc[0]['Budget'])
-        
-        # --- B. TRAITEMENT RESULTATS QUOTIDIENS ---
-        # Filtrer resultats pour ce mois/année
-        start_date = pd.Timestamp(year, month, 1)
-        # Dernier jour du mois
-        last_day = calendar.monthrange(year, month)[1]
-        end_date = pd.Timestamp(year, month, last_day)
-        
-        # Création de l'index complet des jours du mois
-        full_date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-        
-        # Filtrer DF
-        monthly_res = pd.DataFrame()
-        if not df_res.empty:
-            mask_res = (df_res['datj'] >= start_date) & (df_res['datj'] <= end_date)
-            monthly_res = df_res.loc[mask_res].copy()
-        
-        # Aggrégation par jour (au cas où doublons) et reindexation
-        if not monthly_res.empty:
-            daily_sums = monthly_res.groupby('datj')[['cacdej', 'caexpj', 'caprodj']].sum()
-        else:
-            daily_sums = pd.DataFrame(columns=['cacdej', 'caexpj', 'caprodj'])
-            
-        # Reindex pour avoir tous les jours (même sans prod) avec 0
-        df_final = pd.DataFrame(index=full_date_range)
-        df_final = df_final.join(daily_sums).fillna(0)
-        
-        # Calcul Cumul
-        df_final['cumul_ca'] = df_final['cacdej'].cumsum()
-        df_final['cumul_exp'] = df_final['caexpj'].cumsum()
-        df_final['cumul_prod'] = df_final['caprodj'].cumsum()
-        
-        # Totaux Mensuels
-        total_ca = float(df_final['cacdej'].sum())
-        total_exp = float(df_final['caexpj'].sum())
-        total_prod = float(df_final['caprodj'].sum())
-        
-        # --- C. JOURS OUVRES ET BUDGET CUMULÉ ---
-        jours_ouvres = 0
-        curr = start_date
-        while curr <= end_date:
-            # Samedi=5, Dimanche=6
-            if curr.weekday() < 5 and curr.date() not in feries_dates:
-                jours_ouvres += 1
-            curr += datetime.timedelta(days=1)
-            
-        # Calcul du budget quotidien cible
-        daily_budget_target = 0
-        if jours_ouvres > 0:
-            daily_budget_target = budget_val / jours_ouvres
-            
-        # Construction de la courbe de budget cumulé
-        dataset_budget_cumul = []
-        cumul_b = 0.0
-        
-        for d in df_final.index:
-            # On vérifie si c'est un jour ouvré pour ajouter le budget
-            is_working = d.weekday() < 5 and d.date() not in feries_dates
-            if is_working:
-                cumul_b += daily_budget_target
-            dataset_budget_cumul.append(cumul_b)
-
-        # --- D. PREPARATION JSON LEGER ---
-        # On ne stocke que les listes pour les charts et les scalaires
-        days_labels = [d.strftime('%d/%m') for d in df_final.index]
-        dataset_ca = df_final['cumul_ca'].tolist()
-        dataset_exp = df_final['cumul_exp'].tolist()
-        dataset_prod = df_final['cumul_prod'].tolist()
-        
-        GLOBAL_DATA[year_str][month_str] = {
-            "budget": budget_val,
-            "realise": total_exp,      # SWAP: CA Réalisé = Expéditions
-            "commandes": total_ca,     # SWAP: Prise de Commande = Commandes (ex-CA)
-            "produit": total_prod,
-            "jours_ouvres": jours_ouvres,
-            "chart_labels": days_labels,
-            "chart_ca": dataset_exp,   # SWAP: Chart principal = Expéditions
-            "chart_cmd": dataset_ca,   # SWAP: Chart secondaire = Commandes
-            "chart_prod": dataset_prod,
-            "chart_budget_trend": dataset_budget_cumul
-        }
-
-    # --- E. AGREGATION ANNUELLE (A faire après avoir rempli tous les mois de l'année) ---
-    for year_str in GLOBAL_DATA:
-        months_data = GLOBAL_DATA[year_str]
-        
-        # On ne traite que s'il y a des mois, et on évite de retraiter si "0" existe déjà
-        if not months_data or "0" in months_data:
-            continue
-            
-        # Initialisation Annuels
-        ann_budget = 0.0
-        ann_realise = 0.0
-        ann_commandes = 0.0
-        ann_prod = 0.0
-        ann_jours = 0
-        
-        # Pour les charts annuels : Histogramme Mensuel + Total
-        chart_labels_y = []
-        chart_budget_y = []
-        chart_realise_y = []
-        chart_cmd_y = []
-        chart_prod_y = []
-        
-        # Liste des mois 1 à 12
-        for m in range(1, 13):
-            m_str = str(m)
-            # Label
-            chart_labels_y.append(f"{m:02d}") 
-            
-            val_b = 0.0
-            val_r = 0.0
-            val_c = 0.0
-            val_p = 0.0
-
-            if m_str in months_data:
-                d = months_data[m_str]
-                # Totaux Annuels
-                ann_budget += d['budget']
-                ann_realise += d['realise']
-                ann_commandes += d['commandes']
-                ann_prod += d['produit']
-                ann_jours += d['jours_ouvres']
-                
-                # Valeurs Mensuelles (pour l'histogramme)
-                val_b = d['budget']
-                val_r = d['realise']
-                val_c = d['commandes']
-                val_p = d['produit']
-            
-            chart_budget_y.append(val_b)
-            chart_realise_y.append(val_r)
-            chart_cmd_y.append(val_c)
-            chart_prod_y.append(val_p)
-
-        # AJOUT DE LA COLONNE TOTAL
-        chart_labels_y.append("TOTAL")
-        chart_budget_y.append(ann_budget)
-        chart_realise_y.append(ann_realise)
-        chart_cmd_y.append(ann_commandes)
-        chart_prod_y.append(ann_prod)
-
-        GLOBAL_DATA[year_str]["0"] = {
-            "budget": ann_budget,
-            "realise": ann_realise,
-            "commandes": ann_commandes,
-            "produit": ann_prod,
-            "jours_ouvres": ann_jours,
-            "chart_labels": chart_labels_y,
-            "chart_ca": chart_realise_y,
-            "chart_cmd": chart_cmd_y,
-            "chart_prod": chart_prod_y,
-            "chart_budget_trend": chart_budget_y
-        }
-
-    # 5. GENERATION HTML/JS
-    generate_spa(GLOBAL_DATA, last_update_str, warning_feries, warning_budget, warning_results, len(feries_dates), len(df_budget), len(df_res))
-
-
-def generate_spa(data, last_update_str, warning_feries="", warning_budget="", warning_results="", nb_feries=0, nb_budget=0, nb_results=0):
-    json_data = json.dumps(data)
+    # 5. GENERATION HTML/JS (publiée seulement si le contenu a changé)
+    timings = {"analyse_s": round(time.perf_counter() - t_start, 3)}
+    generate_spa(model.data, model.last_update, model.warnings["feries"], model.warnings["budget"], model.warnings["results"],
+                 len(model.feries_dates), len(sources.df_budget), len(sources.df_res), model.daily_comp, model.findings,
+                 model.rollups, model.drilldown, timings, force_publish, scenarios.public_list(model.scenario_names))
+
+    # 6. EXPORTS (tables à partir des tableaux déjà calculés)
+    if export_formats:
+        tables = export_data.build_tables(model.data, model.daily_frame())
+        export_data.export_tables(tables, export_formats, export_dir)
+
+
+def generate_spa(data, last_update_str, warning_feries="", warning_budget="", warning_results="", nb_feries=0, nb_budget=0, nb_results=0, daily_comp=None, quality_findings=None, rollups_data=None, drilldown=None, timings=None, force=False, scenario_list=None):
+    t_render = time.perf_counter()
+    # Payload de données : injecté dans la page (JSON) et découpé en sections versionnées
+    # pour le cache navigateur (IndexedDB) quand le dashboard est servi en HTTP
+    payload = {
+        "DB_DATA": data,
+        # Artefact compact séparé : trajectoires cumulées par jour ouvré, par mois puis par année
+        "DB_DAILY_COMP": daily_comp or {},
+        "DB_ROLLUPS": rollups_data or {},
+        "DB_DRILLDOWN": drilldown or {},
+    }
+    sections = spa_cache.split_payload(payload)
+    manifest = spa_cache.build_manifest(sections, last_update_str)
+    json_metrics = json.dumps(metrics.public_registry())
+    json_granularities = json.dumps(rollups.GRANULARITIES)
+    json_scenarios = json.dumps(scenario_list or [])
+    json_split_sections = json.dumps(list(spa_cache.SPLIT_SECTIONS))
     
     # Bloc Alerte HTML si warning
     alerts = []
@@ -306,6 +71,9 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
     if warning_budget: alerts.append(warning_budget)
     if warning_results: alerts.append(warning_results)
     
+    # Panneau qualité des données (constats structurés de validation.py)
+    quality_html = validation.render_html(quality_findings or [])
+
     alert_html = ""
     if alerts:
         # On affiche chaque alerte sur une ligne
@@ -391,6 +159,26 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
             
             .chart-wrapper {{ position: relative; height: 400px; width: 100%; }}
             
+            #perf-overlay {{
+                position: fixed; bottom: 10px; right: 10px; background: rgba(44, 62, 80, 0.85); color: white;
+                font-size: 0.8rem; padding: 0.4rem 0.8rem; border-radius: 6px; z-index: 1000; display: flex; gap: 0.8rem; align-items: center;
+            }}
+            #perf-overlay label {{ cursor: pointer; user-select: none; }}
+            #perf-timing {{ font-family: 'Consolas', monospace; }}
+            
+            /* --- QUALITE DES DONNEES --- */
+            .quality-panel {{ margin: 2rem auto 0; max-width: 1000px; text-align: left; background: var(--card-bg); border-radius: 12px; padding: 1rem 1.5rem; box-shadow: 0 2px 10px rgba(0,0,0,0.03); font-size: 0.9rem; }}
+            .quality-panel summary {{ cursor: pointer; font-weight: 600; color: var(--primary); }}
+            .quality-ok {{ color: var(--success); font-weight: 600; text-align: center; }}
+            .quality-table {{ width: 100%; border-collapse: collapse; margin-top: 1rem; }}
+            .quality-table th, .quality-table td {{ padding: 0.5rem; border-bottom: 1px solid #f0f0f0; vertical-align: top; text-align: left; }}
+            .quality-badge {{ color: white; border-radius: 4px; padding: 2px 6px; font-size: 0.75rem; font-weight: 600; }}
+            .quality-examples {{ color: var(--text-light); font-size: 0.8rem; }}
+
+            .drill-table {{ width: 100%; border-collapse: collapse; font-size: 0.9rem; }}
+            .drill-table th, .drill-table td {{ padding: 0.5rem; border-bottom: 1px solid #f0f0f0; text-align: right; }}
+            .drill-table th:first-child, .drill-table td:first-child {{ text-align: left; }}
+
             .positive {{ color: var(--success); }}
             .negative {{ color: var(--danger); }}
         </style>
@@ -398,6 +186,15 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
     <body>
         {alert_html}
 
+        <!-- PAYLOAD DE DONNEES (JSON, lu au démarrage si le cache local est plus ancien) -->
+        <script id="db-payload" type="application/json">{spa_cache.PAYLOAD_PLACEHOLDER}</script>
+
+        <!-- MODE PERFORMANCE + MESURE DE LATENCE -->
+        <div id="perf-overlay">
+            <label><input type="checkbox" id="perf-toggle" onchange="setPerfMode(this.checked)"> ⚡ Mode performance</label>
+            <span id="perf-timing" style="display: none;">-</span>
+        </div>
+
         <!-- VIEW 1: HOME -->
         <div id="view-home" class="view active">
             <div class="home-container">
@@ -414,7 +211,7 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                 </div>
 
                 <div style="margin-top: 3rem; color: var(--text-light); font-size: 0.9rem;">
-                    Données mises à jour le : <strong>{last_update_str}</strong>
+                    Données mises à jour le : <strong id="last-update">{last_update_str}</strong>
                     <span style="margin: 0 10px;">•</span>
                     Jours fériés chargés : <strong>{nb_feries}</strong>
                     <span style="margin: 0 10px;">•</span>
@@ -422,6 +219,8 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                     <span style="margin: 0 10px;">•</span>
                     Lignes Résultats chargées : <strong>{nb_results}</strong>
                 </div>
+
+                {quality_html}
             </div>
         </div>
 
@@ -435,6 +234,15 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
             </div>
             
             <div class="panel">
+                <div class="controls" style="margin-bottom: 1rem;">
+                    <select id="comp-mode" onchange="setCompMode(this.value)">
+                        <option value="monthly">Totaux mensuels</option>
+                        <option value="daily">Trajectoire cumulée par jour ouvré</option>
+                    </select>
+                    <select id="comp-month" onchange="timeRender('Comparaison', updateCompChart)" style="display: none;">
+                        <!-- Généré par JS -->
+                    </select>
+                </div>
                 <div style="margin-bottom: 1rem;">
                     <strong>Afficher les années :</strong>
                     <div id="comp-toggles" style="display: flex; gap: 1rem; flex-wrap: wrap; margin-top: 0.5rem;">
@@ -453,7 +261,11 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                 <button class="back-btn" onclick="goHome()">← Choisir une autre année</button>
                 <div class="controls">
                     <h1 id="year-display" style="margin:0; font-size:1.5rem; margin-right:1rem;">2025</h1>
-                    <select id="month-selector" onchange="selectMonth(this.value)">
+                    <select id="granularity-selector" onchange="selectGranularity(this.value)">
+                        <option value="month">Mois</option>
+                        <!-- Granularités agrégées : générées par JS -->
+                    </select>
+                    <select id="period-selector" onchange="selectPeriod(this.value)">
                         <!-- Généré par JS -->
                     </select>
                 </div>
@@ -478,9 +290,8 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                 <!-- COL GAUCHE: CHIFFRES -->
                 <div class="panel">
                     <h2>Performance Mensuelle</h2>
-                    <div class="metric-row">
-                        <span>CA Réalisé</span>
-                        <span class="metric-val" id="val-ca">-</span>
+                    <div id="metric-rows-primary">
+                        <!-- Généré par JS depuis le registre des indicateurs -->
                     </div>
                     <div class="metric-row">
                         <span>Écart vs Budget</span>
@@ -488,36 +299,80 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                     </div>
                     
                     <h2 style="margin-top:2rem;">Production & Commandes</h2>
-                    <div class="metric-row">
-                        <span>Prise de Commande</span>
-                        <span class="metric-val" id="val-cmd">-</span>
+                    <div id="metric-rows-secondary">
+                        <!-- Généré par JS depuis le registre des indicateurs -->
                     </div>
-                    <div class="metric-row">
-                        <span>Montant Produit</span>
-                        <span class="metric-val" id="val-prod">-</span>
+                    <div id="metric-rows-scenarios">
+                        <!-- Écart vs chaque scénario budgétaire : généré par JS -->
                     </div>
                 </div>
 
                 <!-- COL DROITE: GRAPHIQUE -->
                 <div class="panel">
                     <h2>Évolution Cumulée</h2>
+                    <div id="scenario-toggles" style="display: none; gap: 1rem; flex-wrap: wrap; margin-bottom: 0.5rem;">
+                        <!-- Cases des scénarios budgétaires : générées par JS -->
+                    </div>
                     <div class="chart-wrapper">
                         <canvas id="mainChart"></canvas>
                     </div>
                 </div>
             </div>
+
+            <!-- REPARTITION PAR DIMENSION (cube pré-agrégé) -->
+            <div class="panel" id="drilldown-panel" style="display: none;">
+                <h2>Répartition par
+                    <select id="drilldown-dim" onchange="updateDrilldown()" style="padding: 0.3rem 0.8rem; font-size: 1rem;">
+                        <!-- Généré par JS -->
+                    </select>
+                </h2>
+                <table class="drill-table" id="drilldown-table"></table>
+            </div>
             
         </div>
 
         <script>
-            // DONNEES INJECTEES PAR PYTHON
-            const DB_DATA = {json_data};
+            // DONNEES INJECTEES PAR PYTHON (chargées au démarrage : cache IndexedDB ou JSON de la page)
+            let DB_DATA = {{}};
+            // Trajectoires cumulées (Expéditions) alignées par jour ouvré : DB_DAILY_COMP[mois].years[annee][k]
+            let DB_DAILY_COMP = {{}};
+            // Agrégats semaine ISO / trimestre / exercice fiscal : DB_ROLLUPS[granularite][cle]
+            let DB_ROLLUPS = {{}};
+            // Top membres par dimension : DB_DRILLDOWN[dim].periods["annee-mois"] = [[membre, ...valeurs indicateurs]]
+            let DB_DRILLDOWN = {{}};
+            // Manifeste de la version embarquée : empreinte globale + empreinte de chaque section
+            const DATA_MANIFEST = {spa_cache.MANIFEST_PLACEHOLDER};
+            // Registre des indicateurs (metrics.py) : libellés, clés des séries, rôle, couleur
+            const METRICS = {json_metrics};
+            const PRIMARY_METRIC = METRICS.find(m => m.role === 'primary');
+            const GRANULARITIES = {json_granularities};
+            // Scénarios budgétaires superposables (hors référence) : clé, libellé, couleur
+            const SCENARIOS = {json_scenarios};
             
             // ETAT
             let currentYear = null;
-            let currentMonth = null;
+            let currentGranularity = 'month';  // month | week | quarter | fiscal
+            let currentPeriod = null;          // mois ("0" = année entière) ou clé de période agrégée
             let myChart = null;
             let compChart = null;
+            let compSelectedYears = [];
+            let compMode = 'monthly';
+
+            // MODE PERFORMANCE (mise à jour en place, sans animation, décimation des longues séries)
+            // Activable via ?perf=1 ou la case en bas à droite (mémorisée dans le navigateur)
+            const URL_PARAMS = new URLSearchParams(window.location.search);
+            let PERF_MODE = false;
+            try {{ PERF_MODE = localStorage.getItem('perfMode') === '1'; }} catch (e) {{}}
+            if (URL_PARAMS.has('perf')) PERF_MODE = URL_PARAMS.get('perf') !== '0';
+            const BIG_SERIES = 120;            // au-delà : pas de lissage Bézier
+            const DECIMATION_THRESHOLD = 200;  // au-delà (exercice, année jour par jour) : décimation LTTB
+            const DECIMATION_SAMPLES = 150;    // points conservés par la décimation
+            const PREPARED_CACHE = {{}};        // séries préparées par "annee-mois" ou "granularite-cle"
+            const COMP_CACHE = {{}};            // séries de comparaison par année
+
+            // Scénarios superposés au graphique (mémorisés dans le navigateur)
+            let ACTIVE_SCENARIOS = new Set();
+            try {{ ACTIVE_SCENARIOS = new Set(JSON.parse(localStorage.getItem('scenarios') || '[]')); }} catch (e) {{}}
 
             // Noms de mois
             const MONTH_NAMES = {{
@@ -526,6 +381,70 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                 "7": "Juillet", "8": "Août", "9": "Septembre", "10": "Octobre", "11": "Novembre", "12": "Décembre"
             }};
 
+            // Lignes du tableau de KPI, une par indicateur enregistré
+            function initMetricRows() {{
+                ['primary', 'secondary'].forEach(role => {{
+                    const container = document.getElementById('metric-rows-' + role);
+                    container.innerHTML = '';
+                    METRICS.filter(m => m.role === role).forEach(m => {{
+                        const row = document.createElement('div');
+                        row.className = 'metric-row';
+                        const label = document.createElement('span');
+                        label.innerText = m.label;
+                        const val = document.createElement('span');
+                        val.className = 'metric-val';
+                        val.id = 'val-' + m.key;
+                        val.innerText = '-';
+                        row.appendChild(label);
+                        row.appendChild(val);
+                        container.appendChild(row);
+                    }});
+                }});
+
+                // Scénarios budgétaires : ligne d'écart + case d'affichage sur le graphique
+                const scenarioRows = document.getElementById('metric-rows-scenarios');
+                const toggles = document.getElementById('scenario-toggles');
+                scenarioRows.innerHTML = '';
+                toggles.innerHTML = '';
+                toggles.style.display = SCENARIOS.length ? 'flex' : 'none';
+                SCENARIOS.forEach(sc => {{
+                    const row = document.createElement('div');
+                    row.className = 'metric-row';
+                    const label = document.createElement('span');
+                    label.innerText = 'Écart vs ' + sc.label;
+                    const val = document.createElement('span');
+                    val.className = 'metric-val';
+                    val.id = 'val-scenario-' + sc.key;
+                    val.innerText = '-';
+                    row.appendChild(label);
+                    row.appendChild(val);
+                    scenarioRows.appendChild(row);
+
+                    const lbl = document.createElement('label');
+                    lbl.style.color = sc.color;
+                    const cb = document.createElement('input');
+                    cb.type = 'checkbox';
+                    cb.checked = ACTIVE_SCENARIOS.has(sc.key);
+                    cb.onchange = () => toggleScenario(sc.key, cb.checked);
+                    lbl.appendChild(cb);
+                    lbl.appendChild(document.createTextNode(' ' + sc.label));
+                    toggles.appendChild(lbl);
+                }});
+            }}
+
+            function toggleScenario(key, enabled) {{
+                if (enabled) ACTIVE_SCENARIOS.add(key); else ACTIVE_SCENARIOS.delete(key);
+                try {{ localStorage.setItem('scenarios', JSON.stringify([...ACTIVE_SCENARIOS])); }} catch (e) {{}}
+                // Le nombre de courbes change : reconstruction du graphique
+                if (myChart) {{ myChart.destroy(); myChart = null; }}
+                if (currentYear && currentPeriod) timeRender('Scénarios', updateDashboard);
+            }}
+
+            // Budget d'un scénario sur une période (null si le scénario ne la couvre pas)
+            function scenarioData(data, key) {{
+                return (data.scenarios && data.scenarios[key]) || null;
+            }}
+
             function initHome() {{
                 const container = document.getElementById('year-buttons');
                 container.innerHTML = '';
@@ -546,22 +465,47 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                 document.getElementById('view-dashboard').classList.add('active');
                 document.getElementById('year-display').innerText = year;
                 
-                // Peupler le selecteur de mois
-                const monthSelect = document.getElementById('month-selector');
-                monthSelect.innerHTML = '';
-                
-                // Sort months numerically, "0" will naturally come first
-                const months = Object.keys(DB_DATA[year]).sort((a,b) => parseInt(a)-parseInt(b));
-                months.forEach(m => {{
+                selectGranularity(currentGranularity);
+            }}
+
+            // Données d'une période selon la granularité courante
+            function periodData(year, period) {{
+                if (currentGranularity === 'month') return DB_DATA[year][period];
+                return DB_ROLLUPS[currentGranularity][period];
+            }}
+
+            function periodLabel(period) {{
+                if (currentGranularity === 'month') return MONTH_NAMES[period] || period;
+                return DB_ROLLUPS[currentGranularity][period].label;
+            }}
+
+            function selectGranularity(gran) {{
+                currentGranularity = gran;
+                document.getElementById('granularity-selector').value = gran;
+
+                // Peupler le selecteur de période
+                const periodSelect = document.getElementById('period-selector');
+                periodSelect.innerHTML = '';
+
+                let periods;
+                if (gran === 'month') {{
+                    // Sort months numerically, "0" will naturally come first
+                    periods = Object.keys(DB_DATA[currentYear]).sort((a,b) => parseInt(a)-parseInt(b));
+                }} else {{
+                    // Périodes couvrant l'année sélectionnée (clés triables chronologiquement)
+                    const year = parseInt(currentYear);
+                    periods = Object.keys(DB_ROLLUPS[gran] || {{}}).filter(k => DB_ROLLUPS[gran][k].years.includes(year)).sort();
+                }}
+                periods.forEach(p => {{
                     const opt = document.createElement('option');
-                    opt.value = m;
-                    opt.innerText = MONTH_NAMES[m] || m;
-                    monthSelect.appendChild(opt);
+                    opt.value = p;
+                    opt.innerText = periodLabel(p);
+                    periodSelect.appendChild(opt);
                 }});
                 
                 // Selectionner le premier par défaut (qui sera "0" -> Année Entière si présent, ou "1" Janvier)
-                if (months.length > 0) {{
-                    selectMonth(months[0]);
+                if (periods.length > 0) {{
+                    selectPeriod(periods[0]);
                 }}
             }}
 
@@ -591,23 +535,133 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                     cb.type = 'checkbox';
                     cb.value = y;
                     cb.checked = true; // par défaut tout coché
-                    cb.onchange = updateCompChart;
+                    cb.onchange = () => timeRender('Comparaison', updateCompChart);
                     
                     label.appendChild(cb);
                     label.appendChild(document.createTextNode(y));
                     container.appendChild(label);
                 }});
+
+                // Mois disponibles pour la trajectoire journalière
+                const monthSelect = document.getElementById('comp-month');
+                monthSelect.innerHTML = '';
+                const months = Object.keys(DB_DAILY_COMP).sort((a,b) => parseInt(a)-parseInt(b));
+                months.forEach(m => {{
+                    const opt = document.createElement('option');
+                    opt.value = m;
+                    opt.innerText = MONTH_NAMES[m] || m;
+                    monthSelect.appendChild(opt);
+                }});
+                // Par défaut : le mois le plus récent
+                if (months.length > 0 && !monthSelect.value) monthSelect.value = months[months.length - 1];
                 
                 updateCompChart();
             }}
 
+            function setCompMode(mode) {{
+                compMode = mode;
+                document.getElementById('comp-mode').value = mode;
+                document.getElementById('comp-month').style.display = (mode === 'daily') ? '' : 'none';
+                timeRender('Comparaison', updateCompChart);
+            }}
+
+            // Superposition des trajectoires cumulées d'un même mois, année par année, par jour ouvré
+            function updateDailyCompChart(selectedYears) {{
+                const colors = ['#3498db', '#e74c3c', '#9b59b6', '#2ecc71', '#f1c40f', '#34495e'];
+                const month = document.getElementById('comp-month').value;
+                const comp = DB_DAILY_COMP[month] || {{ n: 0, years: {{}} }};
+                const labels = Array.from({{ length: comp.n }}, (_, i) => 'J' + (i + 1));
+                const tensionVal = lineTension(comp.n);
+
+                const datasets = [];
+                selectedYears.forEach((y, idx) => {{
+                    if (!comp.years[y]) return;
+                    const color = colors[idx % colors.length];
+                    datasets.push({{
+                        label: y,
+                        data: comp.years[y],
+                        borderColor: color,
+                        backgroundColor: 'transparent',
+                        borderWidth: 2,
+                        pointRadius: 2,
+                        tension: tensionVal
+                    }});
+                }});
+
+                // MODE PERFORMANCE : mise à jour en place si le graphique est déjà en mode journalier
+                if (PERF_MODE && compChart && compChart.$mode === 'daily') {{
+                    compChart.data.labels = labels;
+                    compChart.data.datasets = datasets;
+                    compChart.update('none');
+                    return;
+                }}
+
+                const ctx = document.getElementById('compChart').getContext('2d');
+                if (compChart) compChart.destroy();
+
+                compChart = new Chart(ctx, {{
+                    type: 'line',
+                    data: {{ labels: labels, datasets: datasets }},
+                    options: {{
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        animation: PERF_MODE ? false : undefined,
+                        interaction: {{ mode: 'index', intersect: false }},
+                        plugins: {{
+                            legend: {{ position: 'top' }},
+                            tooltip: {{
+                                callbacks: {{
+                                    title: function(context) {{
+                                        return 'Jour ouvré ' + context[0].label.substring(1) + ' - ' + (MONTH_NAMES[month] || month);
+                                    }},
+                                    label: function(context) {{
+                                        let label = context.dataset.label + ': ';
+                                        if (context.parsed.y !== null) {{
+                                            label += new Intl.NumberFormat('fr-FR', {{ style: 'currency', currency: 'EUR', maximumFractionDigits: 0 }}).format(context.parsed.y);
+                                        }}
+                                        return label;
+                                    }}
+                                }}
+                            }}
+                        }},
+                        scales: {{
+                            y: {{
+                                beginAtZero: true,
+                                title: {{ display: true, text: 'CA cumulé' }},
+                                grid: {{ color: '#f0f0f0' }}
+                            }},
+                            x: {{ grid: {{ display: false }} }}
+                        }}
+                    }}
+                }});
+                compChart.$mode = 'daily';
+            }}
+
+            // Séries de comparaison mémoïsées par année
+            function prepareCompYear(y) {{
+                if (COMP_CACHE[y]) return COMP_CACHE[y];
+                const dataFull = DB_DATA[y]["0"][PRIMARY_METRIC.chart_key]; // CA Réalisé = Expéditions
+                const dataMonths = dataFull.slice(0, 12); // Jan-Dec
+                const dataTotal = dataFull[12]; // Total annuel
+                COMP_CACHE[y] = {{
+                    // Dataset pour les mois (12 valeurs + null pour Total)
+                    monthData: [...dataMonths, null],
+                    // Dataset pour le total (12 nulls + valeur totale)
+                    totalData: [...Array(12).fill(null), dataTotal]
+                }};
+                return COMP_CACHE[y];
+            }}
+
             function updateCompChart() {{
                 // Récupérer les années cochées
                 const checkboxes = document.querySelectorAll('#comp-toggles input[type="checkbox"]');
                 const selectedYears = Array.from(checkboxes).filter(cb => cb.checked).map(cb => cb.value);
-                
-                const ctx = document.getElementById('compChart').getContext('2d');
-                if (compChart) compChart.destroy();
+                compSelectedYears = selectedYears;
+
+                if (compMode === 'daily') {{
+                    updateDailyCompChart(selectedYears);
+                    return;
+                }}
                 
                 // Préparer datasets pour mois (Jan-Dec) et totaux annuels
                 const colors = ['#3498db', '#e74c3c', '#9b59b6', '#2ecc71', '#f1c40f', '#34495e'];
@@ -615,21 +669,13 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                 
                 selectedYears.forEach((y, idx) => {{
                     if (DB_DATA[y] && DB_DATA[y]["0"]) {{
-                        const dataFull = DB_DATA[y]["0"].chart_ca; // CA Réalisé = Expéditions
-                        const dataMonths = dataFull.slice(0, 12); // Jan-Dec
-                        const dataTotal = dataFull[12]; // Total annuel
-                        
-                        // Dataset pour les mois (12 valeurs + null pour Total)
-                        const monthData = [...dataMonths, null];
-                        // Dataset pour le total (12 nulls + valeur totale)
-                        const totalData = [...Array(12).fill(null), dataTotal];
-                        
+                        const prepared = prepareCompYear(y);
                         const color = colors[idx % colors.length];
                         
                         // Barres mensuelles (axe Y gauche)
                         datasets.push({{
                             label: "Chiffre d'affaires",
-                            data: monthData,
+                            data: prepared.monthData,
                             backgroundColor: color,
                             borderColor: color,
                             borderWidth: 1,
@@ -640,7 +686,7 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                         // Barre totale (axe Y droit)
                         datasets.push({{
                             label: y + ' (Total)',
-                            data: totalData,
+                            data: prepared.totalData,
                             backgroundColor: color,
                             borderColor: color,
                             borderWidth: 1,
@@ -649,6 +695,16 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                         }});
                     }}
                 }});
+
+                // MODE PERFORMANCE : on remplace les datasets du graphique existant
+                if (PERF_MODE && compChart && compChart.$mode === 'monthly') {{
+                    compChart.data.datasets = datasets;
+                    compChart.update('none');
+                    return;
+                }}
+                
+                const ctx = document.getElementById('compChart').getContext('2d');
+                if (compChart) compChart.destroy();
                 
                 const labels = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Juil", "Août", "Sep", "Oct", "Nov", "Déc", "TOTAL"];
                 
@@ -661,6 +717,7 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                     options: {{
                         responsive: true,
                         maintainAspectRatio: false,
+                        animation: PERF_MODE ? false : undefined,
                         interaction: {{ mode: 'index', intersect: false }},
                         plugins: {{
                             legend: {{ 
@@ -684,7 +741,7 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                                         if (yearLabel.includes('(Total)')) {{
                                             yearLabel = yearLabel.replace(' (Total)', '');
                                         }} else {{
-                                            yearLabel = selectedYears[Math.floor(context.datasetIndex / 2)];
+                                            yearLabel = compSelectedYears[Math.floor(context.datasetIndex / 2)];
                                         }}
                                         
                                         let label = yearLabel + ': ';
@@ -712,24 +769,26 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                         }}
                     }}
                 }});
+                compChart.$mode = 'monthly';
             }}
 
-            function selectMonth(m) {{
-                currentMonth = m;
-                document.getElementById('month-selector').value = m;
-                updateDashboard();
+            function selectPeriod(p) {{
+                currentPeriod = p;
+                document.getElementById('period-selector').value = p;
+                timeRender(currentYear + ' / ' + periodLabel(p), updateDashboard);
             }}
 
             function updateDashboard() {{
-                if (!currentYear || !currentMonth) return;
+                if (!currentYear || !currentPeriod) return;
                 
-                const data = DB_DATA[currentYear][currentMonth];
+                const data = periodData(currentYear, currentPeriod);
                 
                 // 1. UPDATE KPIs
                 document.getElementById('kpi-days').innerText = data.jours_ouvres;
                 document.getElementById('kpi-budget').innerText = formatMoney(data.budget);
                 
-                const percent = data.budget > 0 ? (data.realise / data.budget * 100) : 0;
+                const realise = data[PRIMARY_METRIC.key];
+                const percent = data.budget > 0 ? (realise / data.budget * 100) : 0;
                 const kpiPercent = document.getElementById('kpi-percent');
                 kpiPercent.innerText = percent.toFixed(1) + '%';
                 
@@ -740,71 +799,75 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                 kpiPercent.className = 'kpi-value ' + (isGood ? 'positive' : 'negative');
 
                 // 2. UPDATE TABLE
-                document.getElementById('val-ca').innerText = formatMoney(data.realise);
-                document.getElementById('val-cmd').innerText = formatMoney(data.commandes);
-                document.getElementById('val-prod').innerText = formatMoney(data.produit);
+                METRICS.forEach(m => {{
+                    document.getElementById('val-' + m.key).innerText = formatMoney(data[m.key]);
+                }});
                 
-                const diff = data.realise - data.budget;
+                const diff = realise - data.budget;
                 const elDiff = document.getElementById('val-diff');
                 elDiff.innerText = (diff > 0 ? '+' : '') + formatMoney(diff);
                 elDiff.className = 'metric-val ' + (diff >= 0 ? 'positive' : 'negative');
+                SCENARIOS.forEach(sc => {{
+                    const el = document.getElementById('val-scenario-' + sc.key);
+                    const sd = scenarioData(data, sc.key);
+                    if (!sd) {{ el.innerText = '-'; el.className = 'metric-val'; return; }}
+                    const d = realise - sd.budget;
+                    el.innerText = (d > 0 ? '+' : '') + formatMoney(d);
+                    el.className = 'metric-val ' + (d >= 0 ? 'positive' : 'negative');
+                }});
 
                 // 3. UPDATE CHART
                 updateChart(data);
-            }}
 
-            function formatMoney(amount) {{
-                return new Intl.NumberFormat('fr-FR', {{ style: 'currency', currency: 'EUR' }}).format(amount);
+                // 4. REPARTITION PAR DIMENSION
+                updateDrilldown();
             }}
 
-            function updateChart(data) {{
-                const ctx = document.getElementById('mainChart').getContext('2d');
-                
-                if (myChart) {{
-                    myChart.destroy();
+            function updateDrilldown() {{
+                const dims = Object.keys(DB_DRILLDOWN);
+                const panel = document.getElementById('drilldown-panel');
+                panel.style.display = dims.length ? '' : 'none';
+                if (!dims.length) return;
+
+                const table = document.getElementById('drilldown-table');
+                if (currentGranularity !== 'month') {{
+                    table.innerHTML = '<tr><td>Répartition disponible en vue mensuelle ou annuelle.</td></tr>';
+                    return;
                 }}
 
-                // Détection Type de Graph
-                // Si "0" (Année entière) => Bar chart (Histogramme)
-                // Sinon => Line chart (Courbe cumulée)
-                const isYearView = (currentMonth === "0");
-                const chartType = isYearView ? 'bar' : 'line';
-                const tensionVal = isYearView ? 0 : 0.4;
-                const fillVal = isYearView ? false : true;
-                
-                // Adaptation visuelle Budget
-                const budgetType = isYearView ? 'bar' : 'line'; // On peut mixer
-                const budgetLabel = isYearView ? 'Budget Mensuel' : 'Budget Cible (Trend)';
-                const budgetBorderDash = isYearView ? [] : [2, 2];
-                // Afficher le budget en ligne rouge même sur l'histo pour bien voir ?
-                // Ou en barre rouge ? Le prompt dit "Histogramme mensuel", donc tout barres c'est plus sûr.
-                
-                // Configuration des Axes (Scales)
-                const scalesConfig = {{
-                    y: {{
-                        beginAtZero: true,
-                        position: 'left',
-                        grid: {{ color: '#f0f0f0' }},
-                        title: {{ display: isYearView, text: 'Mensuel' }}
-                    }},
-                    x: {{ grid: {{ display: false }} }}
-                }};
+                const dim = document.getElementById('drilldown-dim').value || dims[0];
+                const rows = DB_DRILLDOWN[dim].periods[currentYear + '-' + currentPeriod] || [];
+                const primaryIdx = METRICS.indexOf(PRIMARY_METRIC);
+                const total = rows.reduce((acc, r) => acc + r[1 + primaryIdx], 0);
 
-                // Si vue annuelle : Axe Y1 à droite pour le Total
-                if (isYearView) {{
-                    scalesConfig.y1 = {{
-                        beginAtZero: true,
-                        position: 'right',
-                        grid: {{ drawOnChartArea: false }}, // avoid grid clutter
-                        title: {{ display: true, text: 'Cumul Annuel (Total)' }}
-                    }};
-                }}
+                let html = '<thead><tr><th>' + DB_DRILLDOWN[dim].label + '</th>';
+                METRICS.forEach(m => {{ html += '<th>' + m.label + '</th>'; }});
+                html += '<th>Part ' + PRIMARY_METRIC.label + '</th></tr></thead><tbody>';
+                rows.forEach(r => {{
+                    const name = document.createElement('span');
+                    name.innerText = r[0];
+                    html += '<tr><td>' + name.innerHTML + '</td>';
+                    METRICS.forEach((m, i) => {{ html += '<td class="metric-val">' + formatMoney(r[1 + i]) + '</td>'; }});
+                    const share = total ? (r[1 + primaryIdx] / total * 100) : 0;
+                    html += '<td class="metric-val">' + share.toFixed(1) + '%</td></tr>';
+                }});
+                if (!rows.length) html += '<tr><td colspan="' + (METRICS.length + 2) + '">Aucune donnée sur la période.</td></tr>';
+                table.innerHTML = html + '</tbody>';
+            }}
 
-                // Construction des Datasets
-                let finalDatasets = [];
+            function formatMoney(amount) {{
+                return new Intl.NumberFormat('fr-FR', {{ style: 'currency', currency: 'EUR' }}).format(amount);
+            }}
 
-                if (isYearView) {{
-                    // Fonctions pour séparer Mois (0-11) et Total (12)
+            // --- PREPARATION DES SERIES (mémoïsée par année/mois) ---
+            function prepareChartData(year, period) {{
+                const key = currentGranularity === 'month' ? year + '-' + period : currentGranularity + '-' + period;
+                if (PREPARED_CACHE[key]) return PREPARED_CACHE[key];
+
+                const data = periodData(year, period);
+                let series;
+                if (currentGranularity === 'month' && period === "0") {{
+                    // Séparer Mois (0-11) et Total (12)
                     // On suppose data.chart_labels a 13 entrées (01..12, TOTAL)
                     const splitData = (arr) => {{
                         const monthly = arr.slice(0, 12);
@@ -812,149 +875,251 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                         const dTotal = [...Array(12).fill(null), arr[12]];
                         return {{ dMonth, dTotal }};
                     }};
+                    // Budget, chaque indicateur puis chaque scénario : [mensuel, total]
+                    series = [];
+                    [data.chart_budget_trend, ...METRICS.map(m => data[m.chart_key]), ...scenarioSeries(data)].forEach(arr => {{
+                        const d = splitData(arr);
+                        series.push(d.dMonth, d.dTotal);
+                    }});
+                }} else {{
+                    series = [data.chart_budget_trend, ...METRICS.map(m => data[m.chart_key]), ...scenarioSeries(data)];
+                }}
 
-                    const b = splitData(data.chart_budget_trend);
-                    const r = splitData(data.chart_ca);
-                    const c = splitData(data.chart_cmd);
-                    const p = splitData(data.chart_prod);
-                    
-                    finalDatasets = [
-                        // PAIRES : On met le même label pour que la légende soit propre (ou concaténé)
-                        // BUDGET
+                const longSeries = data.chart_labels.length > DECIMATION_THRESHOLD;
+                if (longSeries) {{
+                    // La décimation Chart.js exige des points {{x, y}} sur un axe linéaire
+                    series = series.map(s => s.map((v, i) => ({{ x: i, y: v }})));
+                }}
+
+                const prepared = {{ labels: data.chart_labels, series: series, longSeries: longSeries }};
+                PREPARED_CACHE[key] = prepared;
+                return prepared;
+            }}
+
+            // Courbes de budget des scénarios (série vide si le scénario ne couvre pas la période)
+            function scenarioSeries(data) {{
+                return SCENARIOS.map(sc => {{
+                    const sd = scenarioData(data, sc.key);
+                    return sd ? sd.chart_budget_trend : data.chart_labels.map(() => null);
+                }});
+            }}
+
+            // Lissage Bézier uniquement pour les petites séries hors mode performance
+            function lineTension(nbPoints) {{
+                return (PERF_MODE || nbPoints > BIG_SERIES) ? 0 : 0.4;
+            }}
+
+            function buildMainDatasets(isYearView, prepared) {{
+                const s = prepared.series;
+                if (isYearView) {{
+                    // PAIRES : On met le même label pour que la légende soit propre (ou concaténé)
+                    // BUDGET
+                    const datasets = [
                         {{
                             label: 'Budget',
-                            data: b.dMonth,
+                            data: s[0],
                             borderColor: '#e74c3c',
                             backgroundColor: '#e74c3c',
                             type: 'line', 
                             borderWidth: 2,
                             pointRadius: 3,
-                            tension: 0.1,
+                            tension: PERF_MODE ? 0 : 0.1,
                             yAxisID: 'y'
                         }},
                         {{
                             label: 'Budget (Total)',
-                            data: b.dTotal,
+                            data: s[1],
                             borderColor: '#e74c3c',
                             backgroundColor: '#e74c3c',
                             type: 'bar', // Total en barre aussi ou point ? Barre c'est mieux si tout est barre
                             borderWidth: 2,
                             yAxisID: 'y1'
-                        }},
-                        // CA
-                        {{
-                            label: 'CA Réalisé',
-                            data: r.dMonth,
-                            backgroundColor: '#3498db',
-                            borderColor: '#3498db',
-                            borderWidth: 1,
-                            yAxisID: 'y'
-                        }},
-                        {{
-                            label: 'CA (Total)',
-                            data: r.dTotal,
-                            backgroundColor: '#3498db', // Plus sombre ?
-                            borderColor: '#3498db',
-                            borderWidth: 1,
-                            yAxisID: 'y1'
-                        }},
-                        // CMD
-                        {{
-                            label: 'Prise de Cde',
-                            data: c.dMonth,
-                            backgroundColor: '#9b59b6',
-                            borderColor: '#9b59b6',
-                            borderWidth: 1,
-                            yAxisID: 'y'
-                        }},
-                        {{
-                            label: 'Cde (Total)',
-                            data: c.dTotal,
-                            backgroundColor: '#9b59b6',
-                            borderColor: '#9b59b6',
-                            borderWidth: 1,
-                            yAxisID: 'y1'
-                        }},
-                        // PROD
-                        {{
-                            label: 'Produit',
-                            data: p.dMonth,
-                            backgroundColor: '#2ecc71',
-                            borderColor: '#2ecc71',
+                        }}
+                    ];
+                    // Indicateurs : barres mensuelles (axe gauche) + total (axe droit)
+                    METRICS.forEach((m, i) => {{
+                        datasets.push({{
+                            label: m.chart_label,
+                            data: s[2 + 2 * i],
+                            backgroundColor: m.color,
+                            borderColor: m.color,
                             borderWidth: 1,
                             yAxisID: 'y'
-                        }},
-                        {{
-                            label: 'Prod (Total)',
-                            data: p.dTotal,
-                            backgroundColor: '#2ecc71',
-                            borderColor: '#2ecc71',
+                        }});
+                        datasets.push({{
+                            label: m.total_label,
+                            data: s[3 + 2 * i],
+                            backgroundColor: m.color,
+                            borderColor: m.color,
                             borderWidth: 1,
                             yAxisID: 'y1'
-                        }}
-                    ];
-
-                }} else {{
-                    // Vue Mensuelle Normale
-                    finalDatasets = [
-                        {{
-                            label: budgetLabel,
-                            data: data.chart_budget_trend,
-                            borderColor: '#e74c3c',
-                            backgroundColor: 'transparent',
+                        }});
+                    }});
+                    // Scénarios cochés : courbe mensuelle + total, en pointillés
+                    SCENARIOS.forEach((sc, k) => {{
+                        if (!ACTIVE_SCENARIOS.has(sc.key)) return;
+                        const base = 2 + 2 * METRICS.length + 2 * k;
+                        datasets.push({{
+                            label: sc.label,
+                            data: s[base],
+                            borderColor: sc.color,
+                            backgroundColor: sc.color,
                             type: 'line',
                             borderWidth: 2,
-                            borderDash: budgetBorderDash,
-                            pointRadius: 0,
-                            tension: 0.1,
+                            borderDash: [6, 3],
+                            pointRadius: 3,
+                            tension: PERF_MODE ? 0 : 0.1,
                             yAxisID: 'y'
-                        }},
-                        {{
-                            label: 'CA Réalisé',
-                            data: data.chart_ca,
-                            borderColor: '#3498db',
-                            backgroundColor: 'rgba(52, 152, 219, 0.1)',
-                            borderWidth: 3,
-                            fill: fillVal,
-                            tension: tensionVal,
-                             yAxisID: 'y'
-                        }},
-                         {{
-                            label: 'Prise de Cde',
-                            data: data.chart_cmd,
-                            borderColor: '#9b59b6',
-                            backgroundColor: 'transparent',
-                            borderWidth: 2,
-                            borderDash: [5, 5],
-                            tension: tensionVal,
-                             yAxisID: 'y'
-                        }},
-                         {{
-                            label: 'Produit',
-                            data: data.chart_prod,
-                            borderColor: '#2ecc71',
-                            backgroundColor: 'transparent',
+                        }});
+                        datasets.push({{
+                            label: sc.label + ' (Total)',
+                            data: s[base + 1],
+                            borderColor: sc.color,
+                            backgroundColor: hexToRgba(sc.color, 0.5),
+                            type: 'bar',
                             borderWidth: 2,
-                            tension: tensionVal,
-                             yAxisID: 'y'
-                        }}
-                    ];
+                            yAxisID: 'y1'
+                        }});
+                    }});
+                    return datasets;
                 }}
+
+                // Vue Mensuelle Normale
+                const tensionVal = lineTension(prepared.labels.length);
+                const pointRadius = prepared.longSeries ? 0 : undefined;
+                const datasets = [
+                    {{
+                        label: 'Budget Cible (Trend)',
+                        data: s[0],
+                        borderColor: '#e74c3c',
+                        backgroundColor: 'transparent',
+                        type: 'line',
+                        borderWidth: 2,
+                        borderDash: [2, 2],
+                        pointRadius: 0,
+                        tension: PERF_MODE ? 0 : 0.1,
+                        yAxisID: 'y'
+                    }}
+                ];
+                // Indicateur principal : courbe épaisse remplie ; autres : courbes simples
+                METRICS.forEach((m, i) => {{
+                    const isPrimary = (m.role === 'primary');
+                    datasets.push({{
+                        label: m.chart_label,
+                        data: s[1 + i],
+                        borderColor: m.color,
+                        backgroundColor: isPrimary ? hexToRgba(m.color, 0.1) : 'transparent',
+                        borderWidth: isPrimary ? 3 : 2,
+                        borderDash: m.dash,
+                        fill: isPrimary,
+                        tension: tensionVal,
+                        pointRadius: pointRadius,
+                        yAxisID: 'y'
+                    }});
+                }});
+                SCENARIOS.forEach((sc, k) => {{
+                    if (!ACTIVE_SCENARIOS.has(sc.key)) return;
+                    datasets.push({{
+                        label: 'Budget ' + sc.label,
+                        data: s[1 + METRICS.length + k],
+                        borderColor: sc.color,
+                        backgroundColor: 'transparent',
+                        type: 'line',
+                        borderWidth: 2,
+                        borderDash: [6, 3],
+                        pointRadius: 0,
+                        tension: PERF_MODE ? 0 : 0.1,
+                        yAxisID: 'y'
+                    }});
+                }});
+                return datasets;
+            }}
+
+            function hexToRgba(hex, alpha) {{
+                const n = parseInt(hex.slice(1), 16);
+                return 'rgba(' + ((n >> 16) & 255) + ', ' + ((n >> 8) & 255) + ', ' + (n & 255) + ', ' + alpha + ')';
+            }}
+
+            function updateChart(data) {{
+                // Détection Type de Graph
+                // Si "0" (Année entière) => Bar chart (Histogramme)
+                // Sinon => Line chart (Courbe cumulée)
+                const isYearView = (currentGranularity === 'month' && currentPeriod === "0");
+                const prepared = prepareChartData(currentYear, currentPeriod);
+
+                // MODE PERFORMANCE : mise à jour en place du graphique existant
+                // (même type, même axe) au lieu de destroy/recreate
+                if (PERF_MODE && myChart && myChart.$isYearView === isYearView && myChart.$longSeries === prepared.longSeries) {{
+                    const datasets = buildMainDatasets(isYearView, prepared);
+                    myChart.data.labels = prepared.labels;
+                    myChart.data.datasets.forEach((ds, i) => {{
+                        ds.data = datasets[i].data;
+                        ds.tension = datasets[i].tension;
+                    }});
+                    myChart.update('none');
+                    return;
+                }}
+
+                const ctx = document.getElementById('mainChart').getContext('2d');
                 
+                if (myChart) {{
+                    myChart.destroy();
+                }}
+
+                const chartType = isYearView ? 'bar' : 'line';
+                
+                // Configuration des Axes (Scales)
+                const scalesConfig = {{
+                    y: {{
+                        beginAtZero: true,
+                        position: 'left',
+                        grid: {{ color: '#f0f0f0' }},
+                        title: {{ display: isYearView, text: 'Mensuel' }}
+                    }},
+                    x: {{ grid: {{ display: false }} }}
+                }};
+
+                // Si vue annuelle : Axe Y1 à droite pour le Total
+                if (isYearView) {{
+                    scalesConfig.y1 = {{
+                        beginAtZero: true,
+                        position: 'right',
+                        grid: {{ drawOnChartArea: false }}, // avoid grid clutter
+                        title: {{ display: true, text: 'Cumul Annuel (Total)' }}
+                    }};
+                }}
+
+                // Longues séries : axe linéaire indexé + décimation LTTB
+                if (prepared.longSeries) {{
+                    const labels = prepared.labels;
+                    scalesConfig.x = {{
+                        type: 'linear',
+                        grid: {{ display: false }},
+                        ticks: {{ callback: (v) => labels[v] }}
+                    }};
+                }}
+
                 myChart = new Chart(ctx, {{
                     type: chartType,
                     data: {{
-                        labels: data.chart_labels, // [01..12, TOTAL]
-                        datasets: finalDatasets
+                        labels: prepared.labels, // [01..12, TOTAL]
+                        datasets: buildMainDatasets(isYearView, prepared)
                     }},
                     options: {{
                         responsive: true,
                         maintainAspectRatio: false,
+                        animation: PERF_MODE ? false : undefined,
+                        parsing: prepared.longSeries ? false : undefined,
+                        normalized: prepared.longSeries,
                         interaction: {{ mode: 'index', intersect: false }},
                         plugins: {{
                             legend: {{ position: 'bottom' }},
+                            decimation: {{ enabled: prepared.longSeries, algorithm: 'lttb', samples: DECIMATION_SAMPLES }},
                             tooltip: {{
                                 callbacks: {{
+                                    title: function(context) {{
+                                        return prepared.longSeries ? prepared.labels[context[0].parsed.x] : context[0].label;
+                                    }},
                                     label: function(context) {{
                                         let label = context.dataset.label || '';
                                         if (label) label += ': ';
@@ -969,18 +1134,251 @@ def generate_spa(data, last_update_str, warning_feries="", warning_budget="", wa
                         scales: scalesConfig
                     }}
                 }});
+                myChart.$isYearView = isYearView;
+                myChart.$longSeries = prepared.longSeries;
+            }}
+
+            // --- MODE PERFORMANCE ---
+            function setPerfMode(enabled) {{
+                PERF_MODE = enabled;
+                try {{ localStorage.setItem('perfMode', enabled ? '1' : '0'); }} catch (e) {{}}
+                document.getElementById('perf-timing').style.display = enabled ? 'inline' : 'none';
+                // Les options (animation, lissage) changent : on reconstruit au prochain rendu
+                if (myChart) {{ myChart.destroy(); myChart = null; }}
+                if (compChart) {{ compChart.destroy(); compChart = null; }}
+                if (document.getElementById('view-dashboard').classList.contains('active')) updateDashboard();
+                if (document.getElementById('view-comparison').classList.contains('active')) updateCompChart();
+            }}
+
+            // Mesure la latence d'un changement (calcul + rendu à la frame suivante)
+            function timeRender(label, fn) {{
+                const t0 = performance.now();
+                fn();
+                requestAnimationFrame(() => {{
+                    const elapsed = performance.now() - t0;
+                    if (PERF_MODE) {{
+                        document.getElementById('perf-timing').innerText = label + ' : ' + elapsed.toFixed(1) + ' ms';
+                    }}
+                }});
+            }}
+
+            // --- CACHE NAVIGATEUR (IndexedDB + Service Worker) ---
+            const IS_HTTP = window.location.protocol.startsWith('http');
+            const IDB_NAME = 'suivi-budget';
+            const IDB_STORE = 'payload';
+
+            function idbOpen() {{
+                return new Promise((resolve, reject) => {{
+                    const req = window.indexedDB.open(IDB_NAME, 1);
+                    req.onupgradeneeded = () => req.result.createObjectStore(IDB_STORE);
+                    req.onsuccess = () => resolve(req.result);
+                    req.onerror = () => reject(req.error);
+                }});
+            }}
+
+            function idbRequest(db, mode, fn) {{
+                return new Promise((resolve, reject) => {{
+                    const tx = db.transaction(IDB_STORE, mode);
+                    const req = fn(tx.objectStore(IDB_STORE));
+                    tx.oncomplete = () => resolve(req.result);
+                    tx.onerror = () => reject(tx.error);
+                }});
+            }}
+
+            // Sections "DB_DATA.2025" -> payload {{ DB_DATA: {{ "2025": ... }} }}
+            function splitSections(payload) {{
+                const sections = {{}};
+                Object.entries(payload).forEach(([name, value]) => {{
+                    if ({json_split_sections}.includes(name)) {{
+                        Object.entries(value).forEach(([key, sub]) => {{ sections[name + '.' + key] = sub; }});
+                    }} else {{
+                        sections[name] = value;
+                    }}
+                }});
+                return sections;
+            }}
+
+            function joinSections(manifest, sections) {{
+                const payload = {{ DB_DATA: {{}}, DB_DAILY_COMP: {{}}, DB_ROLLUPS: {{}}, DB_DRILLDOWN: {{}} }};
+                Object.keys(manifest.sections).forEach(name => {{
+                    const dot = name.indexOf('.');
+                    if (dot > 0) payload[name.slice(0, dot)][name.slice(dot + 1)] = sections[name];
+                    else payload[name] = sections[name];
+                }});
+                return payload;
+            }}
+
+            async function idbLoad() {{
+                const db = await idbOpen();
+                const manifest = await idbRequest(db, 'readonly', store => store.get('manifest'));
+                if (!manifest) return null;
+                const sections = {{}};
+                await Promise.all(Object.keys(manifest.sections).map(async name => {{
+                    sections[name] = await idbRequest(db, 'readonly', store => store.get('section:' + name));
+                }}));
+                return {{ manifest, sections }};
+            }}
+
+            async function idbSave(manifest, sections, changedNames) {{
+                const db = await idbOpen();
+                await idbRequest(db, 'readwrite', store => {{
+                    changedNames.forEach(name => store.put(sections[name], 'section:' + name));
+                    return store.put(manifest, 'manifest');
+                }});
+            }}
+
+            function applyPayload(manifest, payload) {{
+                DB_DATA = payload.DB_DATA;
+                DB_DAILY_COMP = payload.DB_DAILY_COMP;
+                DB_ROLLUPS = payload.DB_ROLLUPS;
+                DB_DRILLDOWN = payload.DB_DRILLDOWN;
+                currentManifest = manifest;
+                if (manifest.last_update) document.getElementById('last-update').innerText = manifest.last_update;
+                // Les séries préparées dépendent des données
+                Object.keys(PREPARED_CACHE).forEach(k => delete PREPARED_CACHE[k]);
+                Object.keys(COMP_CACHE).forEach(k => delete COMP_CACHE[k]);
+            }}
+
+            function inlinePayload() {{
+                return JSON.parse(document.getElementById('db-payload').textContent);
+            }}
+
+            // Ancienneté des instantanés du bandeau, calculée à l'affichage (le HTML ne change pas d'une exécution à l'autre)
+            function showCacheAges() {{
+                document.querySelectorAll('.cache-age').forEach(el => {{
+                    const minutes = Math.max(0, Math.floor((Date.now() - new Date(el.dataset.savedAt)) / 60000));
+                    const age = minutes < 60 ? minutes + ' min' : minutes < 1440 ? Math.floor(minutes / 60) + ' h' : Math.floor(minutes / 1440) + ' j';
+                    el.textContent = '(il y a ' + age + ')';
+                }});
+            }}
+
+            function startApp() {{
+                showCacheAges();
+                const dimSelect = document.getElementById('drilldown-dim');
+                dimSelect.innerHTML = '';
+                Object.keys(DB_DRILLDOWN).forEach(dim => {{
+                    const opt = document.createElement('option');
+                    opt.value = dim;
+                    opt.innerText = DB_DRILLDOWN[dim].label;
+                    dimSelect.appendChild(opt);
+                }});
+
+                if (document.getElementById('view-dashboard').classList.contains('active') && DB_DATA[currentYear]) {{
+                    selectGranularity(currentGranularity);
+                }} else if (document.getElementById('view-comparison').classList.contains('active')) {{
+                    initComparison();
+                }}
+                initHome();
+            }}
+
+            let currentManifest = null;
+
+            // Démarrage : la version la plus récente entre le cache local et la page
+            async function boot() {{
+                if (!window.indexedDB) {{
+                    applyPayload(DATA_MANIFEST, inlinePayload());
+                    startApp();
+                    return;
+                }}
+                let local = null;
+                try {{ local = await idbLoad(); }} catch (e) {{}}
+                if (local && local.manifest.generated >= DATA_MANIFEST.generated) {{
+                    // Rendu immédiat depuis le cache : pas de re-parse du JSON embarqué
+                    applyPayload(local.manifest, joinSections(local.manifest, local.sections));
+                }} else {{
+                    const payload = inlinePayload();
+                    applyPayload(DATA_MANIFEST, payload);
+                    const sections = splitSections(payload);
+                    idbSave(DATA_MANIFEST, sections, Object.keys(sections)).catch(() => {{}});
+                }}
+                startApp();
+
+                if (IS_HTTP) {{
+                    if ('serviceWorker' in navigator) navigator.serviceWorker.register('{spa_cache.SERVICE_WORKER_FILE}').catch(() => {{}});
+                    checkForNewVersion();
+                }}
+            }}
+
+            // Servi en HTTP : manifeste distant (quelques Ko), puis seulement les sections modifiées
+            async function checkForNewVersion() {{
+                let remote;
+                try {{
+                    remote = await (await fetch('{spa_cache.VERSION_FILE}', {{ cache: 'no-store' }})).json();
+                }} catch (e) {{ return; }}
+                if (!remote) return;
+                // Données et shell (bandeaux, panneau qualité, code) sont versionnés séparément
+                const dataChanged = remote.version !== currentManifest.version;
+                const shellChanged = remote.shell !== DATA_MANIFEST.shell;
+                if (!dataChanged && !shellChanged) return;
+
+                if (dataChanged) {{
+                    const current = splitSections({{ DB_DATA, DB_DAILY_COMP, DB_ROLLUPS, DB_DRILLDOWN }});
+                    const changed = Object.keys(remote.sections).filter(name => currentManifest.sections[name] !== remote.sections[name]);
+                    try {{
+                        await Promise.all(changed.map(async name => {{
+                            const resp = await fetch('{spa_cache.DATA_DIR}/' + name + '.json', {{ cache: 'no-store' }});
+                            current[name] = await resp.json();
+                        }}));
+                    }} catch (e) {{ return; }}
+
+                    applyPayload(remote, joinSections(remote, current));
+                    startApp();
+                    if (window.indexedDB) idbSave(remote, current, changed).catch(() => {{}});
+                }}
+                // Le shell en cache embarque l'ancienne version : le Service Worker le recharge
+                if (shellChanged && navigator.serviceWorker && navigator.serviceWorker.controller) {{
+                    navigator.serviceWorker.controller.postMessage({{ type: 'refresh-shell', url: window.location.href }});
+                }}
             }}
 
             // Start
-            initHome();
+            Object.entries(GRANULARITIES).forEach(([gran, label]) => {{
+                const opt = document.createElement('option');
+                opt.value = gran;
+                opt.innerText = label;
+                document.getElementById('granularity-selector').appendChild(opt);
+            }});
+            document.getElementById('perf-toggle').checked = PERF_MODE;
+            document.getElementById('perf-timing').style.display = PERF_MODE ? 'inline' : 'none';
+            initMetricRows();
+            boot();
         </script>
     </body>
     </html>
     """
     
-    with open("dashboard_dynamique.html", "w", encoding='utf-8') as f:
-        f.write(html_content)
-    print("Fichier généré: dashboard_dynamique.html")
+    # Version du shell = page sans les données ; permet au navigateur de savoir si le shell en cache est périmé
+    manifest["shell"] = spa_cache.shell_version(html_content)
+    manifest["content"] = spa_cache.content_hash(manifest)
+    html_content = spa_cache.fill_placeholders(html_content, payload, manifest)
+
+    timings = dict(timings or {}, render_s=round(time.perf_counter() - t_render, 3))
+    publish.publish(html_content, sections, manifest, timings, force=force)
 
 if __name__ == "__main__":
-    analyze()
+    # Exécutable PyInstaller (Windows) : les processus du pool relancent l'exécutable
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Génère le dashboard de suivi budgétaire")
+    parser.add_argument("--export", default="", metavar="FORMATS",
+                        help="Exporte aussi les agrégats : formats séparés par des virgules (csv,parquet,xlsx)")
+    parser.add_argument("--export-dir", default="exports", help="Dossier de sortie des exports (défaut : exports)")
+    parser.add_argument("--fiscal-start", type=int, default=1, choices=range(1, 13), metavar="MOIS",
+                        help="Mois de début de l'exercice fiscal (1-12, défaut : 1 = janvier)")
+    parser.add_argument("--force", action="store_true",
+                        help="Réécrit le dashboard même si son contenu n'a pas changé")
+    parser.add_argument("--phasage", default=phasing.DEFAULT_PROFILE, choices=list(phasing.PROFILES),
+                        help="Profil de phasage du budget pour les années absentes de la feuille Phasage (défaut : uniforme)")
+    parser.add_argument("--ingest", nargs="?", const=ingest.STORE_DIR, default=None, metavar="DOSSIER",
+                        help="Mode incrémental : intègre les fichiers delta de l'inbox du partage dans l'historique "
+                             f"local (défaut : {ingest.STORE_DIR}) au lieu de relire resultat.xls")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="Processus pour le calcul des entrées mensuelles (0 = un par cœur, défaut : 1 = séquentiel ; "
+                             "expérimental, gain non mesuré sur machine multicœur)")
+    args = parser.parse_args()
+
+    try:
+        formats = export_data.parse_formats(args.export)
+    except ValueError as e:
+        parser.error(str(e))
+    analyze(export_formats=formats, export_dir=args.export_dir, fiscal_start_month=args.fiscal_start, force_publish=args.force,
+            phasing_profile=args.phasage, store_dir=args.ingest, workers=args.workers)
@@ -0,0 +1,671 @@
+"""
+API du suivi budgétaire, utilisable sans générer le dashboard (outils de reporting,
+intranet...) :
+
+    import budget_model
+    model = budget_model.get_model()            # en cache tant que les sources n'ont pas changé
+    mars = model.month(2025, 3)
+    mars.budget, mars.realise, mars.taux_realisation, mars.metrics["commandes"]
+    model.year(2025), model.period("quarter", "2025-T1"), model.daily(2025, 3)
+
+- load_sources(share_dir)   : lecture résiliente des trois fichiers (ou historique incrémental,
+                              ingest.py) + contrôles -> Sources
+- build_model(sources, ...) : calcul complet (indicateurs, phasage, scénarios, agrégats) -> BudgetModel
+- get_model(...)            : les deux, avec un cache LRU en mémoire indexé par l'empreinte
+                              des sources (taille + date de modification de chaque fichier)
+
+analyze_budget.py utilise la même API puis génère le HTML et les exports.
+"""
+import time
+import threading
+from concurrent.futures import Future
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import network_io
+import common
+import validation
+import metrics
+import rollups
+import cube
+import feries
+import phasing
+import scenarios
+import ingest
+import parallel
+
+SOURCE_FILES = ("Feries.xlsx", "Budget.xlsx", "resultat.xls")
+CACHE_SIZE = 8
+# Durée pendant laquelle l'empreinte des sources est réutilisée sans nouvel os.stat sur le partage
+FINGERPRINT_TTL = 5.0
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+def align_on_working_days(daily_values, working_mask, n_days=None):
+    """
+    Cumul journalier réindexé par jour ouvré : la valeur k est le cumul à la fin
+    du (k+1)-ième jour ouvré du mois. Les montants saisis un jour non ouvré sont
+    rattachés au jour ouvré précédent (ou au premier jour ouvré du mois).
+    n_days limite le calcul aux n premiers jours (mois en cours).
+    """
+    values = np.asarray(daily_values, dtype=float)[:n_days]
+    mask = np.asarray(working_mask, dtype=bool)[:n_days]
+    nb_working = int(mask.sum())
+    if nb_working == 0:
+        return []
+    wd_index = np.maximum(np.cumsum(mask), 1) - 1
+    per_working_day = np.bincount(wd_index, weights=values, minlength=nb_working)
+    return np.round(np.cumsum(per_working_day), 2).tolist()
+
+
+# ---------------------------------------------------------
+# RESULTATS TYPES
+# ---------------------------------------------------------
+@dataclass(frozen=True, eq=False)
+class Sources:
+    """Sources lues et contrôlées, prêtes pour build_model."""
+    share_dir: str
+    fingerprint: tuple
+    feries_overrides: dict
+    budget_scenarios: list          # [(nom, DataFrame)], référence en tête
+    phasing_config: dict
+    df_res: pd.DataFrame
+    dimensions: list
+    warnings: dict                  # {"feries", "budget", "results"} : messages du bandeau
+    findings: list                  # constats de qualité (validation.finding)
+
+    @property
+    def df_budget(self):
+        return self.budget_scenarios[0][1] if self.budget_scenarios else pd.DataFrame()
+
+
+@dataclass(frozen=True)
+class PeriodResult:
+    """Totaux d'une période (mois, année entière, semaine, trimestre, exercice)."""
+    key: str
+    label: str
+    budget: float
+    jours_ouvres: int
+    metrics: dict                   # clé indicateur -> total
+    scenarios: dict = field(default_factory=dict)  # clé scénario -> budget (scénarios couvrant la période)
+
+    @property
+    def realise(self):
+        return self.metrics[metrics.primary_metric()["key"]]
+
+    @property
+    def ecart(self):
+        return self.realise - self.budget
+
+    @property
+    def taux_realisation(self):
+        return self.realise / self.budget if self.budget else None
+
+
+def _period_result(key, label, entry):
+    return PeriodResult(
+        key=key,
+        label=label,
+        budget=float(entry["budget"]),
+        jours_ouvres=int(entry["jours_ouvres"]),
+        metrics={m["key"]: float(entry[m["key"]]) for m in metrics.METRICS},
+        scenarios={k: v["budget"] for k, v in entry.get("scenarios", {}).items()},
+    )
+
+
+MONTH_LABELS = ["Année Entière", "Janvier", "Février", "Mars", "Avril", "Mai", "Juin", "Juillet",
+                "Août", "Septembre", "Octobre", "Novembre", "Décembre"]
+
+
+@dataclass(eq=False)
+class BudgetModel:
+    """
+    Résultat complet d'un calcul. Les attributs data / daily_comp / rollups /
+    drilldown sont les structures injectées dans le dashboard ; month(), year(),
+    period() et daily() en donnent une vue typée.
+    """
+    sources: Sources
+    data: dict                      # DATA[annee][mois] (mois "0" = année entière)
+    daily_comp: dict                # DAILY_COMP[mois] = {"n", "years": {annee: [cumuls]}}
+    rollups: dict                   # granularité -> clé de période -> entrée
+    drilldown: dict
+    cubes: dict
+    findings: list                  # constats de qualité (sources + calcul)
+    warnings: dict                  # messages du bandeau
+    last_update: str
+    max_date: object                # pd.Timestamp ou None si aucun résultat
+    feries_dates: set
+    scenario_names: list            # référence en tête
+    sorted_periods: list            # [(annee, mois)]
+    days: pd.DatetimeIndex          # calendrier journalier de toutes les périodes
+    bounds: np.ndarray              # bornes des périodes dans days
+    values: np.ndarray              # matrice (jours x indicateurs)
+    working: np.ndarray
+    budget_daily: np.ndarray
+    budget_cumul: np.ndarray
+    fiscal_start_month: int
+    phasing_profile: str
+
+    @property
+    def years(self):
+        return sorted(int(y) for y in self.data)
+
+    @property
+    def periods(self):
+        """Périodes (annee, mois) calculées, triées."""
+        return list(self.sorted_periods)
+
+    def month(self, year, month):
+        year, month = int(year), int(month)
+        try:
+            entry = self.data[str(year)][str(month)]
+        except KeyError:
+            raise KeyError(f"Période absente des données : {month:02d}/{year}") from None
+        return _period_result(f"{year}-{month}", f"{MONTH_LABELS[month]} {year}", entry)
+
+    def year(self, year):
+        return self.month(year, 0)
+
+    def period(self, granularity, key):
+        """Période agrégée : granularity parmi rollups.GRANULARITIES, clé "2025-W07", "2025-T1", "FY2025"."""
+        try:
+            entry = self.rollups[granularity][key]
+        except KeyError:
+            raise KeyError(f"Période absente des données : {granularity} {key}") from None
+        return _period_result(key, entry["label"], entry)
+
+    def daily_frame(self, rows=slice(None)):
+        """Faits journaliers (un jour par ligne) : montants, jour ouvré, budget du jour et cumulé."""
+        days = self.days[rows]
+        frame = pd.DataFrame(self.values[rows], index=days, columns=[m["export_name"] for m in metrics.METRICS])
+        frame.insert(0, "annee", days.year)
+        frame.insert(1, "mois", days.month)
+        frame["jour_ouvre"] = self.working[rows]
+        frame["budget_jour"] = self.budget_daily[rows]
+        frame["budget_cumule"] = self.budget_cumul[rows]
+        return frame
+
+    def daily(self, year, month):
+        """Faits journaliers d'un mois (seules les lignes du mois sont construites)."""
+        try:
+            p = self.sorted_periods.index((int(year), int(month)))
+        except ValueError:
+            raise KeyError(f"Période absente des données : {month}/{year}") from None
+        return self.daily_frame(slice(self.bounds[p], self.bounds[p + 1]))
+
+
+# ---------------------------------------------------------
+# CHARGEMENT
+# ---------------------------------------------------------
+def source_paths(share_dir=None):
+    return [network_io.share_path(name, share_dir) for name in SOURCE_FILES]
+
+
+def fingerprint(probes):
+    """Empreinte des sources : (nom, taille, date de modification) de chaque fichier sondé."""
+    return tuple((path, probe["size"], probe["mtime"]) for path, probe in probes.items())
+
+
+def _ingest_results(store_dir, share_dir, log):
+    """
+    Intègre l'inbox dans l'historique puis le relit : (df_res brut, dimensions, constats, bandeau).
+    Une inbox injoignable ou une intégration interrompue n'empêchent pas la relecture de l'historique.
+    """
+    findings = []
+    warning = ""
+    try:
+        summary = ingest.ingest_inbox(store_dir, ingest.inbox_path(share_dir), log)
+    except Exception as e:
+        log(f"Erreur intégration inbox ({store_dir}): {e}")
+        summary = {"files": [], "errors": [], "inbox_error": str(e)}
+    if summary["inbox_error"]:
+        warning = (f"⚠️ Attention : fichiers delta non intégrés ({summary['inbox_error']}) : "
+                   f"historique local affiché sans les derniers dépôts")
+    if summary["files"]:
+        findings.append(validation.finding("Résultats", "deltas_integres", "info", len(summary["files"]),
+                                           f"Fichiers delta intégrés ({summary['rows']} ligne(s), "
+                                           f"mois {', '.join(summary['months']) or '-'})", summary["files"]))
+    if summary["errors"]:
+        findings.append(validation.finding("Résultats", "deltas_illisibles", "error", len(summary["errors"]),
+                                           "Fichiers delta non intégrés (réessayés à la prochaine exécution)",
+                                           summary["errors"]))
+    # Dates et montants illisibles : contrôlés à la lecture de chaque fichier (l'historique est déjà converti)
+    findings += ingest.recorded_findings(store_dir)
+    df_res, dimensions = ingest.load_store(store_dir)
+    log(f"Historique {store_dir}: {len(ingest.store_months(store_dir))} mois")
+    return df_res, dimensions, findings, warning
+
+
+def load_sources(share_dir=None, verbose=True, store_dir=None):
+    """
+    store_dir : historique local des résultats (ingest.py). Si fourni, les fichiers
+    delta de l'inbox y sont intégrés et resultat.xls n'est lu que pour l'initialiser.
+    """
+    log = print if verbose else _silent
+    feries_path, budget_path, results_path = source_paths(share_dir)
+
+    # Sonde concurrente : un partage injoignable est détecté en quelques secondes
+    # au lieu d'attendre le timeout système sur chaque lecture
+    probes = network_io.probe_sources([feries_path, budget_path, results_path])
+    for path, probe in probes.items():
+        status = f"{probe['size']} octets" if probe["exists"] else f"INDISPONIBLE ({probe['error']})"
+        log(f"Sonde {path}: {status}")
+
+    # ---------------------------------------------------------
+    # 1. CHARGEMENT FERIES
+    # ---------------------------------------------------------
+    # Les jours fériés légaux sont calculés (feries.py) ; Feries.xlsx ne fournit
+    # que les surcharges : ponts, fermetures, fériés travaillés, régime
+    feries_overrides = feries.no_overrides()
+    warning_feries = ""
+
+    try:
+        # Lecture avec timeout/reprises, repli sur l'instantané local si le partage ne répond pas
+        df_feries, info = network_io.read_excel_resilient(feries_path, probe=probes[feries_path], log=log)
+        warning_feries = network_io.fallback_warning("Feries", info)
+        feries_overrides = feries.parse_overrides(df_feries)
+        log(f"Surcharges fériés chargées: {len(feries_overrides['added'])} date(s), "
+            f"{len(feries_overrides['removed'])} retrait(s), régime {feries_overrides['regime']}, "
+            f"repos hebdomadaire {feries_overrides['weekmask']}")
+
+    except Exception as e:
+        log(f"Erreur Feries ({feries_path}): {e}")
+        warning_feries = (f"⚠️ Attention : Erreur lors de la lecture du fichier Feries : {e} "
+                          f"(jours fériés légaux calculés, ponts et fermetures non pris en compte)")
+
+    # ---------------------------------------------------------
+    # 2. CHARGEMENT BUDGET
+    # ---------------------------------------------------------
+    # Versions du budget : [(nom, DataFrame)], la première est la référence
+    budget_scenarios = []
+    warning_budget = ""
+    # Profils de phasage par année (feuille "Phasage" facultative)
+    phasing_config = {}
+    # Constats de qualité des données (panneau dédié du dashboard)
+    quality_findings = [validation.finding("Feries", "regime_invalide", "error", 1, message)
+                        for message in feries_overrides["errors"]]
+
+    try:
+        # Toutes les feuilles en une lecture : la première porte le budget (et une éventuelle
+        # colonne de scénario), les feuilles "Scénario <nom>" des scénarios, "Phasage" les profils
+        sheets, info = network_io.read_excel_resilient(budget_path, probe=probes[budget_path], header=None, sheet_name=None, log=log)
+        warning_budget = network_io.fallback_warning("Budget", info)
+        for name, sheet in sheets.items():
+            if common.normalize_label(name) == phasing.CONFIG_SHEET and not sheet.empty:
+                phasing_config, findings = phasing.parse_config(sheet.iloc[1:].set_axis(sheet.iloc[0].tolist(), axis=1).reset_index(drop=True))
+                quality_findings += findings
+        for name, df_raw in scenarios.split_sheets(sheets):
+            # Conversion + contrôle (remplace le try/except silencieux ligne à ligne)
+            source = "Budget" if not budget_scenarios else f"Budget ({name})"
+            df_scenario, findings = validation.prepare_budget(df_raw, source)
+            quality_findings += findings
+            if budget_scenarios and df_scenario.empty:
+                # Scénario sans ligne de budget exploitable (constats ci-dessus) : non superposé
+                continue
+            budget_scenarios.append((name, df_scenario))
+        log(f"Lignes Budget chargées: {len(budget_scenarios[0][1])}")
+        if len(budget_scenarios) > 1:
+            log(f"Scénarios budgétaires: {', '.join(name for name, _ in budget_scenarios)}")
+    except Exception as e:
+        log(f"Erreur Budget ({budget_path}): {e}")
+        warning_budget = f"⚠️ Attention : Erreur lors de la lecture du fichier Budget : {e}"
+
+    # ---------------------------------------------------------
+    # 3. CHARGEMENT RESULTATS
+    # ---------------------------------------------------------
+    # Colonnes : A=Date, B=Ignore, C=Cmd (cacdej), D=Exp (caexpj), E=Prod (caprodj)
+    df_res = pd.DataFrame()
+    warning_results = ""
+    dimensions = []
+
+    try:
+        if store_dir and ingest.store_months(store_dir):
+            # Mode incrémental : historique local + fichiers delta de l'inbox, resultat.xls n'est pas relu
+            df_res, dimensions, findings, warning_results = _ingest_results(store_dir, share_dir, log)
+            quality_findings += findings
+        else:
+            # On lit toutes les colonnes : A:E déclarées dans le registre des indicateurs,
+            # plus les éventuelles colonnes de dimension (client, produit, site...) reconnues par leur en-tête.
+            # On suppose qu'il y a une ligne d'en-tête, donc header=0.
+            df_res, info = network_io.read_excel_resilient(results_path, probe=probes[results_path], header=0, log=log)
+            warning_results = network_io.fallback_warning("Résultats", info)
+            if store_dir:
+                # Historique vide : initialisé une fois avec resultat.xls complet, puis deltas
+                rows, findings = ingest.normalize_rows(df_res, SOURCE_FILES[2])
+                seeded = ingest.seed_store(store_dir, rows, findings, SOURCE_FILES[2])
+                log(f"Historique initialisé: {store_dir} ({len(seeded)} mois)")
+                df_res, dimensions, findings, warning = _ingest_results(store_dir, share_dir, log)
+                warning_results = "<br>".join(w for w in (warning_results, warning) if w)
+                quality_findings += findings
+            else:
+                # Renommage des colonnes du registre, colonne B supprimée sauf si c'est une dimension
+                df_res, dimensions = cube.split_result_columns(df_res)
+        if dimensions:
+            log(f"Dimensions détectées: {dimensions}")
+
+        # Conversion dates/montants + contrôles qualité (les lignes sans date valide sont écartées)
+        df_res, findings = validation.prepare_results(df_res, feries_overrides)
+        quality_findings += findings
+
+        log(f"Lignes Résultats chargées: {len(df_res)}")
+        if not df_res.empty:
+            log(f"Aperçu dates: du {df_res['datj'].min()} au {df_res['datj'].max()}")
+
+    except Exception as e:
+        log(f"Erreur Résultats ({results_path}): {e}")
+        warning_results = f"⚠️ Attention : Erreur lors de la lecture du fichier Résultats : {e}"
+
+    df_budget = budget_scenarios[0][1] if budget_scenarios else pd.DataFrame()
+    quality_findings += validation.check_coverage(df_budget, df_res)
+    if verbose:
+        validation.print_report(quality_findings)
+
+    fp = fingerprint(probes)
+    if store_dir:
+        fp += (ingest.inbox_fingerprint(ingest.inbox_path(share_dir)),)
+    return Sources(
+        share_dir=share_dir or network_io.SHARE_DIR,
+        fingerprint=fp,
+        feries_overrides=feries_overrides,
+        budget_scenarios=budget_scenarios,
+        phasing_config=phasing_config,
+        df_res=df_res,
+        dimensions=dimensions,
+        warnings={"feries": warning_feries, "budget": warning_budget, "results": warning_results},
+        findings=quality_findings,
+    )
+
+
+# ---------------------------------------------------------
+# CALCUL
+# ---------------------------------------------------------
+def _month_entries(ctx, start, stop):
+    """
+    Entrées mensuelles des périodes [start, stop) : [(entrée GLOBAL_DATA, trajectoire alignée ou None)].
+    ctx : tableaux journaliers (lecture seule) et paramètres de build_model ; exécutable dans un autre processus.
+    """
+    bounds = ctx["bounds"]
+    max_date = ctx["max_date"]
+    primary_idx = ctx["primary_idx"]
+    scenario_keys = ctx["scenario_keys"]
+    results = []
+    for p in range(start, stop):
+        year, month = ctx["periods"][p]
+        days = slice(bounds[p], bounds[p + 1])
+        month_days = pd.DatetimeIndex(ctx["days"][days])
+        start_date = month_days[0]
+        end_date = month_days[-1]
+
+        # --- A. RECUPERATION BUDGET ---
+        budget_val = ctx["budget_by_period"].get((year, month), 0)
+
+        # --- B. JOURS OUVRES ET BUDGET CUMULÉ ---
+        working_mask = ctx["working"][days]
+        jours_ouvres = int(working_mask.sum())
+
+        # Courbe de budget cumulé phasée (le budget n'avance que les jours ouvrés)
+        budget_curve = ctx["budget_cumul"][days]
+
+        # --- C. TRAJECTOIRE ALIGNEE PAR JOUR OUVRE (comparaison pluriannuelle) ---
+        aligned = None
+        if (year, month) in ctx["result_periods"]:
+            # Mois en cours : on s'arrête au dernier jour disponible
+            n_days = None
+            if max_date is not None and max_date < end_date:
+                n_days = (max_date.normalize() - start_date).days + 1
+            aligned = align_on_working_days(ctx["values"][days, primary_idx], working_mask, n_days)
+
+        # --- D. PREPARATION JSON LEGER ---
+        # On ne stocke que les listes pour les charts et les scalaires
+        entry = {
+            "budget": budget_val,
+            "jours_ouvres": jours_ouvres,
+            "chart_labels": [d.strftime('%d/%m') for d in month_days],
+            "chart_budget_trend": budget_curve.tolist()
+        }
+        entry.update(metrics.period_entry(ctx["totals"][p], ctx["cumuls"][days], metrics.METRICS))
+        if scenario_keys:
+            entry["scenarios"] = scenarios.entries(scenario_keys, ctx["scenario_budgets"][:, p],
+                                                   ctx["scenario_cumul"][:, days], ctx["scenario_covered"][:, p])
+        results.append((entry, aligned))
+    return results
+
+
+def build_model(sources, fiscal_start_month=1, phasing_profile=phasing.DEFAULT_PROFILE, verbose=True, workers=1):
+    log = print if verbose else _silent
+    df_res = sources.df_res
+    df_budget = sources.df_budget
+    budget_scenarios = sources.budget_scenarios
+    quality_findings = list(sources.findings)
+
+    # Structure de données finale : DATA[annee][mois] = { ... données ... }
+    GLOBAL_DATA = {}
+    # Comparaison journalière : DAILY_COMP[mois] = { "n": nb max jours ouvrés, "years": { annee: [cumuls] } }
+    DAILY_COMP = {}
+
+    # Calcul date max (Mise à jour)
+    last_update_str = "Inconnue"
+    max_date = None
+    if not df_res.empty:
+        max_date = df_res['datj'].max()
+        last_update_str = max_date.strftime("%d/%m/%Y")
+
+    # Identification de toutes les années/mois uniques présents dans Budget OU Résultats
+    # Set de tuples (annee, mois)
+    all_periods = set()
+
+    # Périodes du Budget (tous scénarios)
+    for _, df_scenario in budget_scenarios:
+        all_periods.update(zip(df_scenario['Annee'], df_scenario['MoisNum']))
+
+    # Périodes des Résultats
+    result_periods = set()
+    if not df_res.empty:
+        result_periods = set(zip(df_res['datj'].dt.year, df_res['datj'].dt.month))
+        all_periods.update(result_periods)
+
+    sorted_periods = sorted(list(all_periods))
+    log(f"Périodes identifiées (Année, Mois): {sorted_periods}")
+
+    # Budget indexé par (annee, mois)
+    budget_by_period = {}
+    if not df_budget.empty:
+        budget_by_period = dict(zip(zip(df_budget['Annee'], df_budget['MoisNum']), df_budget['Budget'].astype(float)))
+
+    # Calendrier des jours fériés des années couvertes (calculé + surcharges)
+    feries_dates = feries.holiday_dates({y for y, _ in sorted_periods}, sources.feries_overrides)
+    log(f"Jours fériés / non ouvrés: {len(feries_dates)}")
+
+    # --- MOTEUR INDICATEURS : un seul passage vectorisé sur la matrice (jours x indicateurs) ---
+    calendar_days, bounds = metrics.build_calendar(sorted_periods)
+    values = metrics.daily_matrix(df_res, calendar_days, metrics.METRICS)
+    cumuls, totals = metrics.aggregate_periods(values, bounds, metrics.METRICS)
+    # Jours de repos hebdomadaire (samedi et dimanche par défaut, colonne "régime" de Feries.xlsx)
+    working_all = ~feries.is_rest_day(calendar_days.weekday, sources.feries_overrides) & ~calendar_days.isin(pd.DatetimeIndex(sorted(feries_dates)))
+    primary_idx = metrics.METRICS.index(metrics.primary_metric())
+    # Budgets (scénarios x périodes) : ligne 0 = référence
+    scenario_names = [name for name, _ in budget_scenarios] or [scenarios.REFERENCE_NAME]
+    scenario_keys = [s["key"] for s in scenarios.public_list(scenario_names)]
+    budget_matrix, scenario_covered = scenarios.budget_matrix([df for _, df in budget_scenarios] or [df_budget], sorted_periods)
+    period_budgets = budget_matrix[0]
+    period_jours = np.zeros(len(sorted_periods), dtype=int)
+
+    # --- PHASAGE DU BUDGET : tous les mois et tous les scénarios en un passage (profil choisi par année) ---
+    period_years = np.array([y for y, _ in sorted_periods], dtype=int)
+    # Mois complets (résultats jusqu'à la fin du mois) : base d'apprentissage du profil "historique"
+    complete = np.array([p in result_periods and max_date is not None and max_date >= pd.Timestamp(p[0], p[1], 1) + pd.offsets.MonthEnd(0)
+                         for p in sorted_periods], dtype=bool)
+    scenario_daily, scenario_cumul = phasing.phase_budget(
+        calendar_days, working_all, bounds, budget_matrix, period_years, sources.phasing_config, phasing_profile,
+        history_values=values[:, primary_idx], complete=complete)
+    budget_daily_all, budget_cumul_all = scenario_daily[0], scenario_cumul[0]
+    if sources.phasing_config or phasing_profile != phasing.DEFAULT_PROFILE:
+        quality_findings.append(phasing.describe(sources.phasing_config, set(period_years.tolist()), phasing_profile))
+
+    # --- A-D. ENTREES MENSUELLES : tranches de périodes indépendantes, éventuellement réparties sur
+    # plusieurs processus (entrées partagées en lecture seule, fusion dans l'ordre chronologique) ---
+    month_arrays = {
+        "days": calendar_days.to_numpy(),
+        "bounds": bounds,
+        "values": values,
+        "cumuls": cumuls,
+        "totals": totals,
+        "working": working_all,
+        "budget_cumul": budget_cumul_all,
+        "scenario_budgets": budget_matrix[1:],
+        "scenario_cumul": scenario_cumul[1:],
+        "scenario_covered": scenario_covered[1:],
+    }
+    month_params = {
+        "periods": sorted_periods,
+        "budget_by_period": budget_by_period,
+        "result_periods": result_periods,
+        "max_date": max_date,
+        "primary_idx": primary_idx,
+        "scenario_keys": scenario_keys,
+    }
+    t_months = time.perf_counter()
+    n_tasks = parallel.task_count(len(sorted_periods), workers)
+    month_results = parallel.map_chunks(_month_entries, month_arrays, month_params, len(sorted_periods), n_tasks)
+    if n_tasks > 1:
+        log(f"Entrées mensuelles: {len(sorted_periods)} périodes, {n_tasks} processus "
+            f"({time.perf_counter() - t_months:.2f} s)")
+
+    for p, ((year, month), (entry, aligned)) in enumerate(zip(sorted_periods, month_results)):
+        year_str = str(year)
+        month_str = str(month)
+        GLOBAL_DATA.setdefault(year_str, {})[month_str] = entry
+        period_jours[p] = entry["jours_ouvres"]
+        if aligned:
+            comp = DAILY_COMP.setdefault(month_str, {"n": 0, "years": {}})
+            comp["years"][year_str] = aligned
+            comp["n"] = max(comp["n"], len(aligned))
+
+    # --- E. AGREGATIONS ANNEE / SEMAINE ISO / TRIMESTRE / EXERCICE FISCAL (un seul passage) ---
+    # Couverture des scénarios diffusée sur les jours (un scénario peut ne porter que certaines années)
+    day_periods = np.repeat(np.arange(len(sorted_periods)), np.diff(bounds))
+    rollup_result = rollups.compute(calendar_days, values, working_all, scenario_daily, fiscal_start_month, metrics.METRICS,
+                                    scenario_covered[1:, day_periods])
+    for year_str, entry in rollups.annual_entries(rollup_result, sorted_periods, totals, period_budgets, period_jours, metrics.METRICS,
+                                                  budget_matrix[1:], scenario_keys, scenario_covered[1:]).items():
+        GLOBAL_DATA[year_str]["0"] = entry
+    ROLLUPS = rollups.period_tree(rollup_result, fiscal_start_month, metrics.METRICS, scenario_keys)
+
+    # --- F. CUBE DIMENSIONNEL (jour x membre x indicateur) + TOP MEMBRES PAR PERIODE ---
+    cubes = cube.build_cubes(df_res, sources.dimensions, metrics.METRICS, verbose)
+    DRILLDOWN = cube.drilldown_payload(cubes, sorted_periods, metrics.METRICS)
+
+    return BudgetModel(
+        sources,
+        data=GLOBAL_DATA,
+        daily_comp=DAILY_COMP,
+        rollups=ROLLUPS,
+        drilldown=DRILLDOWN,
+        cubes=cubes,
+        findings=quality_findings,
+        warnings=dict(sources.warnings),
+        last_update=last_update_str,
+        max_date=max_date,
+        feries_dates=feries_dates,
+        scenario_names=scenario_names,
+        sorted_periods=sorted_periods,
+        days=calendar_days,
+        bounds=bounds,
+        values=values,
+        working=working_all,
+        budget_daily=budget_daily_all,
+        budget_cumul=budget_cumul_all,
+        fiscal_start_month=fiscal_start_month,
+        phasing_profile=phasing_profile,
+    )
+
+
+# ---------------------------------------------------------
+# CACHE EN MEMOIRE (services longue durée)
+# ---------------------------------------------------------
+_cache = OrderedDict()          # (empreinte, paramètres) -> BudgetModel, ordre = dernier accès
+_last_probe = {}                # (share_dir, store_dir) -> (instant, empreinte)
+_building = {}                  # (empreinte, paramètres) -> Future du calcul en cours
+# Protège uniquement les dictionnaires ci-dessus : sondes, lectures et calculs se font hors verrou
+_lock = threading.Lock()
+
+
+def _probe(share_dir, store_dir):
+    fp = fingerprint(network_io.probe_sources(source_paths(share_dir)))
+    if store_dir:
+        fp += (ingest.inbox_fingerprint(ingest.inbox_path(share_dir)),)
+    return fp
+
+
+def _cached(key):
+    """Modèle en cache (à appeler sous _lock)."""
+    model = _cache.get(key)
+    if model is not None:
+        _cache.move_to_end(key)
+    return model
+
+
+def get_model(share_dir=None, fiscal_start_month=1, phasing_profile=phasing.DEFAULT_PROFILE,
+              ttl=FINGERPRINT_TTL, verbose=False, store_dir=None, workers=1):
+    """
+    Modèle en cache si les sources n'ont pas changé depuis le dernier calcul.
+    Pendant `ttl` secondes l'empreinte précédente est réutilisée sans toucher au
+    partage : un appel en cache ne coûte qu'une recherche dans un dictionnaire.
+    Le verrou n'est jamais tenu pendant une sonde, une lecture ou un calcul : un
+    calcul à froid ne bloque que les appels qui attendent ce même modèle (ils
+    partagent son résultat au lieu de le recalculer).
+    """
+    params = (fiscal_start_month, phasing_profile, store_dir)
+    source_key = (share_dir, store_dir)
+    with _lock:
+        probed = _last_probe.get(source_key)
+        fp = probed[1] if probed and time.monotonic() - probed[0] < ttl else None
+        model = _cached((fp, params)) if fp is not None else None
+    if model is not None:
+        return model
+
+    if fp is None:
+        fp = _probe(share_dir, store_dir)
+        with _lock:
+            _last_probe[source_key] = (time.monotonic(), fp)
+
+    key = (fp, params)
+    with _lock:
+        model = _cached(key)
+        if model is not None:
+            return model
+        future = _building.get(key)
+        owner = future is None
+        if owner:
+            future = _building[key] = Future()
+    if not owner:
+        return future.result()
+
+    try:
+        sources = load_sources(share_dir, verbose, store_dir)
+        model = build_model(sources, fiscal_start_month, phasing_profile, verbose, workers)
+    except BaseException as e:
+        with _lock:
+            _building.pop(key, None)
+        future.set_exception(e)
+        raise
+    with _lock:
+        _cache[(sources.fingerprint, params)] = model
+        _last_probe[source_key] = (time.monotonic(), sources.fingerprint)
+        _building.pop(key, None)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    future.set_result(model)
+    return model
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _last_probe.clear()
@@ -0,0 +1,26 @@
+"""
+Petits utilitaires partagés par les modules de lecture et de contrôle des sources.
+
+- normalize_label : en-têtes, noms de feuilles, profils et marqueurs comparés
+  sans casse, sans accents, espaces remplacés par "_"
+- finding         : constat de qualité des données (panneau "Qualité des données")
+"""
+import unicodedata
+
+MAX_EXAMPLES = 5
+
+
+def normalize_label(value):
+    text = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode()
+    return "_".join(text.strip().lower().split())
+
+
+def finding(source, check, severity, count, message, examples=None):
+    return {
+        "source": source,
+        "check": check,
+        "severity": severity,
+        "count": int(count),
+        "message": message,
+        "examples": list(examples or [])[:MAX_EXAMPLES],
+    }
@@ -0,0 +1,152 @@
+"""
+Cube dimensionnel pré-agrégé (jour x membre de dimension x indicateur).
+
+resultat.xls peut porter des colonnes de dimension (client, produit, site...),
+y compris la colonne B historiquement ignorée : elles sont reconnues par leur
+en-tête. Chaque dimension est encodée en catégories (codes entiers) puis
+agrégée une seule fois par (jour, membre) ; les requêtes de drill-down lisent
+ce cube creux trié par jour, sans repasser sur les lignes sources.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import common
+
+# Dimensions reconnues et en-têtes acceptés (normalisés : minuscules, sans accents, "_")
+DIMENSIONS = [
+    {"key": "client", "label": "Client", "aliases": ["client", "code_client", "nom_client", "cli"]},
+    {"key": "produit", "label": "Produit", "aliases": ["produit", "article", "code_article", "famille"]},
+    {"key": "site", "label": "Site", "aliases": ["site", "societe", "soc", "etablissement", "depot"]},
+]
+
+EMPTY_MEMBER = "(non renseigné)"
+OTHERS_MEMBER = "Autres"
+DRILLDOWN_TOP_N = 15
+
+
+def split_result_columns(df_raw, registry_columns=metrics.RESULT_FILE_COLUMNS):
+    """
+    Sépare les colonnes de resultat.xls lu sans usecols :
+    - colonnes positionnelles du registre (date, montants), renommées
+    - colonnes de dimension reconnues par leur en-tête (colonne B comprise)
+    Retourne (DataFrame avec datj + montants + dimensions, liste des clés de dimension).
+    """
+    aliases = {alias: dim["key"] for dim in DIMENSIONS for alias in dim["aliases"]}
+    n_core = len(registry_columns)
+    if df_raw.shape[1] < n_core:
+        raise ValueError(f"{df_raw.shape[1]} colonnes lues, {n_core} attendues ({', '.join(registry_columns)})")
+
+    df = df_raw.iloc[:, :n_core].copy()
+    df.columns = registry_columns
+
+    dims = []
+    for pos, header in enumerate(df_raw.columns):
+        # Les colonnes de date et de montants ne sont jamais des dimensions
+        if pos < n_core and registry_columns[pos] != "ignore":
+            continue
+        dim = aliases.get(common.normalize_label(header))
+        if dim and dim not in dims:
+            df[dim] = df_raw.iloc[:, pos].to_numpy()
+            dims.append(dim)
+
+    return df.drop(columns=["ignore"]), dims
+
+
+class DimensionCube:
+    """
+    Cube creux pour une dimension : une ligne par (jour, membre) non vide,
+    triée par jour, avec les totaux de chaque indicateur du registre.
+    """
+
+    def __init__(self, dim, df_res, registry=metrics.METRICS):
+        self.dim = dim
+        self.registry = registry
+        self.origin = df_res["datj"].min().normalize()
+
+        # Encodage catégoriel : codes entiers + table des membres
+        labels = df_res[dim].astype("string").fillna(EMPTY_MEMBER).str.strip().replace("", EMPTY_MEMBER)
+        codes, self.members = pd.factorize(labels, sort=True)
+        day_idx = (df_res["datj"].dt.normalize() - self.origin).dt.days.to_numpy()
+
+        # Pré-agrégation (jour, membre) : clé entière combinée, tri par jour
+        n_members = max(len(self.members), 1)
+        keys = day_idx.astype(np.int64) * n_members + codes
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        values = df_res[metrics.metric_columns(registry)].to_numpy(dtype=float)
+        self.values = np.column_stack([
+            np.bincount(inverse, weights=values[:, j], minlength=len(uniq)) for j in range(values.shape[1])
+        ]) if len(uniq) else np.zeros((0, len(registry)))
+        self.day = (uniq // n_members).astype(np.int32)
+        self.member = (uniq % n_members).astype(np.int32)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.day.nbytes + self.member.nbytes
+
+    def query(self, start, end):
+        """
+        Totaux par membre entre deux dates incluses : (membres, matrice membres x indicateurs).
+        Le cube étant trié par jour, la plage est extraite par recherche dichotomique.
+        """
+        lo = np.searchsorted(self.day, (pd.Timestamp(start) - self.origin).days, side="left")
+        hi = np.searchsorted(self.day, (pd.Timestamp(end) - self.origin).days, side="right")
+        member = self.member[lo:hi]
+        totals = np.column_stack([
+            np.bincount(member, weights=self.values[lo:hi, j], minlength=len(self.members))
+            for j in range(self.values.shape[1])
+        ])
+        return self.members, totals
+
+    def top(self, start, end, n=DRILLDOWN_TOP_N, metric_idx=0):
+        """n premiers membres sur l'indicateur metric_idx, le reste regroupé dans "Autres"."""
+        members, totals = self.query(start, end)
+        active = np.flatnonzero(np.abs(totals).sum(axis=1) > 0)
+        order = active[np.argsort(-totals[active, metric_idx], kind="stable")]
+        rows = [[str(members[i])] + np.round(totals[i], 2).tolist() for i in order[:n]]
+        if len(order) > n:
+            rest = totals[order[n:]].sum(axis=0)
+            rows.append([f"{OTHERS_MEMBER} ({len(order) - n})"] + np.round(rest, 2).tolist())
+        return rows
+
+
+def build_cubes(df_res, dims, registry=metrics.METRICS, verbose=True):
+    cubes = {}
+    if df_res.empty:
+        return cubes
+    for dim in dims:
+        t0 = time.perf_counter()
+        cube = DimensionCube(dim, df_res, registry)
+        cubes[dim] = cube
+        if verbose:
+            print(f"Cube {dim}: {len(cube.members)} membres, {len(cube.day)} cellules non vides "
+                  f"({cube.nbytes / 1024:.0f} Ko, {time.perf_counter() - t0:.2f} s)")
+    return cubes
+
+
+def drilldown_payload(cubes, periods, registry=metrics.METRICS, top_n=DRILLDOWN_TOP_N):
+    """
+    Top membres par dimension pour chaque mois et chaque année (clé "annee-mois",
+    mois "0" = année entière), calculés par requêtes sur le cube.
+    """
+    if not cubes:
+        return {}
+    primary_idx = registry.index(metrics.primary_metric(registry))
+    labels = {dim["key"]: dim["label"] for dim in DIMENSIONS}
+
+    ranges = {}
+    for year, month in periods:
+        start = pd.Timestamp(year, month, 1)
+        ranges[f"{year}-{month}"] = (start, start + pd.offsets.MonthEnd(0))
+    for year in sorted({y for y, _ in periods}):
+        ranges[f"{year}-0"] = (pd.Timestamp(year, 1, 1), pd.Timestamp(year, 12, 31))
+
+    payload = {}
+    for dim, cube in cubes.items():
+        payload[dim] = {
+            "label": labels.get(dim, dim),
+            "periods": {key: cube.top(start, end, top_n, primary_idx) for key, (start, end) in ranges.items()},
+        }
+    return payload
@@ -1,52 +1,72 @@
 import os
+import io
 import shutil
 import pandas as pd
 
-net_path = r"\\SRV-APP01\kpi\Suivi_Budget\resultats.xls"
-local_copy = "Resultats_Debug_Copy.xls"
+import network_io
+
+SOURCES = ["resultat.xls", "Budget.xlsx", "Feries.xlsx"]
 
 print("-" * 60)
-print(f"DEBUG: Testing access to {net_path}")
+print(f"DEBUG: Testing access to {network_io.SHARE_DIR}")
 print("-" * 60)
 
-# 1. Test Existence
-exists = os.path.exists(net_path)
-print(f"1. os.path.exists: {exists}")
-
-if exists:
-    # 2. Test Read Access (Standard Open)
-    try:
-        with open(net_path, 'rb') as f:
-            header = f.read(10)
-        print("2. open(..., 'rb'): SUCCESS (Can read bytes)")
-    except Exception as e:
-        print(f"2. open(..., 'rb'): FAILED -> {e}")
-
-    # 3. Test Copy
-    try:
-        shutil.copy2(net_path, local_copy)
-        print(f"3. shutil.copy2: SUCCESS (Copied to {local_copy})")
-        if os.path.exists(local_copy):
-            os.remove(local_copy)
-    except Exception as e:
-        print(f"3. shutil.copy2: FAILED -> {e}")
-
-    # 4. Test Pandas Direct Read
-    try:
-        df = pd.read_excel(net_path)
-        print(f"4. pd.read_excel: SUCCESS (Loaded {len(df)} lines)")
-    except Exception as e:
-        print(f"4. pd.read_excel: FAILED -> {e}")
-
-else:
-    print("SKIPPING other tests because file does not exist for Python.")
-    # List directory if possible
-    dir_path = os.path.dirname(net_path)
-    print(f"Attempting to list dir: {dir_path}")
-    try:
-        items = os.listdir(dir_path)
-        print(f"Dir contents: {items}")
-    except Exception as e:
-        print(f"Cannot list dir: {e}")
+# 0. Sonde concurrente de toutes les sources (bornée par PROBE_TIMEOUT)
+paths = [network_io.share_path(name) for name in SOURCES]
+probes = network_io.probe_sources(paths)
+
+for name, net_path in zip(SOURCES, paths):
+    probe = probes[net_path]
+    local_copy = f"{name}.debug_copy"
+    timeout = network_io.SOURCE_TIMEOUTS.get(name, network_io.DEFAULT_TIMEOUT)
+
+    print(f"\n>>> {net_path}")
+
+    # 1. Test Existence
+    print(f"1. os.stat: {'SUCCESS' if probe['exists'] else 'FAILED'} -> size={probe['size']} error={probe['error']}")
+
+    if probe["exists"]:
+        # 2. Test Read Access (lecture bornée avec reprises)
+        content = None
+        try:
+            content = network_io.read_bytes(net_path, timeout=timeout)
+            print(f"2. read_bytes (timeout {timeout:.0f}s): SUCCESS ({len(content)} bytes)")
+        except Exception as e:
+            print(f"2. read_bytes (timeout {timeout:.0f}s): FAILED -> {e}")
+
+        # 3. Test Copy
+        try:
+            network_io.run_with_timeout(shutil.copy2, timeout, net_path, local_copy)
+            print(f"3. shutil.copy2: SUCCESS (Copied to {local_copy})")
+            if os.path.exists(local_copy):
+                os.remove(local_copy)
+        except Exception as e:
+            print(f"3. shutil.copy2: FAILED -> {e}")
+
+        # 4. Test Pandas Read (depuis les octets déjà lus)
+        if content is not None:
+            try:
+                df = pd.read_excel(io.BytesIO(content))
+                print(f"4. pd.read_excel: SUCCESS (Loaded {len(df)} lines)")
+            except Exception as e:
+                print(f"4. pd.read_excel: FAILED -> {e}")
+
+    else:
+        print("SKIPPING other tests because file does not exist for Python.")
+        # List directory if possible
+        dir_path = os.path.dirname(net_path)
+        print(f"Attempting to list dir: {dir_path}")
+        try:
+            items = network_io.run_with_timeout(os.listdir, network_io.PROBE_TIMEOUT, dir_path)
+            print(f"Dir contents: {items}")
+        except Exception as e:
+            print(f"Cannot list dir: {e}")
+
+    # 5. Instantané local disponible pour le repli ?
+    content, saved_at = network_io.load_snapshot(name)
+    if content is not None:
+        print(f"5. Instantané local: {len(content)} bytes, du {saved_at:%d/%m/%Y %H:%M} (il y a {network_io.format_age(saved_at)})")
+    else:
+        print("5. Instantané local: aucun")
 
 print("-" * 60)
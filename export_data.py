@@ -0,0 +1,203 @@
+"""
+Export des agrégats calculés par analyze() en tables "tidy" pour Excel / outils BI.
+
+Tables produites (réutilisent les tableaux déjà calculés, sans nouveau passage sur les données) :
+- faits_journaliers : un jour par ligne (montants, jour ouvré, budget cumulé)
+- totaux_mensuels   : un mois par ligne (budget, indicateurs sous leur export_name, jours ouvrés)
+- cumuls_annuels    : une année par ligne (bucket "0")
+
+Formats : csv, parquet (si pyarrow est installé), xlsx (openpyxl en mode write_only).
+Chaque fichier est écrit par blocs dans un fichier temporaire puis renommé.
+"""
+import os
+import time
+
+import pandas as pd
+
+import metrics
+
+EXPORT_FORMATS = ("csv", "parquet", "xlsx")
+CHUNK_ROWS = 50000
+
+# Formats numériques Excel par colonne
+XLSX_FORMATS = {
+    "date": "dd/mm/yyyy",
+    "taux_realisation": "0.0%",
+    "jours_ouvres": "0",
+    "annee": "0",
+    "mois": "0",
+}
+XLSX_MONEY_FORMAT = '#,##0.00 "€"'
+
+
+def parse_formats(value):
+    """ "csv,xlsx" -> ["csv", "xlsx"] (valide les formats demandés)."""
+    formats = [f.strip().lower() for f in (value or "").split(",") if f.strip()]
+    unknown = [f for f in formats if f not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Format(s) d'export inconnu(s) : {', '.join(unknown)} (attendus : {', '.join(EXPORT_FORMATS)})")
+    return formats
+
+
+# ---------------------------------------------------------
+# CONSTRUCTION DES TABLES
+# ---------------------------------------------------------
+def _period_row(year_str, month_str, d):
+    budget = d["budget"]
+    primary = d[metrics.primary_metric()["key"]]
+    row = {
+        "annee": int(year_str),
+        "mois": int(month_str),
+        "budget": budget,
+    }
+    for m in metrics.METRICS:
+        row[m["export_name"]] = d[m["key"]]
+    row["jours_ouvres"] = d["jours_ouvres"]
+    row["ecart"] = primary - budget
+    row["taux_realisation"] = primary / budget if budget else None
+    return row
+
+
+def build_tables(global_data, daily):
+    """
+    global_data : arbre DATA[annee][mois] produit par analyze()
+    daily       : DataFrame journalier (index = date) construit à partir de la matrice d'analyze()
+    """
+    daily = daily.copy()
+    daily.index.name = "date"
+    daily = daily.reset_index()
+
+    monthly_rows = []
+    annual_rows = []
+    for year_str in sorted(global_data, key=int):
+        for month_str in sorted(global_data[year_str], key=int):
+            row = _period_row(year_str, month_str, global_data[year_str][month_str])
+            if month_str == "0":
+                del row["mois"]
+                annual_rows.append(row)
+            else:
+                monthly_rows.append(row)
+
+    return {
+        "faits_journaliers": daily,
+        "totaux_mensuels": pd.DataFrame(monthly_rows),
+        "cumuls_annuels": pd.DataFrame(annual_rows),
+    }
+
+
+# ---------------------------------------------------------
+# ECRITURE PAR FORMAT
+# ---------------------------------------------------------
+def _write_csv(tables, out_dir):
+    paths = []
+    for name, df in tables.items():
+        path = os.path.join(out_dir, f"{name}.csv")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            df.iloc[:0].to_csv(f, index=False)
+            for start in range(0, len(df), CHUNK_ROWS):
+                df.iloc[start:start + CHUNK_ROWS].to_csv(f, index=False, header=False)
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
+
+
+def _write_parquet(tables, out_dir):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Export Parquet ignoré : le module pyarrow n'est pas installé")
+        return []
+
+    paths = []
+    for name, df in tables.items():
+        path = os.path.join(out_dir, f"{name}.parquet")
+        tmp = path + ".tmp"
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(tmp, schema) as writer:
+            for start in range(0, max(len(df), 1), CHUNK_ROWS):
+                chunk = df.iloc[start:start + CHUNK_ROWS]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
+
+
+def _write_xlsx(tables, out_dir):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    path = os.path.join(out_dir, "suivi_budget.xlsx")
+    tmp = path + ".tmp"
+
+    # Mode write_only : les lignes sont écrites au fil de l'eau, sans garder la feuille en mémoire
+    wb = Workbook(write_only=True)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill("solid", fgColor="2C3E50")
+
+    for name, df in tables.items():
+        ws = wb.create_sheet(title=name)
+        ws.freeze_panes = "A2"
+        for idx, col in enumerate(df.columns):
+            ws.column_dimensions[get_column_letter(idx + 1)].width = max(12, len(col) + 4)
+
+        header = []
+        for col in df.columns:
+            cell = WriteOnlyCell(ws, value=col)
+            cell.font = header_font
+            cell.fill = header_fill
+            header.append(cell)
+        ws.append(header)
+
+        number_formats = []
+        for col in df.columns:
+            if col in XLSX_FORMATS:
+                number_formats.append(XLSX_FORMATS[col])
+            elif pd.api.types.is_float_dtype(df[col]):
+                number_formats.append(XLSX_MONEY_FORMAT)
+            else:
+                number_formats.append(None)
+
+        for values in df.itertuples(index=False, name=None):
+            row = []
+            for value, fmt in zip(values, number_formats):
+                if pd.isna(value):
+                    value = None
+                elif isinstance(value, pd.Timestamp):
+                    value = value.to_pydatetime()
+                cell = WriteOnlyCell(ws, value=value)
+                if fmt and value is not None:
+                    cell.number_format = fmt
+                row.append(cell)
+            ws.append(row)
+
+    wb.save(tmp)
+    os.replace(tmp, path)
+    return [path]
+
+
+WRITERS = {
+    "csv": _write_csv,
+    "parquet": _write_parquet,
+    "xlsx": _write_xlsx,
+}
+
+
+def export_tables(tables, formats, out_dir="exports"):
+    """Écrit les tables dans chacun des formats demandés. Retourne la liste des fichiers écrits."""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for fmt in formats:
+        t0 = time.perf_counter()
+        try:
+            paths = WRITERS[fmt](tables, out_dir)
+        except Exception as e:
+            print(f"Erreur export {fmt} : {e}")
+            continue
+        written.extend(paths)
+        if paths:
+            print(f"Export {fmt} : {len(paths)} fichier(s) dans {out_dir} ({time.perf_counter() - t0:.2f} s)")
+    return written
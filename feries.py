@@ -0,0 +1,149 @@
+"""
+Calendrier des jours fériés français calculé (dates fixes + fêtes mobiles liées à Pâques).
+
+Les jours fériés légaux sont calculés pour n'importe quelle année et mémorisés
+par année : le calendrier des jours ouvrés ne dépend plus de la lecture de
+Feries.xlsx sur le partage. Le fichier n'est plus qu'une couche de surcharges :
+- dates ajoutées : ponts, fermetures d'entreprise (ex. congés d'août, fin d'année)
+- dates retirées : jour férié travaillé, marqué "ouvré" / "travaillé" en colonne B
+- colonne "régime" : jours de repos hebdomadaire, masque de 7 chiffres du lundi
+  au dimanche (1 = non travaillé), "0000011" par défaut (samedi et dimanche)
+- colonne "Alsace-Moselle" : oui / x / 1 pour le droit local (Vendredi saint et
+  Saint-Étienne fériés en plus)
+"""
+import datetime
+import functools
+
+import numpy as np
+import pandas as pd
+
+import common
+
+REGIME_GENERAL = 11
+REGIME_ALSACE_MOSELLE = 13
+
+# Valeurs de la colonne B qui retirent une date du calendrier (normalisées : minuscules, sans accents)
+WORKED_MARKERS = ("ouvre", "travaille")
+# Valeurs de la colonne "Alsace-Moselle" qui activent le droit local
+LOCAL_LAW_MARKERS = ("oui", "x", "1")
+# Repos hebdomadaire du lundi au dimanche (1 = non travaillé)
+DEFAULT_WEEKMASK = "0000011"
+
+
+def easter_sunday(year):
+    """Dimanche de Pâques (calendrier grégorien, algorithme de Meeus/Jones/Butcher)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+
+@functools.lru_cache(maxsize=None)
+def legal_holidays(year, regime=REGIME_GENERAL):
+    """Jours fériés légaux d'une année : tuple de (date, libellé), trié par date."""
+    easter = easter_sunday(year)
+    days = [
+        (datetime.date(year, 1, 1), "Jour de l'an"),
+        (easter + datetime.timedelta(days=1), "Lundi de Pâques"),
+        (datetime.date(year, 5, 1), "Fête du Travail"),
+        (datetime.date(year, 5, 8), "Victoire 1945"),
+        (easter + datetime.timedelta(days=39), "Ascension"),
+        (easter + datetime.timedelta(days=50), "Lundi de Pentecôte"),
+        (datetime.date(year, 7, 14), "Fête nationale"),
+        (datetime.date(year, 8, 15), "Assomption"),
+        (datetime.date(year, 11, 1), "Toussaint"),
+        (datetime.date(year, 11, 11), "Armistice 1918"),
+        (datetime.date(year, 12, 25), "Noël"),
+    ]
+    if regime == REGIME_ALSACE_MOSELLE:
+        days += [
+            (easter - datetime.timedelta(days=2), "Vendredi saint"),
+            (datetime.date(year, 12, 26), "Saint-Étienne"),
+        ]
+    return tuple(sorted(days))
+
+
+def no_overrides():
+    return {"added": set(), "removed": set(), "regime": REGIME_GENERAL, "weekmask": DEFAULT_WEEKMASK, "errors": []}
+
+
+def parse_weekmask(value):
+    """
+    Masque de repos hebdomadaire -> chaîne de 7 chiffres 0/1 (lundi..dimanche).
+    Excel peut avoir converti "0000011" en nombre (11) : les zéros de tête sont restaurés.
+    """
+    text = str(value).strip()
+    if text.endswith(".0"):
+        text = text[:-2]
+    text = text.zfill(7)
+    if len(text) != 7 or set(text) - {"0", "1"} or text == "1111111":
+        raise ValueError(f"Masque de jours de repos invalide : {value!r} (attendu : 7 chiffres 0/1, ex. 0000011)")
+    return text
+
+
+def rest_days(overrides=None):
+    """Numéros de jour de semaine (0 = lundi) non travaillés."""
+    weekmask = (overrides or no_overrides())["weekmask"]
+    return [i for i, flag in enumerate(weekmask) if flag == "1"]
+
+
+def is_rest_day(weekdays, overrides=None):
+    """Masque vectorisé des jours de repos hebdomadaire (weekdays : numéros 0..6)."""
+    return np.isin(np.asarray(weekdays), rest_days(overrides))
+
+
+def parse_overrides(df_feries):
+    """
+    Surcharges lues dans Feries.xlsx (colonne A = dates, colonne B = marqueur
+    facultatif, colonnes "régime" et "Alsace-Moselle" facultatives).
+    Retourne {"added": set de dates, "removed": set de dates, "regime": 11 ou 13,
+    "weekmask": masque de repos, "errors": [messages]}. Une colonne illisible est
+    signalée dans "errors" sans invalider les dates.
+    """
+    overrides = no_overrides()
+    if df_feries.empty:
+        return overrides
+
+    dates = pd.to_datetime(df_feries.iloc[:, 0], errors="coerce")
+    valid = dates.notna()
+    worked = pd.Series(False, index=df_feries.index)
+    if df_feries.shape[1] > 1:
+        worked = df_feries.iloc[:, 1].map(lambda v: pd.notna(v) and common.normalize_label(v).startswith(WORKED_MARKERS))
+
+    overrides["added"] = set(dates[valid & ~worked].dt.date)
+    overrides["removed"] = set(dates[valid & worked].dt.date)
+
+    columns = {common.normalize_label(c).replace("-", "_"): c for c in df_feries.columns}
+    if "regime" in columns:
+        mask = df_feries[columns["regime"]].dropna()
+        if not mask.empty:
+            try:
+                overrides["weekmask"] = parse_weekmask(mask.iloc[0])
+            except ValueError as e:
+                overrides["errors"].append(f"{e} : samedi et dimanche retenus")
+    if "alsace_moselle" in columns:
+        flags = df_feries[columns["alsace_moselle"]].dropna()
+        if not flags.empty and common.normalize_label(flags.iloc[0]).removesuffix(".0") in LOCAL_LAW_MARKERS:
+            overrides["regime"] = REGIME_ALSACE_MOSELLE
+    return overrides
+
+
+def holiday_dates(years, overrides=None):
+    """Jours non ouvrés (hors week-end) des années données : fériés légaux + ajouts - retraits."""
+    overrides = overrides or no_overrides()
+    years = {int(y) for y in years}
+    dates = {d for y in years for d, _ in legal_holidays(y, overrides["regime"])}
+    dates |= {d for d in overrides["added"] if d.year in years}
+    return dates - overrides["removed"]
+
+
+def holiday_index(years, overrides=None):
+    """holiday_dates sous forme de DatetimeIndex trié (pour isin vectorisé)."""
+    return pd.DatetimeIndex(sorted(holiday_dates(years, overrides)))
@@ -0,0 +1,468 @@
+"""
+Intégration incrémentale des exports ERP (fichiers delta) dans un historique local.
+
+Au lieu de relire tout resultat.xls à chaque exécution, l'ERP dépose de petits
+fichiers (CSV, xls, xlsx, même disposition de colonnes que resultat.xls) dans
+le dossier "inbox" du partage. Chaque fichier est fusionné dans l'historique
+local, partitionné par mois (un CSV par mois) :
+- remplacement (défaut) : les lignes des jours présents dans le fichier
+  remplacent celles de l'historique (ré-export d'une journée complète)
+- ajout : fichiers dont le nom contient "_ajout", lignes ajoutées aux jours
+  existants (incréments intrajournaliers)
+
+Un journal (empreinte SHA-256 du contenu) rend l'intégration idempotente : un
+fichier déjà intégré est ignoré, même redéposé. Un fichier verrou couvre toute
+l'intégration (journal lu, deltas appliqués, journal écrit) : deux traitements
+concurrents (service et ligne de commande) n'appliquent jamais deux fois un
+fichier "_ajout". Seules les partitions des mois touchés par un fichier sont
+relues et réécrites (écriture atomique).
+resultat.xls n'est lu qu'une fois, pour initialiser un historique vide.
+
+Chaque partition a son agrégat journalier (dossier "_agregats" : montants
+additionnés par jour et membres de dimension), recalculé avec elle pour les
+seuls mois touchés et rattaché à son empreinte dans le journal. load_store
+relit ces agrégats, pas les lignes brutes : le modèle est calculé sur des
+lignes journalières, incréments "_ajout" déjà additionnés.
+"""
+import os
+import io
+import json
+import time
+import hashlib
+import datetime
+import contextlib
+
+import pandas as pd
+
+import network_io
+import common
+import metrics
+import cube
+
+STORE_DIR = os.environ.get("SUIVI_BUDGET_STORE", "historique_resultats")
+INBOX_NAME = "inbox"
+LEDGER_FILE = "_journal.json"
+LOCK_FILE = "_verrou"
+AGGREGATE_DIR = "_agregats"
+LOCK_TIMEOUT = 60.0         # attente maximale d'une intégration concurrente (secondes)
+STALE_LOCK_AGE = 600.0      # verrou plus ancien : traitement interrompu, verrou repris
+DELTA_EXTENSIONS = (".csv", ".xls", ".xlsx")
+ADD_MARKER = "_ajout"
+MODES = ("remplacement", "ajout")
+
+
+class StoreLocked(Exception):
+    """Une autre intégration occupe l'historique au-delà du délai d'attente."""
+
+
+def inbox_path(share_dir=None):
+    return network_io.share_path(INBOX_NAME, share_dir)
+
+
+def _partition_path(store_dir, month_key):
+    return os.path.join(store_dir, f"{month_key}.csv")
+
+
+def _month_keys(dates):
+    return dates.dt.strftime("%Y-%m")
+
+
+def load_ledger(store_dir):
+    try:
+        with open(os.path.join(store_dir, LEDGER_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}}
+
+
+def _save_ledger(store_dir, ledger):
+    path = os.path.join(store_dir, LEDGER_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ledger, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def store_lock(store_dir, timeout=LOCK_TIMEOUT, stale_age=STALE_LOCK_AGE):
+    """
+    Accès exclusif à l'historique, entre processus comme entre threads : fichier
+    verrou créé de manière exclusive (O_EXCL), supprimé en sortie.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    path = os.path.join(store_dir, LOCK_FILE)
+    end = time.monotonic() + timeout
+    while True:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            pass
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            continue  # libéré entre-temps
+        if age > stale_age:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            continue
+        if time.monotonic() >= end:
+            raise StoreLocked(f"historique verrouillé par un autre traitement depuis {age:.0f} s ({path})")
+        time.sleep(0.1)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(f"{os.getpid()} {datetime.datetime.now().isoformat(timespec='seconds')}\n")
+    try:
+        yield
+    finally:
+        with contextlib.suppress(OSError):
+            os.remove(path)
+
+
+def store_months(store_dir):
+    if not os.path.isdir(store_dir):
+        return []
+    return sorted(f[:-4] for f in os.listdir(store_dir) if f.endswith(".csv") and not f.startswith("_"))
+
+
+# ---------------------------------------------------------
+# LECTURE DES FICHIERS
+# ---------------------------------------------------------
+def parse_dates(values):
+    """
+    Dates d'un fichier delta : ISO (2025-03-14) d'abord, puis jour/mois/année
+    (14/03/2025) pour les valeurs restantes. Les dates déjà typées (Excel) sont conservées.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    dates = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    rest = dates.isna() & values.notna()
+    if rest.any():
+        dates[rest] = pd.to_datetime(values[rest], dayfirst=True, format="mixed", errors="coerce")
+    return dates
+
+
+def normalize_rows(df_raw, source=""):
+    """
+    Lignes au format resultat.xls (avec en-tête) -> (DataFrame datj + montants + dimensions, constats).
+    Les lignes sans date valide sont écartées ; les montants illisibles comptent 0. Les
+    deux cas sont remontés en constats (exemples : fichier et ligne d'origine), l'historique
+    ne conservant que des lignes datées et des montants numériques.
+    """
+    df, dims = cube.split_result_columns(df_raw)
+    raw_dates = df["datj"]
+    df["datj"] = pd.to_datetime(parse_dates(raw_dates)).dt.normalize()
+    bad_dates = df["datj"].isna()
+    bad_amounts = pd.DataFrame(False, index=df.index, columns=metrics.metric_columns())
+    raw_amounts = df[metrics.metric_columns()].copy()
+    for col in metrics.metric_columns():
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            # CSV "à la française" : virgule décimale, espaces de milliers
+            values = values.astype(str).str.replace(" ", "").str.replace(" ", "").str.replace(",", ".")
+        numbers = pd.to_numeric(values, errors="coerce")
+        bad_amounts[col] = numbers.isna() & df[col].notna() & (df[col].astype(str).str.strip() != "")
+        df[col] = numbers.fillna(0.0)
+
+    prefix = f"{source} " if source else ""
+    findings = []
+    if bad_dates.any():
+        examples = [f"{prefix}ligne {int(i) + 2} : {raw_dates[i]!r}" for i in df.index[bad_dates][:common.MAX_EXAMPLES]]
+        findings.append(common.finding("Résultats", "dates_invalides", "error", bad_dates.sum(),
+                                       "Lignes écartées : date absente ou illisible", examples))
+    bad_rows = bad_amounts.any(axis=1) & ~bad_dates
+    if bad_rows.any():
+        examples = [f"{prefix}ligne {int(i) + 2} : "
+                    + ", ".join(f"{c}={raw_amounts.at[i, c]!r}" for c in bad_amounts.columns if bad_amounts.at[i, c])
+                    for i in df.index[bad_rows][:common.MAX_EXAMPLES]]
+        findings.append(common.finding("Résultats", "montants_invalides", "error", bad_rows.sum(),
+                                       "Montants non numériques comptés à 0", examples))
+    return df.loc[~bad_dates].reset_index(drop=True), findings
+
+
+def read_delta(name, content):
+    """Contenu d'un fichier delta -> (lignes normalisées, constats de lecture)."""
+    if name.lower().endswith(".csv"):
+        text = content.decode("utf-8-sig", errors="replace")
+        df_raw = pd.read_csv(io.StringIO(text), sep=None, engine="python", dtype=str)
+        return normalize_rows(df_raw, name)
+    return normalize_rows(pd.read_excel(io.BytesIO(content), header=0), name)
+
+
+def delta_mode(name):
+    return "ajout" if ADD_MARKER in os.path.splitext(name)[0].lower() else "remplacement"
+
+
+def list_inbox(inbox_dir):
+    """Fichiers delta de l'inbox, dans l'ordre de dépôt (date de modification, puis nom)."""
+    if not os.path.isdir(inbox_dir):
+        # Partage injoignable ou inbox absente : signalé, jamais confondu avec une inbox vide
+        raise FileNotFoundError(f"dossier introuvable : {inbox_dir}")
+    entries = []
+    for name in os.listdir(inbox_dir):
+        path = os.path.join(inbox_dir, name)
+        if name.lower().endswith(DELTA_EXTENSIONS) and os.path.isfile(path):
+            st = os.stat(path)
+            entries.append((st.st_mtime, name, path, st.st_size))
+    return [(name, path, size, mtime) for mtime, name, path, size in sorted(entries)]
+
+
+def inbox_fingerprint(inbox_dir, timeout=network_io.PROBE_TIMEOUT):
+    """Empreinte de l'inbox (nom, taille, date) : change dès qu'un fichier est déposé."""
+    try:
+        listing = network_io.run_with_timeout(list_inbox, timeout, inbox_dir)
+    except Exception:
+        return ()
+    return tuple((name, size, mtime) for name, _, size, mtime in listing)
+
+
+# ---------------------------------------------------------
+# HISTORIQUE PARTITIONNE PAR MOIS
+# ---------------------------------------------------------
+def _read_partition(store_dir, month_key):
+    path = _partition_path(store_dir, month_key)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, parse_dates=["datj"], dtype={c: str for c in _dimension_keys()})
+
+
+def _write_partition(store_dir, month_key, df):
+    """Écrit la partition et son agrégat journalier ; retourne l'empreinte de la partition (None si vide)."""
+    path = _partition_path(store_dir, month_key)
+    if df.empty:
+        for old in (path, _aggregate_path(store_dir, month_key)):
+            if os.path.exists(old):
+                os.remove(old)
+        return None
+    content = df.sort_values("datj", kind="stable").to_csv(index=False, date_format="%Y-%m-%d").encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    digest = _digest(content)
+    _write_aggregate(store_dir, month_key, digest, aggregate_rows(df))
+    return digest
+
+
+def _dimension_keys():
+    return [dim["key"] for dim in cube.DIMENSIONS]
+
+
+def _digest(content):
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+# ---------------------------------------------------------
+# AGREGATS JOURNALIERS PAR PARTITION
+# ---------------------------------------------------------
+def _aggregate_path(store_dir, month_key):
+    return os.path.join(store_dir, AGGREGATE_DIR, f"{month_key}.json")
+
+
+def aggregate_rows(df):
+    """Lignes d'une partition -> une ligne par jour et membres de dimension, montants additionnés."""
+    keys = ["datj"] + [d for d in _dimension_keys() if d in df.columns]
+    return df.groupby(keys, dropna=False, sort=True)[metrics.metric_columns()].sum().reset_index()
+
+
+def _write_aggregate(store_dir, month_key, digest, rows):
+    os.makedirs(os.path.join(store_dir, AGGREGATE_DIR), exist_ok=True)
+    values = rows.assign(datj=rows["datj"].dt.strftime("%Y-%m-%d")).astype(object)
+    payload = {
+        "hash": digest,
+        "columns": list(rows.columns),
+        "rows": values.where(values.notna(), None).values.tolist(),
+    }
+    path = _aggregate_path(store_dir, month_key)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _read_aggregate(store_dir, month_key):
+    """Contenu brut de l'agrégat {"hash", "columns", "rows"}, None si absent ou illisible."""
+    try:
+        with open(_aggregate_path(store_dir, month_key), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _refresh_aggregates(store_dir, ledger):
+    """
+    Agrégats manquants ou absents du journal (historique antérieur aux agrégats) :
+    recalculés une fois depuis leur partition.
+    """
+    partitions = ledger.setdefault("partitions", {})
+    changed = False
+    for month_key in store_months(store_dir):
+        if month_key in partitions and os.path.exists(_aggregate_path(store_dir, month_key)):
+            continue
+        with open(_partition_path(store_dir, month_key), "rb") as f:
+            digest = _digest(f.read())
+        _write_aggregate(store_dir, month_key, digest, aggregate_rows(_read_partition(store_dir, month_key)))
+        partitions[month_key] = digest
+        changed = True
+    for month_key in set(partitions) - set(store_months(store_dir)):
+        del partitions[month_key]
+        changed = True
+    return changed
+
+
+def apply_delta(store_dir, delta, mode, partitions=None):
+    """
+    Fusionne des lignes normalisées dans l'historique ; ne relit et ne réécrit
+    que les partitions (et leurs agrégats) des mois présents dans le delta.
+    partitions : {mois: empreinte} du journal, mis à jour. Retourne les mois touchés.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode d'intégration inconnu : {mode}")
+    os.makedirs(store_dir, exist_ok=True)
+    partitions = {} if partitions is None else partitions
+    months = _month_keys(delta["datj"])
+    for month_key, rows in delta.groupby(months, sort=True):
+        current = _read_partition(store_dir, month_key)
+        if current is not None and mode == "remplacement":
+            # Dédoublonnage par date : les jours du delta remplacent entièrement ceux de l'historique
+            current = current.loc[~current["datj"].isin(rows["datj"].unique())]
+        merged = rows if current is None else pd.concat([current, rows], ignore_index=True)
+        digest = _write_partition(store_dir, month_key, merged)
+        if digest is None:
+            partitions.pop(month_key, None)
+        else:
+            partitions[month_key] = digest
+    return sorted(set(months))
+
+
+def seed_store(store_dir, df_rows, findings=None, source="resultat.xls"):
+    """
+    Initialise un historique vide à partir de lignes normalisées (resultat.xls complet) ;
+    ses constats de lecture sont journalisés comme ceux des fichiers delta.
+    Sans effet si un autre traitement l'a initialisé entre-temps. Retourne les mois écrits.
+    """
+    with store_lock(store_dir):
+        if store_months(store_dir):
+            return []
+        ledger = load_ledger(store_dir)
+        months = apply_delta(store_dir, df_rows, "remplacement", ledger.setdefault("partitions", {}))
+        ledger["seed"] = {
+            "file": source,
+            "rows": len(df_rows),
+            "findings": list(findings or []),
+            "months": months,
+            "ingested_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        _save_ledger(store_dir, ledger)
+        return months
+
+
+def ingest_inbox(store_dir, inbox_dir, log=print):
+    """
+    Intègre les fichiers de l'inbox pas encore journalisés.
+    Retourne {"files": [noms intégrés], "rows", "months": [mois touchés],
+    "errors": [fichiers non intégrés], "inbox_error": inbox illisible ("" sinon)}.
+    """
+    # Verrou tenu du journal lu jusqu'au dernier journal écrit
+    with store_lock(store_dir):
+        summary = _ingest_locked(store_dir, inbox_dir, log)
+    summary["months"] = sorted(summary["months"])
+    return summary
+
+
+def _ingest_locked(store_dir, inbox_dir, log):
+    ledger = load_ledger(store_dir)
+    if _refresh_aggregates(store_dir, ledger):
+        _save_ledger(store_dir, ledger)
+    # Fichiers déjà vus (nom, taille, date) : ignorés sans relecture du partage
+    seen = {(e["file"], e.get("size"), e.get("mtime")) for e in ledger["files"].values()}
+    summary = {"files": [], "rows": 0, "months": set(), "errors": [], "inbox_error": ""}
+    try:
+        listing = network_io.run_with_timeout(list_inbox, network_io.PROBE_TIMEOUT, inbox_dir)
+    except Exception as e:
+        # L'historique déjà intégré reste exploitable : l'appelant l'affiche avec un avertissement
+        summary["inbox_error"] = str(e)
+        listing = []
+    for name, path, size, mtime in listing:
+        if (name, size, mtime) in seen:
+            continue
+        try:
+            content = network_io.read_bytes(path, timeout=network_io.DEFAULT_TIMEOUT, log=log)
+        except Exception as e:
+            summary["errors"].append(f"{name} : {e}")
+            continue
+        digest = hashlib.sha256(content).hexdigest()
+        if digest in ledger["files"]:
+            continue
+        try:
+            delta, findings = read_delta(name, content)
+            mode = delta_mode(name)
+            months = apply_delta(store_dir, delta, mode, ledger["partitions"]) if not delta.empty else []
+        except Exception as e:
+            summary["errors"].append(f"{name} : {e}")
+            continue
+        ledger["files"][digest] = {
+            "file": name,
+            "size": size,
+            "mtime": mtime,
+            "mode": mode,
+            "rows": len(delta),
+            "findings": findings,
+            "months": months,
+            "ingested_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        # Journal écrit après chaque fichier : une interruption ne rejoue que le fichier en cours
+        _save_ledger(store_dir, ledger)
+        summary["files"].append(name)
+        summary["rows"] += len(delta)
+        summary["months"].update(months)
+        log(f"Delta intégré: {name} ({mode}, {len(delta)} ligne(s), mois {', '.join(months) or '-'})")
+    return summary
+
+
+def recorded_findings(store_dir):
+    """
+    Constats de lecture de tous les fichiers journalisés (initialisation comprise), fusionnés
+    par contrôle : remontés à chaque exécution, comme ceux de resultat.xls en mode complet.
+    """
+    ledger = load_ledger(store_dir)
+    entries = ([ledger["seed"]] if "seed" in ledger else []) + list(ledger["files"].values())
+    merged = {}
+    for entry in entries:
+        for f in entry.get("findings", []):
+            total = merged.setdefault(f["check"], dict(f, count=0, examples=[]))
+            total["count"] += f["count"]
+            total["examples"] += f["examples"]
+    return [common.finding(f["source"], f["check"], f["severity"], f["count"], f["message"], f["examples"])
+            for f in merged.values()]
+
+
+def load_store(store_dir):
+    """
+    Historique complet -> (DataFrame datj + montants + dimensions, dimensions présentes).
+    Relit les agrégats journaliers des partitions, pas leurs lignes : seul un agrégat
+    dont l'empreinte ne correspond pas au journal (intégration en cours dans un autre
+    processus) est recalculé depuis sa partition, sans être réécrit.
+    """
+    partitions = load_ledger(store_dir).get("partitions", {})
+    # Lignes des agrégats regroupées par jeu de colonnes : un seul DataFrame par jeu
+    stored = {}
+    parts = []
+    for month_key in store_months(store_dir):
+        payload = _read_aggregate(store_dir, month_key)
+        if payload is not None and payload["hash"] == partitions.get(month_key):
+            stored.setdefault(tuple(payload["columns"]), []).extend(payload["rows"])
+            continue
+        current = _read_partition(store_dir, month_key)
+        if current is not None:  # partition vidée entre-temps sinon
+            parts.append(aggregate_rows(current))
+    for columns, rows in stored.items():
+        frame = pd.DataFrame(rows, columns=list(columns))
+        frame["datj"] = pd.to_datetime(frame["datj"], format="%Y-%m-%d")
+        parts.append(frame)
+
+    columns = ["datj"] + metrics.metric_columns()
+    if not parts:
+        return pd.DataFrame(columns=columns), []
+    df = pd.concat(parts, ignore_index=True).sort_values("datj", kind="stable", ignore_index=True)
+    dims = [d for d in _dimension_keys() if d in df.columns]
+    return df[columns + dims], dims
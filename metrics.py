@@ -0,0 +1,124 @@
+"""
+Registre déclaratif des indicateurs et moteur de calcul générique.
+
+Chaque indicateur déclare sa colonne source dans resultat.xls, ses libellés,
+son agrégation et son rôle dans les graphiques. Le moteur calcule tous les
+indicateurs enregistrés en un seul passage vectorisé sur une matrice
+(jours x indicateurs), toutes périodes confondues.
+
+Ajouter un indicateur = ajouter sa colonne à RESULT_FILE_COLUMNS et une entrée à METRICS.
+"""
+import numpy as np
+import pandas as pd
+
+# Colonnes de resultat.xls dans l'ordre du fichier (A=Date, B=Ignore, C, D, E...)
+RESULT_FILE_COLUMNS = ["datj", "ignore", "cacdej", "caexpj", "caprodj"]
+
+# sum : cumul = somme courante, total = somme du mois
+# (une moyenne ou une dernière valeur demanderait un masque des jours avec données :
+# la matrice journalière met 0 les jours sans saisie)
+AGGREGATIONS = ("sum",)
+
+# primary   : indicateur comparé au budget (KPI de réalisation, courbe remplie, vue comparaison)
+# secondary : indicateur complémentaire (section "Production & Commandes")
+ROLES = ("primary", "secondary")
+
+
+def metric(key, column, label, chart_key, role, color, aggregation="sum",
+           chart_label=None, total_label=None, export_name=None, dash=None):
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Agrégation inconnue pour {key} : {aggregation}")
+    if role not in ROLES:
+        raise ValueError(f"Rôle inconnu pour {key} : {role}")
+    return {
+        "key": key,                                   # clé des totaux dans DB_DATA
+        "column": column,                             # colonne source dans resultat.xls
+        "label": label,                               # libellé du tableau de KPI
+        "chart_key": chart_key,                       # clé de la série cumulée dans DB_DATA
+        "chart_label": chart_label or label,          # légende des graphiques
+        "total_label": total_label or f"{label} (Total)",
+        "role": role,
+        "color": color,
+        "aggregation": aggregation,
+        "export_name": export_name or column,         # nom de colonne dans les exports
+        "dash": dash or [],
+    }
+
+
+METRICS = [
+    # SWAP : CA Réalisé = Expéditions, Prise de Commande = Commandes (ex-CA)
+    metric("realise", "caexpj", "CA Réalisé", "chart_ca", "primary", "#3498db",
+           total_label="CA (Total)", export_name="expeditions"),
+    metric("commandes", "cacdej", "Prise de Commande", "chart_cmd", "secondary", "#9b59b6",
+           chart_label="Prise de Cde", total_label="Cde (Total)", export_name="commandes", dash=[5, 5]),
+    metric("produit", "caprodj", "Montant Produit", "chart_prod", "secondary", "#2ecc71",
+           chart_label="Produit", total_label="Prod (Total)", export_name="production"),
+]
+
+
+def metric_columns(registry=METRICS):
+    return [m["column"] for m in registry]
+
+
+def primary_metric(registry=METRICS):
+    return next(m for m in registry if m["role"] == "primary")
+
+
+def public_registry(registry=METRICS):
+    """Partie du registre utile au dashboard (sérialisée dans le HTML)."""
+    keys = ("key", "label", "chart_key", "chart_label", "total_label", "role", "color", "dash")
+    return [{k: m[k] for k in keys} for m in registry]
+
+
+# ---------------------------------------------------------
+# MOTEUR
+# ---------------------------------------------------------
+def build_calendar(periods):
+    """
+    Calendrier journalier concaténé des périodes (annee, mois) triées.
+    Retourne (DatetimeIndex des jours, indices de début de chaque période + fin).
+    """
+    if not periods:
+        return pd.DatetimeIndex([]), np.zeros(1, dtype=int)
+    starts = pd.DatetimeIndex([pd.Timestamp(y, m, 1) for y, m in periods])
+    lengths = starts.days_in_month.to_numpy()
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    # Décalage de chaque jour par rapport au 1er de sa période
+    offsets = np.arange(bounds[-1]) - np.repeat(bounds[:-1], lengths)
+    days = pd.DatetimeIndex(np.repeat(starts.values, lengths) + offsets.astype("timedelta64[D]"))
+    return days, bounds
+
+
+def daily_matrix(df_res, days, registry=METRICS):
+    """Matrice (jours x indicateurs) : somme des lignes du même jour, 0 les jours sans données."""
+    columns = metric_columns(registry)
+    if df_res.empty or len(days) == 0:
+        return np.zeros((len(days), len(columns)))
+    daily = df_res.groupby(df_res["datj"].dt.normalize())[columns].sum()
+    return daily.reindex(days, fill_value=0.0).to_numpy(dtype=float)
+
+
+def aggregate_periods(values, bounds, registry=METRICS):
+    """
+    Cumuls journaliers et totaux de toutes les périodes, pour tous les indicateurs.
+    values : matrice (jours x indicateurs), bounds : limites des périodes (build_calendar)
+    Retourne (cumuls de même forme que values, totaux (périodes x indicateurs)).
+    """
+    n_periods = len(bounds) - 1
+    lengths = np.diff(bounds)
+    if values.shape[0] == 0:
+        return values.copy(), np.zeros((n_periods, values.shape[1]))
+
+    segments = np.repeat(np.arange(n_periods), lengths)
+    cumuls = pd.DataFrame(values).groupby(segments).cumsum().to_numpy()
+    totals = cumuls[bounds[1:] - 1]
+    return cumuls, totals
+
+
+def period_entry(totals, cumuls, registry=METRICS):
+    """Clés indicateurs d'une période de DB_DATA : totaux + séries cumulées."""
+    entry = {}
+    for j, m in enumerate(registry):
+        entry[m["key"]] = float(totals[j])
+        entry[m["chart_key"]] = cumuls[:, j].tolist()
+    return entry
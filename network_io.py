@@ -0,0 +1,247 @@
+"""
+Couche d'accès au partage réseau (SMB).
+
+- Sonde concurrente d'existence / taille / date des fichiers sources
+- Lecture bornée dans le temps (timeout par source) avec reprises et backoff
+- Instantané local du dernier fichier lu avec succès, utilisé en repli
+  quand le serveur est lent ou injoignable
+"""
+import os
+import io
+import json
+import time
+import datetime
+import threading
+
+import pandas as pd
+
+# Dossier partagé contenant les fichiers sources (surchargeable pour les tests / autres sites)
+SHARE_DIR = os.environ.get("SUIVI_BUDGET_DIR", r"\\SRV-APP01\kpi\Suivi_Budget")
+
+# Dossier local des instantanés (derniers fichiers valides)
+SNAPSHOT_DIR = os.environ.get("SUIVI_BUDGET_CACHE", "cache_sources")
+
+# Délai par source (secondes, toutes tentatives comprises). resultat.xls est le plus gros fichier.
+SOURCE_TIMEOUTS = {
+    "Feries.xlsx": 10.0,
+    "Budget.xlsx": 10.0,
+    "resultat.xls": 60.0,
+}
+DEFAULT_TIMEOUT = 15.0
+PROBE_TIMEOUT = 5.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 1.0  # secondes, doublé à chaque reprise
+
+
+class SourceTimeout(Exception):
+    """Le partage n'a pas répondu dans le délai imparti."""
+
+
+class SourceUnavailable(Exception):
+    """Ni le partage ni un instantané local ne permettent de lire la source."""
+
+
+def share_path(name, share_dir=None):
+    return os.path.join(share_dir or SHARE_DIR, name)
+
+
+def run_with_timeout(func, timeout, *args, **kwargs):
+    """
+    Exécute func dans un thread démon et attend au plus `timeout` secondes.
+    Un accès SMB bloqué ne peut pas être interrompu : le thread est abandonné
+    (démon, il ne bloque pas la fin du programme).
+    """
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func(*args, **kwargs)
+        except BaseException as e:
+            result["error"] = e
+
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    t.join(timeout)
+    if t.is_alive():
+        raise SourceTimeout(f"pas de réponse après {timeout:.0f} s")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+# ---------------------------------------------------------
+# SONDES
+# ---------------------------------------------------------
+def _stat(path):
+    st = os.stat(path)
+    return {"exists": True, "size": st.st_size, "mtime": st.st_mtime, "error": ""}
+
+
+def probe_sources(paths, timeout=PROBE_TIMEOUT):
+    """
+    Sonde toutes les sources en parallèle (un os.stat par thread).
+    Le temps total est borné par `timeout`, quel que soit le nombre de fichiers.
+    Retourne {path: {"exists", "size", "mtime", "error"}}.
+    """
+    results = {}
+    threads = []
+
+    def target(p):
+        try:
+            results[p] = _stat(p)
+        except Exception as e:
+            results[p] = {"exists": False, "size": None, "mtime": None, "error": str(e)}
+
+    for p in paths:
+        t = threading.Thread(target=target, args=(p,), daemon=True)
+        t.start()
+        threads.append(t)
+
+    deadline = time.monotonic() + timeout
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+
+    probes = {}
+    for p in paths:
+        probes[p] = results.get(p) or {
+            "exists": False, "size": None, "mtime": None,
+            "error": f"pas de réponse après {timeout:.0f} s",
+        }
+    return probes
+
+
+# ---------------------------------------------------------
+# LECTURE AVEC REPRISES
+# ---------------------------------------------------------
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_bytes(path, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, deadline=None, log=print):
+    """
+    Lit le fichier complet en mémoire, avec au plus `retries` tentatives espacées
+    d'un backoff exponentiel. Le temps total (tentatives + attentes) est borné par
+    `deadline` secondes (défaut : `timeout`) : chaque tentative ne reçoit que le
+    temps restant, le repli sur l'instantané n'attend jamais plus longtemps.
+    Les tentatives échouées sont signalées par `log`.
+    """
+    end = time.monotonic() + (timeout if deadline is None else deadline)
+    last_error = None
+    for attempt in range(retries):
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            return run_with_timeout(_read_file, min(timeout, remaining), path)
+        except Exception as e:
+            last_error = e
+            log(f"  Tentative {attempt + 1}/{retries} échouée pour {path} : {e}")
+            if attempt < retries - 1:
+                time.sleep(max(0.0, min(backoff * (2 ** attempt), end - time.monotonic())))
+    raise last_error or SourceTimeout(f"pas de réponse après {timeout if deadline is None else deadline:.0f} s")
+
+
+# ---------------------------------------------------------
+# INSTANTANES LOCAUX
+# ---------------------------------------------------------
+def _snapshot_paths(name):
+    base = os.path.join(SNAPSHOT_DIR, name)
+    return base, base + ".meta.json"
+
+
+def save_snapshot(name, content, probe=None):
+    """Écrit l'instantané de manière atomique (fichier temporaire + os.replace)."""
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    data_path, meta_path = _snapshot_paths(name)
+    meta = {
+        "saved_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "size": len(content),
+        "source_mtime": probe.get("mtime") if probe else None,
+    }
+    tmp = data_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, data_path)
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+
+
+def load_snapshot(name):
+    """Retourne (contenu, date de sauvegarde) ou (None, None) si absent."""
+    data_path, meta_path = _snapshot_paths(name)
+    if not os.path.exists(data_path):
+        return None, None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            saved_at = datetime.datetime.fromisoformat(json.load(f)["saved_at"])
+    except Exception:
+        saved_at = datetime.datetime.fromtimestamp(os.path.getmtime(data_path))
+    with open(data_path, "rb") as f:
+        return f.read(), saved_at
+
+
+def format_age(saved_at, now=None):
+    now = now or datetime.datetime.now()
+    seconds = max(0, int((now - saved_at).total_seconds()))
+    if seconds < 3600:
+        return f"{seconds // 60} min"
+    if seconds < 86400:
+        return f"{seconds // 3600} h"
+    return f"{seconds // 86400} j"
+
+
+# ---------------------------------------------------------
+# POINT D'ENTREE
+# ---------------------------------------------------------
+def read_excel_resilient(path, probe=None, timeout=None, retries=DEFAULT_RETRIES, log=print, **read_kwargs):
+    """
+    Lit un fichier Excel du partage avec timeout et reprises, puis met à jour
+    l'instantané local. En cas d'échec (partage injoignable, fichier illisible),
+    relit le dernier instantané valide. Reprises et repli sont signalés par `log`.
+
+    Retourne (DataFrame, info) avec info = {"from_cache", "saved_at", "error"}.
+    Lève SourceUnavailable si aucune donnée n'est disponible.
+    """
+    name = os.path.basename(path.replace("\\", "/"))
+    if timeout is None:
+        timeout = SOURCE_TIMEOUTS.get(name, DEFAULT_TIMEOUT)
+
+    error = ""
+    if probe is not None and not probe["exists"]:
+        # Inutile d'attendre les timeouts de lecture : la sonde a déjà échoué
+        error = probe["error"] or "fichier introuvable"
+    else:
+        try:
+            content = read_bytes(path, timeout=timeout, retries=retries, log=log)
+            df = pd.read_excel(io.BytesIO(content), **read_kwargs)
+            # Instantané uniquement si le fichier a été lu correctement
+            try:
+                save_snapshot(name, content, probe)
+            except Exception as e:
+                log(f"  Instantané non sauvegardé pour {name} : {e}")
+            return df, {"from_cache": False, "saved_at": None, "error": ""}
+        except Exception as e:
+            error = str(e)
+
+    content, saved_at = load_snapshot(name)
+    if content is None:
+        raise SourceUnavailable(error)
+
+    log(f"  Repli sur l'instantané local de {name} ({saved_at:%d/%m/%Y %H:%M}) : {error}")
+    df = pd.read_excel(io.BytesIO(content), **read_kwargs)
+    return df, {"from_cache": True, "saved_at": saved_at, "error": error}
+
+
+def fallback_warning(label, info):
+    """Message du bandeau quand une source provient de l'instantané local."""
+    if not info.get("from_cache"):
+        return ""
+    saved_at = info["saved_at"]
+    # L'ancienneté est calculée par le navigateur : le bandeau reste identique d'une
+    # exécution à l'autre tant que l'instantané ne change pas (publication sur changement)
+    return (f"⚠️ Partage réseau indisponible ({label}) : données du {saved_at:%d/%m/%Y %H:%M} "
+            f"<span class=\"cache-age\" data-saved-at=\"{saved_at.isoformat(timespec='seconds')}\"></span>"
+            f" issues du cache local")
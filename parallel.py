@@ -0,0 +1,95 @@
+"""
+Répartition d'un calcul par tranches de périodes sur un pool de processus.
+
+Les entrées volumineuses en lecture seule (matrice journalière, calendrier,
+jours ouvrés, budgets phasés...) sont copiées une seule fois dans des blocs de
+mémoire partagée ; chaque processus s'y attache à son démarrage et les lit
+comme des tableaux numpy, sans copie. Les paramètres légers sont transmis une
+fois par processus (initialiseur) : une tâche ne transporte que ses bornes.
+
+Les tranches sont contiguës et leurs résultats rendus dans l'ordre de
+soumission : la fusion est déterministe, identique au calcul séquentiel.
+
+Mode facultatif (--workers, séquentiel par défaut) : le gain n'a pas été
+mesuré sur une machine multicœur. Sur 40 ans d'historique, l'étape mensuelle
+ne représente qu'environ 20 % du calcul et le démarrage du pool coûte
+0,1 à 0,3 s ; à réévaluer avant de l'activer par défaut.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# En dessous, le démarrage des processus coûte plus que le calcul qu'ils économisent
+MIN_ITEMS_PER_TASK = 24
+
+_context = None
+_blocks = []
+
+
+def worker_count(requested):
+    """--workers : 0 = un processus par cœur, 1 = séquentiel."""
+    return (os.cpu_count() or 1) if requested == 0 else max(1, int(requested))
+
+
+def task_count(n_items, workers=1):
+    """Nombre de tâches effectivement lancées (1 = calcul séquentiel dans le processus courant)."""
+    return max(1, min(worker_count(workers), n_items // MIN_ITEMS_PER_TASK))
+
+
+def chunks(n_items, n_tasks):
+    """Bornes (début, fin) de n_tasks tranches contiguës de tailles équilibrées."""
+    edges = np.linspace(0, n_items, n_tasks + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def share_arrays(arrays):
+    """Copie chaque tableau dans un bloc de mémoire partagée -> (descripteurs, blocs)."""
+    specs, blocks = {}, []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        specs[name] = (block.name, array.shape, array.dtype.str)
+        blocks.append(block)
+    return specs, blocks
+
+
+def _init_worker(specs, params):
+    global _context
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        # Référence conservée : le tableau n'est valide que tant que le bloc est ouvert
+        _blocks.append(block)
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+    _context = dict(params, **arrays)
+
+
+def _run(task):
+    func, start, stop = task
+    return func(_context, start, stop)
+
+
+def map_chunks(func, arrays, params, n_items, workers=1):
+    """
+    func(contexte, début, fin) -> liste de résultats, appliquée à des tranches de [0, n_items).
+    contexte = params + arrays (tableaux numpy). func doit être définie au niveau module.
+    Retourne la concaténation des résultats dans l'ordre des éléments.
+    """
+    n_tasks = task_count(n_items, workers)
+    if n_tasks == 1:
+        return func(dict(params, **arrays), 0, n_items)
+
+    specs, blocks = share_arrays(arrays)
+    try:
+        with ProcessPoolExecutor(n_tasks, initializer=_init_worker, initargs=(specs, params)) as pool:
+            parts = list(pool.map(_run, [(func, a, b) for a, b in chunks(n_items, n_tasks)]))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return [item for part in parts for item in part]
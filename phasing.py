@@ -0,0 +1,173 @@
+"""
+Phasage du budget mensuel sur les jours ouvrés.
+
+Le budget d'un mois est réparti sur ses jours ouvrés selon un profil de poids,
+choisi par année :
+- uniforme      : même part chaque jour ouvré (comportement historique)
+- jours_semaine : poids par jour de semaine (Lun..Ven)
+- fin_de_mois   : rampe linéaire, le dernier jour ouvré pèse (1 + rampe) fois le premier
+- historique    : profil appris sur la répartition des expéditions (caexpj) des
+                  mois complets des années précédentes, par rang du jour avant la fin de mois
+
+Configuration : feuille "Phasage" de Budget.xlsx (facultative), une ligne par année :
+    Annee | Profil | Lun | Mar | Mer | Jeu | Ven | Rampe
+Les années absentes utilisent le profil par défaut (option --phasage).
+
+Tous les mois sont phasés en un seul passage vectorisé sur le calendrier.
+"""
+import numpy as np
+import pandas as pd
+
+import common
+
+PROFILES = {
+    "uniforme": "Uniforme",
+    "jours_semaine": "Poids par jour de semaine",
+    "fin_de_mois": "Rampe de fin de mois",
+    "historique": "Appris sur l'historique",
+}
+DEFAULT_PROFILE = "uniforme"
+CONFIG_SHEET = "phasage"
+WEEKDAY_COLUMNS = ["lun", "mar", "mer", "jeu", "ven"]
+DEFAULT_RAMP = 1.0
+# Rangs "jours ouvrés avant la fin de mois" appris (au-delà : regroupés dans le dernier)
+HISTORY_RANKS = 23
+
+
+def year_profile(profile=DEFAULT_PROFILE, weekday_weights=None, ramp=DEFAULT_RAMP):
+    return {
+        "profile": profile,
+        "weekday_weights": list(weekday_weights or [1.0] * 5),
+        "ramp": float(ramp),
+    }
+
+
+def parse_config(df_sheet):
+    """
+    Feuille "Phasage" (avec en-tête) -> ({annee: profil}, constats).
+    Les lignes illisibles ou au profil inconnu sont écartées (constat "error").
+    Poids Lun..Ven négatifs ou tous nuls (jours_semaine), rampe <= -1 (fin_de_mois,
+    poids négatifs en fin de mois) : l'année est phasée en uniforme (constat "error").
+    """
+    config, findings = {}, []
+    if df_sheet is None or df_sheet.empty:
+        return config, findings
+
+    df = df_sheet.rename(columns=common.normalize_label)
+    if "annee" not in df.columns or "profil" not in df.columns:
+        findings.append(common.finding("Budget", "phasage_colonnes", "error", 1,
+                                           "Feuille Phasage ignorée : colonnes Annee et Profil attendues"))
+        return config, findings
+
+    invalid = []
+    for i, row in df.iterrows():
+        year = pd.to_numeric(row["annee"], errors="coerce")
+        profile = common.normalize_label(row["profil"]) if pd.notna(row["profil"]) else ""
+        if pd.isna(year) or profile not in PROFILES:
+            invalid.append(f"ligne {int(i) + 2} : {row['annee']} / {row['profil']}")
+            continue
+        weights = [pd.to_numeric(row.get(c), errors="coerce") for c in WEEKDAY_COLUMNS]
+        weights = [float(w) if pd.notna(w) else 1.0 for w in weights]
+        ramp = pd.to_numeric(row.get("rampe"), errors="coerce")
+        ramp = float(ramp) if pd.notna(ramp) else DEFAULT_RAMP
+        bad_weights = profile == "jours_semaine" and (min(weights) < 0 or max(weights) == 0)
+        bad_ramp = profile == "fin_de_mois" and ramp <= -1
+        if bad_weights or bad_ramp:
+            detail = f"poids {weights}" if bad_weights else f"rampe {ramp:g}"
+            invalid.append(f"ligne {int(i) + 2} : {row['annee']} / {detail} -> uniforme")
+            config[int(year)] = year_profile(DEFAULT_PROFILE)
+            continue
+        config[int(year)] = year_profile(profile, weights, ramp)
+
+    if invalid:
+        findings.append(common.finding("Budget", "phasage_invalide", "error", len(invalid),
+                                           f"Lignes de phasage écartées (profils : {', '.join(PROFILES)} ; "
+                                           "poids >= 0 non tous nuls, rampe > -1)", invalid))
+    return config, findings
+
+
+def _working_ranks(working, bounds):
+    """Rang du jour ouvré dans son mois (1..n), nombre de jours ouvrés du mois, segment de chaque jour."""
+    lengths = np.diff(bounds)
+    segments = np.repeat(np.arange(len(lengths)), lengths)
+    working_int = working.astype(int)
+    rank = pd.Series(working_int).groupby(segments).cumsum().to_numpy()
+    n_working = np.bincount(segments, weights=working_int, minlength=len(lengths)).astype(int)
+    return rank, n_working[segments], segments
+
+
+def learn_history(values, working, bounds, period_years, complete, years):
+    """
+    Profil appris par année : poids relatif (1 = uniforme) par rang de jour ouvré
+    avant la fin de mois, moyenné sur les mois complets des années précédentes
+    (à défaut, de tous les mois complets). Retourne {annee: tableau HISTORY_RANKS}.
+    """
+    rank, n_day, segments = _working_ranks(working, bounds)
+    totals = np.bincount(segments, weights=np.where(working, values, 0.0), minlength=len(bounds) - 1)
+    sample = working & complete[segments] & (totals[segments] > 0)
+
+    reverse = np.minimum(n_day - rank, HISTORY_RANKS - 1)[sample]
+    relative = (np.clip(values[sample], 0, None) * n_day[sample] / totals[segments][sample])
+    sample_years = period_years[segments][sample]
+
+    learned = {}
+    for year in years:
+        use = sample_years < year
+        if not use.any():
+            use = np.ones(len(relative), dtype=bool)
+        counts = np.bincount(reverse[use], minlength=HISTORY_RANKS)
+        sums = np.bincount(reverse[use], weights=relative[use], minlength=HISTORY_RANKS)
+        learned[year] = np.where(counts > 0, sums / np.maximum(counts, 1), 1.0)
+    return learned
+
+
+def phase_budget(days, working, bounds, period_budgets, period_years, config, default_profile=DEFAULT_PROFILE,
+                 history_values=None, complete=None):
+    """
+    Budget journalier de tous les mois du calendrier (build_calendar) en un passage.
+    period_budgets : budgets par période, ou matrice (scénarios x périodes).
+    Un mois sans jour ouvré ou dont les poids sont nuls ne reçoit aucun budget.
+    Retourne (budget journalier, budget cumulé par mois), de longueur len(days)
+    (ou matrices scénarios x jours).
+    """
+    if len(days) == 0:
+        empty = np.zeros(np.shape(period_budgets)[:-1] + (0,))
+        return empty, empty.copy()
+
+    rank, n_day, segments = _working_ranks(working, bounds)
+    years = sorted({int(y) for y in period_years})
+    profiles = {y: config.get(y) or year_profile(default_profile) for y in years}
+    year_pos = np.searchsorted(years, period_years[segments])
+
+    # Paramètres par année, diffusés sur les jours par indexation
+    profile_ids = np.array([list(PROFILES).index(profiles[y]["profile"]) for y in years])[year_pos]
+    # Samedi / dimanche travaillés (masque de repos personnalisé) : poids uniforme
+    weekday_table = np.array([profiles[y]["weekday_weights"] + [1.0, 1.0] for y in years])
+    ramps = np.array([profiles[y]["ramp"] for y in years])[year_pos]
+
+    weights = np.ones(len(days))
+    weights = np.where(profile_ids == 1, weekday_table[year_pos, days.weekday], weights)
+    weights = np.where(profile_ids == 2, 1.0 + ramps * (rank - 1) / np.maximum(n_day - 1, 1), weights)
+    if (profile_ids == 3).any():
+        learned = learn_history(history_values, working, bounds, period_years, complete, years)
+        learned_table = np.array([learned[y] for y in years])
+        reverse = np.clip(n_day - rank, 0, HISTORY_RANKS - 1)
+        weights = np.where(profile_ids == 3, learned_table[year_pos, reverse], weights)
+    weights = np.where(working, weights, 0.0)
+
+    # Application des poids à tous les scénarios d'un coup : (scénarios x jours)
+    budgets = np.atleast_2d(period_budgets)
+    weight_sums = np.bincount(segments, weights=weights, minlength=budgets.shape[1])
+    budget_daily = np.where(weight_sums[segments] > 0,
+                            budgets[:, segments] * weights / np.where(weight_sums > 0, weight_sums, 1.0)[segments],
+                            0.0)
+    budget_cumul = pd.DataFrame(budget_daily.T).groupby(segments).cumsum().to_numpy().T
+    if np.ndim(period_budgets) == 1:
+        return budget_daily[0], budget_cumul[0]
+    return budget_daily, budget_cumul
+
+
+def describe(config, years, default_profile=DEFAULT_PROFILE):
+    """Constat "info" listant le profil retenu pour chaque année."""
+    chosen = [f"{y} : {PROFILES[(config.get(y) or year_profile(default_profile))['profile']]}" for y in sorted(years)]
+    return common.finding("Budget", "phasage", "info", len(chosen), "Profil de phasage du budget par année", chosen)
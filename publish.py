@@ -0,0 +1,121 @@
+"""
+Publication du dashboard : écriture adressée par contenu.
+
+- L'empreinte du contenu (données + shell, sans horodatage) est comparée à
+  celle de la version publiée (dashboard_version.json) : si elle est identique,
+  rien n'est réécrit et les copies des clients restent valides.
+- Sinon, seules les sections de données modifiées sont réécrites, puis le HTML,
+  puis le manifeste en dernier : un client qui lit le manifeste trouve toujours
+  les fichiers correspondants. Chaque fichier est écrit dans un fichier
+  temporaire puis renommé (os.replace).
+- Les fichiers de sections absentes du nouveau manifeste (année retirée...)
+  sont supprimés après la bascule.
+- dashboard_versions.json garde les N dernières versions publiées (empreintes,
+  taille, durées) pour les caches et contrôles en aval ; il n'est écrit que
+  lorsqu'une version est publiée.
+"""
+import os
+import json
+import time
+
+import spa_cache
+
+OUTPUT_HTML = "dashboard_dynamique.html"
+HISTORY_FILE = "dashboard_versions.json"
+HISTORY_SIZE = 20
+
+
+def atomic_write(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def published_manifest(out_dir="."):
+    """Manifeste de la version publiée, ou None si le dashboard n'a jamais été publié (ou est incomplet)."""
+    if not os.path.exists(os.path.join(out_dir, OUTPUT_HTML)):
+        return None
+    return _read_json(os.path.join(out_dir, spa_cache.VERSION_FILE))
+
+
+def _record(out_dir, entry):
+    """Ajoute une version publiée à l'historique."""
+    path = os.path.join(out_dir, HISTORY_FILE)
+    history = _read_json(path) or {"versions": []}
+    history["versions"] = ([entry] + history.get("versions", []))[:HISTORY_SIZE]
+    atomic_write(path, json.dumps(history, indent=1))
+
+
+def _prune_sections(out_dir, sections):
+    """Supprime les fichiers de sections qui ne figurent plus dans le manifeste publié."""
+    data_dir = os.path.join(out_dir, spa_cache.DATA_DIR)
+    keep = {os.path.basename(spa_cache.section_file(name)) for name in sections}
+    removed = 0
+    for filename in os.listdir(data_dir):
+        if filename.endswith(".json") and filename not in keep:
+            os.remove(os.path.join(data_dir, filename))
+            removed += 1
+    return removed
+
+
+def publish(html_content, sections, manifest, timings=None, out_dir=".", force=False):
+    """
+    Publie le dashboard si son contenu a changé.
+    Retourne True si une nouvelle version a été écrite, False si elle était déjà publiée.
+    """
+    t0 = time.perf_counter()
+    previous = published_manifest(out_dir)
+    if previous and previous.get("content") == manifest["content"] and not force:
+        print(f"Dashboard inchangé (version {manifest['content']}) : aucune écriture")
+        return False
+
+    # 1. Sections de données : seules celles dont l'empreinte a changé (ou absentes)
+    os.makedirs(os.path.join(out_dir, spa_cache.DATA_DIR), exist_ok=True)
+    previous_sections = (previous or {}).get("sections", {})
+    written = 0
+    for name, text in sections.items():
+        path = os.path.join(out_dir, spa_cache.section_file(name))
+        if previous_sections.get(name) == manifest["sections"][name] and os.path.exists(path) and not force:
+            continue
+        atomic_write(path, text)
+        written += 1
+
+    sw_path = os.path.join(out_dir, spa_cache.SERVICE_WORKER_FILE)
+    try:
+        with open(sw_path, encoding="utf-8") as f:
+            sw_unchanged = f.read() == spa_cache.SERVICE_WORKER_JS
+    except OSError:
+        sw_unchanged = False
+    if not sw_unchanged:
+        atomic_write(sw_path, spa_cache.SERVICE_WORKER_JS)
+
+    # 2. Page, puis 3. manifeste en dernier (bascule de version pour les clients)
+    atomic_write(os.path.join(out_dir, OUTPUT_HTML), html_content)
+    atomic_write(os.path.join(out_dir, spa_cache.VERSION_FILE), json.dumps(manifest))
+    # 4. Sections disparues : supprimées une fois le nouveau manifeste en place
+    _prune_sections(out_dir, manifest["sections"])
+
+    write_s = time.perf_counter() - t0
+    entry = {
+        "content": manifest["content"],
+        "version": manifest["version"],
+        "shell": manifest["shell"],
+        "generated": manifest["generated"],
+        "last_update": manifest["last_update"],
+        "size": len(html_content.encode("utf-8")),
+        "sections_written": written,
+        "timings": dict(timings or {}, write_s=round(write_s, 3)),
+    }
+    _record(out_dir, entry)
+    print(f"Fichier généré: {OUTPUT_HTML} (version {manifest['content']}, "
+          f"{written}/{len(sections)} sections réécrites, {write_s:.2f} s)")
+    return True
@@ -0,0 +1,188 @@
+"""
+Agrégations par année civile, semaine ISO, trimestre et exercice fiscal.
+
+Les quatre granularités sont calculées en un seul passage : la matrice
+journalière (jours x indicateurs) est empilée une fois par granularité, chaque
+jour reçoit la clé de sa période, et le moteur de metrics.py calcule cumuls et
+totaux sur tous les segments d'un coup.
+
+Le budget est réparti par jour ouvré (calendrier des fériés) : une semaine à
+cheval sur deux mois reçoit la part de budget de chacun de ses jours ouvrés.
+"""
+import numpy as np
+import pandas as pd
+
+import metrics
+import scenarios
+
+GRANULARITIES = {
+    "week": "Semaine ISO",
+    "quarter": "Trimestre",
+    "fiscal": "Exercice fiscal",
+}
+
+
+def fiscal_label(fiscal_year, start_month):
+    if start_month == 1:
+        return f"Exercice {fiscal_year}"
+    return f"Exercice {fiscal_year}/{(fiscal_year + 1) % 100:02d}"
+
+
+def period_keys(days, fiscal_start_month=1):
+    """
+    Clé de période de chaque jour pour chaque granularité (vectorisé).
+    Les clés sont triables et contiguës dans l'ordre chronologique.
+    """
+    iso = days.isocalendar()
+    iso_year = iso["year"].to_numpy().astype(int)
+    iso_week = iso["week"].to_numpy().astype(int)
+    year = days.year.to_numpy()
+    fiscal_year = year - (days.month.to_numpy() < fiscal_start_month)
+    return {
+        "year": year.astype(str),
+        "week": np.char.add(np.char.add(iso_year.astype(str), "-W"), np.char.zfill(iso_week.astype(str), 2)),
+        "quarter": np.char.add(np.char.add(year.astype(str), "-T"), days.quarter.to_numpy().astype(str)),
+        "fiscal": np.char.add("FY", fiscal_year.astype(str)),
+    }
+
+
+def compute(days, values, working, budget_daily, fiscal_start_month=1, registry=metrics.METRICS, scenario_covered=None):
+    """
+    Cumuls et totaux de toutes les périodes de toutes les granularités.
+    budget_daily : budget journalier de référence, ou matrice (scénarios x jours).
+    scenario_covered : jours couverts par chaque scénario hors référence (scénarios x jours).
+    Retourne {granularité: [segment, ...]} avec segment =
+    {"key", "days", "totals", "cumuls", "budget", "budget_cumul", "jours_ouvres",
+     "scenario_budgets", "scenario_cumuls", "scenario_covered"} (scénarios hors référence).
+    """
+    result = {gran: [] for gran in ["year"] + list(GRANULARITIES)}
+    if len(days) == 0:
+        return result
+
+    keys_by_gran = period_keys(days, fiscal_start_month)
+    grans = list(result)
+    n = len(days)
+
+    # Empilement : une copie de la matrice par granularité, clé = "granularité|période"
+    stacked_keys = np.concatenate([np.char.add(gran + "|", keys_by_gran[gran]) for gran in grans])
+    stacked_values = np.tile(values, (len(grans), 1))
+    stacked_budget = np.tile(np.atleast_2d(budget_daily), (1, len(grans)))
+    stacked_working = np.tile(working.astype(int), len(grans))
+
+    change = np.concatenate([[True], stacked_keys[1:] != stacked_keys[:-1]])
+    starts = np.flatnonzero(change)
+    bounds = np.concatenate([starts, [len(stacked_keys)]])
+    lengths = np.diff(bounds)
+
+    cumuls, totals = metrics.aggregate_periods(stacked_values, bounds, registry)
+    segments = np.repeat(np.arange(len(starts)), lengths)
+    budget_cumul = pd.DataFrame(stacked_budget.T).groupby(segments).cumsum().to_numpy().T
+    jours_ouvres = np.add.reduceat(stacked_working, starts)
+    if scenario_covered is None:
+        scenario_covered = np.zeros((len(budget_cumul) - 1, n), dtype=bool)
+    # Un scénario couvre un segment s'il couvre au moins un de ses jours
+    segment_covered = np.logical_or.reduceat(np.tile(scenario_covered, (1, len(grans))), starts, axis=1) \
+        if len(scenario_covered) else np.zeros((0, len(starts)), dtype=bool)
+
+    for s, start in enumerate(starts):
+        end = bounds[s + 1]
+        gran, key = stacked_keys[start].split("|", 1)
+        result[gran].append({
+            "key": key,
+            "days": days[start % n:(end - 1) % n + 1],
+            "totals": totals[s],
+            "cumuls": cumuls[start:end],
+            "budget": float(budget_cumul[0, end - 1]),
+            "budget_cumul": budget_cumul[0, start:end],
+            "jours_ouvres": int(jours_ouvres[s]),
+            "scenario_budgets": budget_cumul[1:, end - 1],
+            "scenario_cumuls": budget_cumul[1:, start:end],
+            "scenario_covered": segment_covered[:, s],
+        })
+    return result
+
+
+def _label(gran, key, seg_days, fiscal_start_month):
+    if gran == "week":
+        return f"S{key[-2:]} ({seg_days[0]:%d/%m} - {seg_days[-1]:%d/%m/%Y})"
+    if gran == "quarter":
+        return f"T{key[-1]} {key[:4]}"
+    return fiscal_label(int(key[2:]), fiscal_start_month)
+
+
+def period_tree(result, fiscal_start_month=1, registry=metrics.METRICS, scenario_keys=()):
+    """
+    DB_ROLLUPS[granularité][clé] = entrée au même format qu'un mois de DB_DATA,
+    plus "label" et "years" (années civiles couvertes, pour le sélecteur).
+    """
+    tree = {}
+    for gran in GRANULARITIES:
+        tree[gran] = {}
+        for seg in result[gran]:
+            seg_days = seg["days"]
+            entry = {
+                "label": _label(gran, seg["key"], seg_days, fiscal_start_month),
+                "years": sorted({int(y) for y in (seg_days[0].year, seg_days[-1].year)}),
+                "budget": seg["budget"],
+                "jours_ouvres": seg["jours_ouvres"],
+                "chart_labels": [d.strftime('%d/%m') for d in seg_days],
+                "chart_budget_trend": np.round(seg["budget_cumul"], 2).tolist(),
+            }
+            for j, m in enumerate(registry):
+                entry[m["key"]] = float(seg["totals"][j])
+                entry[m["chart_key"]] = np.round(seg["cumuls"][:, j], 2).tolist()
+            if scenario_keys:
+                entry["scenarios"] = scenarios.entries(scenario_keys, seg["scenario_budgets"],
+                                                       np.round(seg["scenario_cumuls"], 2), seg["scenario_covered"])
+            tree[gran][seg["key"]] = entry
+    return tree
+
+
+def annual_entries(result, periods, period_totals, period_budgets, period_jours, registry=metrics.METRICS,
+                   scenario_budgets=None, scenario_keys=(), scenario_covered=None):
+    """
+    Entrées "0" (année entière) de DB_DATA : histogramme mensuel 01..12 + TOTAL.
+    Les totaux annuels viennent du passage unique (granularité "year"), les
+    histogrammes sont remplis par indexation vectorisée (année, mois).
+    scenario_budgets / scenario_covered : budgets et mois couverts (scénarios hors référence x périodes).
+    """
+    year_segments = {seg["key"]: seg for seg in result["year"]}
+    years = sorted(year_segments, key=int)
+    if not years:
+        return {}
+
+    year_pos = {y: i for i, y in enumerate(years)}
+    rows = np.array([year_pos[str(y)] for y, _ in periods])
+    cols = np.array([m - 1 for _, m in periods])
+
+    hist = np.zeros((len(years), 12, len(registry)))
+    hist[rows, cols] = period_totals
+    hist_budget = np.zeros((len(years), 12))
+    hist_budget[rows, cols] = period_budgets
+    ann_budget = hist_budget.sum(axis=1)
+    ann_jours = np.bincount(rows, weights=period_jours, minlength=len(years)).astype(int)
+    hist_scenarios = np.zeros((len(scenario_keys), len(years), 12))
+    year_covered = np.zeros((len(scenario_keys), len(years)), dtype=bool)
+    if scenario_keys:
+        hist_scenarios[:, rows, cols] = scenario_budgets
+        np.logical_or.at(year_covered, (slice(None), rows), scenario_covered)
+    ann_scenarios = hist_scenarios.sum(axis=2)
+
+    entries = {}
+    for i, y in enumerate(years):
+        seg = year_segments[y]
+        entry = {
+            "budget": float(ann_budget[i]),
+            "jours_ouvres": int(ann_jours[i]),
+            "chart_labels": [f"{m:02d}" for m in range(1, 13)] + ["TOTAL"],
+            "chart_budget_trend": hist_budget[i].tolist() + [float(ann_budget[i])],
+        }
+        for j, m in enumerate(registry):
+            total = float(seg["totals"][j])
+            entry[m["key"]] = total
+            entry[m["chart_key"]] = hist[i, :, j].tolist() + [total]
+        if scenario_keys:
+            trends = [hist_scenarios[s, i].tolist() + [float(ann_scenarios[s, i])] for s in range(len(scenario_keys))]
+            entry["scenarios"] = scenarios.entries(scenario_keys, ann_scenarios[:, i], trends, year_covered[:, i])
+        entries[y] = entry
+    return entries
@@ -0,0 +1,109 @@
+"""
+Versions du budget (initial, révisé, prévision...) calculées côte à côte.
+
+Sources, dans Budget.xlsx :
+- la première feuille est le budget de référence (MoisNum, Annee, MoisNom, Budget) ;
+  une 5e colonne facultative nomme le scénario de chaque ligne (vide = référence)
+- les autres feuilles nommées "Scénario <nom>" (même format) sont des scénarios ;
+  les autres feuilles du classeur (Phasage, notes, calculs...) sont ignorées
+Deux scénarios dont les noms donnent la même clé (casse, accents, espaces) sont refusés.
+
+Les budgets sont rangés dans une matrice (scénarios x périodes) : le phasage,
+les cumuls et les totaux annuels sont calculés pour tous les scénarios en une
+seule opération sur (scénarios x jours). Le scénario 0 est la référence (KPI,
+écart, exports) ; les autres sont superposés aux graphiques du dashboard.
+"""
+import numpy as np
+import pandas as pd
+
+import common
+
+BUDGET_COLUMNS = ["MoisNum", "Annee", "MoisNom", "Budget"]
+REFERENCE_NAME = "Budget"
+# Préfixe (normalisé) des feuilles de scénario : "Scénario Révisé" -> scénario "Révisé"
+SHEET_PREFIX = "scenario"
+# Couleurs des courbes de scénario (la référence garde le rouge du budget)
+COLORS = ["#e67e22", "#16a085", "#34495e", "#8e44ad", "#7f8c8d"]
+
+
+def scenario_key(name):
+    return common.normalize_label(name) or "scenario"
+
+
+def sheet_scenario_name(sheet_name):
+    """Nom du scénario porté par une feuille "Scénario <nom>", None pour une autre feuille."""
+    words = str(sheet_name).split(None, 1)
+    if len(words) == 2 and common.normalize_label(words[0]) == SHEET_PREFIX:
+        return words[1].strip()
+    return None
+
+
+def split_sheets(sheets):
+    """
+    Feuilles lues sans en-tête -> [(nom, DataFrame BUDGET_COLUMNS brut)], référence en tête.
+    Lève ValueError si deux scénarios ont la même clé.
+    """
+    items = list(sheets.items())
+    first_name, first = items[0]
+    scenarios = []
+
+    if first.shape[1] > 4 and first.iloc[:, 4].notna().any():
+        # Ligne d'en-tête éventuelle (année non numérique) : écartée avant regroupement
+        if pd.isna(pd.to_numeric(first.iloc[0, 1], errors="coerce")):
+            first = first.iloc[1:]
+        names = first.iloc[:, 4].map(lambda v: str(v).strip() if pd.notna(v) and str(v).strip() else None)
+        order = ([None] if names.isna().any() else []) + list(dict.fromkeys(names.dropna()))
+        for name in order:
+            rows = names.isna() if name is None else names == name
+            scenarios.append((name or REFERENCE_NAME, first.loc[rows].iloc[:, :4].set_axis(BUDGET_COLUMNS, axis=1)))
+    else:
+        scenarios.append((REFERENCE_NAME, first.iloc[:, :4].set_axis(BUDGET_COLUMNS, axis=1)))
+
+    for sheet_name, sheet in items[1:]:
+        name = sheet_scenario_name(sheet_name)
+        if name is None or sheet.empty:
+            continue
+        if sheet.shape[1] < 4:
+            raise ValueError(f"Feuille \"{sheet_name}\" : 4 colonnes attendues ({', '.join(BUDGET_COLUMNS)})")
+        scenarios.append((name, sheet.iloc[:, :4].set_axis(BUDGET_COLUMNS, axis=1)))
+
+    seen = {}
+    for name, _ in scenarios:
+        key = scenario_key(name)
+        if key in seen:
+            raise ValueError(f"Scénarios \"{seen[key]}\" et \"{name}\" indiscernables (même clé \"{key}\") : renommer l'un des deux")
+        seen[key] = name
+    return scenarios
+
+
+def budget_matrix(frames, periods):
+    """
+    Budgets (scénarios x périodes) ; 0 pour un mois absent d'un scénario.
+    Retourne (matrice, masque des mois couverts par chaque scénario).
+    """
+    matrix = np.zeros((len(frames), len(periods)))
+    covered = np.zeros((len(frames), len(periods)), dtype=bool)
+    pos = {p: i for i, p in enumerate(periods)}
+    for s, df in enumerate(frames):
+        if df.empty:
+            continue
+        cols = [pos.get(p, -1) for p in zip(df["Annee"], df["MoisNum"])]
+        keep = np.array(cols) >= 0
+        matrix[s, np.array(cols)[keep]] = df["Budget"].to_numpy(dtype=float)[keep]
+        covered[s, np.array(cols)[keep]] = True
+    return matrix, covered
+
+
+def public_list(names):
+    """Scénarios superposables (hors référence) : clé, libellé, couleur (sérialisé dans le HTML)."""
+    return [{"key": scenario_key(n), "label": n, "color": COLORS[i % len(COLORS)]}
+            for i, n in enumerate(names[1:])]
+
+
+def entries(keys, budgets, trends, covered):
+    """
+    Clé "scenarios" d'une période : {clé: {"budget", "chart_budget_trend"}}
+    pour les scénarios hors référence qui couvrent la période.
+    """
+    return {k: {"budget": float(b), "chart_budget_trend": np.asarray(t).tolist()}
+            for k, b, t, c in zip(keys, budgets, trends, covered) if c}
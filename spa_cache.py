@@ -0,0 +1,123 @@
+"""
+Données du dashboard découpées en sections versionnées, pour le cache navigateur.
+
+- Le payload (DB_DATA, DB_ROLLUPS...) est découpé en sections (une par année
+  pour DB_DATA, une par granularité pour DB_ROLLUPS), chacune avec son empreinte.
+- Le manifeste (version globale + empreintes) est injecté dans la page et écrit
+  dans dashboard_version.json ; chaque section est écrite dans dashboard_data/.
+- Servie en HTTP, la page s'affiche depuis IndexedDB puis ne télécharge que les
+  sections dont l'empreinte a changé. Un Service Worker met en cache le shell
+  et les librairies (Chart.js, polices).
+"""
+import os
+import json
+import hashlib
+import datetime
+
+DATA_DIR = "dashboard_data"
+VERSION_FILE = "dashboard_version.json"
+SERVICE_WORKER_FILE = "sw.js"
+
+# Sections découpées par clé de premier niveau (les autres restent entières)
+SPLIT_SECTIONS = ("DB_DATA", "DB_ROLLUPS")
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'))
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def split_payload(payload):
+    """{"DB_DATA": {"2025": ...}} -> {"DB_DATA.2025": ...} (JSON sérialisé par section)."""
+    sections = {}
+    for name, value in payload.items():
+        if name in SPLIT_SECTIONS and isinstance(value, dict):
+            for key, sub in value.items():
+                sections[f"{name}.{key}"] = _dumps(sub)
+        else:
+            sections[name] = _dumps(value)
+    return sections
+
+
+def build_manifest(sections, last_update_str=""):
+    hashes = {name: _digest(text) for name, text in sorted(sections.items())}
+    return {
+        # Version globale = empreinte des empreintes de sections (indépendante de l'heure de génération)
+        "version": _digest(_dumps(hashes)),
+        "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+        "last_update": last_update_str,
+        "sections": hashes,
+    }
+
+
+def inline_json(value):
+    """JSON sûr à l'intérieur d'une balise <script> (pas de "</script>" prématuré)."""
+    return _dumps(value).replace("</", "<\\/")
+
+
+# Marqueurs remplacés après rendu du template (les données ne font pas partie de la version du shell)
+PAYLOAD_PLACEHOLDER = "/*__DB_PAYLOAD__*/"
+MANIFEST_PLACEHOLDER = "/*__DB_MANIFEST__*/"
+
+
+def shell_version(html_template):
+    return _digest(html_template)
+
+
+def content_hash(manifest):
+    """Empreinte du contenu publié (données + shell), sans l'horodatage de génération."""
+    return _digest(manifest["version"] + manifest["shell"])
+
+
+def fill_placeholders(html_template, payload, manifest):
+    return (html_template
+            .replace(PAYLOAD_PLACEHOLDER, inline_json(payload), 1)
+            .replace(MANIFEST_PLACEHOLDER, inline_json(manifest), 1))
+
+
+def section_file(name):
+    return os.path.join(DATA_DIR, f"{name}.json")
+
+
+# Service Worker : shell et librairies en cache d'abord ; données et manifeste
+# toujours au réseau (le contrôle de version est fait par la page).
+SERVICE_WORKER_JS = """// Généré par analyze_budget.py - cache du shell et des librairies du dashboard
+const CACHE = 'suivi-budget-shell-v1';
+
+self.addEventListener('install', (event) => {
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(k => k !== CACHE).map(k => caches.delete(k))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (url.pathname.endsWith('/dashboard_version.json') || url.pathname.includes('/dashboard_data/')) return;
+
+    event.respondWith(caches.open(CACHE).then(async (cache) => {
+        const hit = await cache.match(request, { ignoreSearch: request.mode === 'navigate' });
+        if (hit) return hit;
+        const response = await fetch(request);
+        if (response.ok || response.type === 'opaque') cache.put(request, response.clone());
+        return response;
+    }));
+});
+
+// La page signale un nouveau shell (données, bandeaux, code) : on rafraîchit la copie en cache
+self.addEventListener('message', (event) => {
+    if (event.data && event.data.type === 'refresh-shell') {
+        event.waitUntil(caches.open(CACHE).then(cache => cache.add(new Request(event.data.url, { cache: 'reload' }))));
+    }
+});
+"""
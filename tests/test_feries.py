@@ -0,0 +1,55 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import feries
+
+
+@pytest.mark.parametrize("year, expected", [
+    (2019, datetime.date(2019, 4, 21)),
+    (2024, datetime.date(2024, 3, 31)),
+    (2025, datetime.date(2025, 4, 20)),
+    (2026, datetime.date(2026, 4, 5)),
+    (2038, datetime.date(2038, 4, 25)),
+])
+def test_easter_sunday(year, expected):
+    assert feries.easter_sunday(year) == expected
+
+
+def test_legal_holidays_2025():
+    days = dict((d, label) for d, label in feries.legal_holidays(2025))
+    assert len(days) == 11
+    assert days[datetime.date(2025, 4, 21)] == "Lundi de Pâques"
+    assert days[datetime.date(2025, 5, 29)] == "Ascension"
+    assert days[datetime.date(2025, 6, 9)] == "Lundi de Pentecôte"
+
+
+def test_alsace_moselle_extra_days():
+    general = {d for d, _ in feries.legal_holidays(2025)}
+    local = {d for d, _ in feries.legal_holidays(2025, feries.REGIME_ALSACE_MOSELLE)}
+    assert local - general == {datetime.date(2025, 4, 18), datetime.date(2025, 12, 26)}
+
+
+def test_parse_overrides_weekmask_and_markers():
+    df = pd.DataFrame({
+        "Jours_feries": pd.to_datetime(["2025-08-11", "2025-05-08", "2025-01-01"]),
+        "Unnamed: 1": [None, "Travaillé", None],
+        "régime": [111.0, None, None],   # "0000111" converti en nombre par Excel
+        "Alsace-Moselle": ["oui", None, None],
+    })
+    overrides = feries.parse_overrides(df)
+    assert overrides["added"] == {datetime.date(2025, 8, 11), datetime.date(2025, 1, 1)}
+    assert overrides["removed"] == {datetime.date(2025, 5, 8)}
+    assert overrides["weekmask"] == "0000111"
+    assert overrides["regime"] == feries.REGIME_ALSACE_MOSELLE
+    assert feries.rest_days(overrides) == [4, 5, 6]
+    assert datetime.date(2025, 5, 8) not in feries.holiday_dates([2025], overrides)
+
+
+def test_invalid_weekmask_keeps_dates():
+    df = pd.DataFrame({"Jours_feries": pd.to_datetime(["2025-08-11"]), "régime": ["lundi"]})
+    overrides = feries.parse_overrides(df)
+    assert overrides["added"] == {datetime.date(2025, 8, 11)}
+    assert overrides["weekmask"] == feries.DEFAULT_WEEKMASK
+    assert overrides["errors"]
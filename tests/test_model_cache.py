@@ -0,0 +1,79 @@
+import threading
+import types
+
+import pytest
+
+import budget_model
+import network_io
+
+
+@pytest.fixture
+def share(monkeypatch):
+    """Partage simulé : empreinte modifiable, compteurs de sondes et de calculs."""
+    state = {"mtime": 1.0, "probes": 0, "builds": 0, "fail": False, "gate": None}
+
+    def probe_sources(paths, timeout=None):
+        state["probes"] += 1
+        return {p: {"exists": True, "size": 1, "mtime": state["mtime"], "error": ""} for p in paths}
+
+    def load_sources(share_dir=None, verbose=True, store_dir=None):
+        return types.SimpleNamespace(fingerprint=budget_model.fingerprint(probe_sources(budget_model.source_paths(share_dir))))
+
+    def build_model(sources, *args):
+        if state["gate"] is not None:
+            state["gate"].wait(5)
+        state["builds"] += 1
+        if state["fail"]:
+            raise RuntimeError("calcul impossible")
+        return types.SimpleNamespace(fingerprint=sources.fingerprint)
+
+    monkeypatch.setattr(network_io, "probe_sources", probe_sources)
+    monkeypatch.setattr(budget_model, "load_sources", load_sources)
+    monkeypatch.setattr(budget_model, "build_model", build_model)
+    budget_model.clear_cache()
+    yield state
+    budget_model.clear_cache()
+
+
+def test_cache_hit_within_ttl_does_not_probe(share):
+    first = budget_model.get_model("partage", ttl=60)
+    probes = share["probes"]
+    assert budget_model.get_model("partage", ttl=60) is first
+    assert share["probes"] == probes
+    assert share["builds"] == 1
+
+
+def test_expired_ttl_probes_and_rebuilds_on_change(share):
+    first = budget_model.get_model("partage", ttl=0)
+    assert budget_model.get_model("partage", ttl=0) is first
+    assert share["builds"] == 1
+
+    share["mtime"] = 2.0
+    second = budget_model.get_model("partage", ttl=0)
+    assert second is not first
+    assert share["builds"] == 2
+
+
+def test_concurrent_calls_share_one_build(share):
+    share["gate"] = threading.Event()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(budget_model.get_model("partage", ttl=60)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    share["gate"].set()
+    for t in threads:
+        t.join(5)
+    assert share["builds"] == 1
+    assert len(results) == 5 and all(r is results[0] for r in results)
+
+
+def test_failed_build_is_not_cached(share):
+    share["fail"] = True
+    with pytest.raises(RuntimeError):
+        budget_model.get_model("partage", ttl=60)
+    assert not budget_model._building
+
+    share["fail"] = False
+    assert budget_model.get_model("partage", ttl=60) is not None
+    assert share["builds"] == 2
@@ -0,0 +1,85 @@
+import io
+import time
+
+import pandas as pd
+import pytest
+
+import network_io
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    monkeypatch.setattr(network_io, "SNAPSHOT_DIR", str(tmp_path / "cache"))
+    return tmp_path
+
+
+def _xlsx(values):
+    buf = io.BytesIO()
+    pd.DataFrame({"Valeur": values}).to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def test_read_bytes_retries_then_succeeds(monkeypatch):
+    calls = []
+
+    def flaky(path):
+        calls.append(path)
+        if len(calls) < 3:
+            raise OSError("partage occupé")
+        return b"ok"
+
+    monkeypatch.setattr(network_io, "_read_file", flaky)
+    messages = []
+    assert network_io.read_bytes("f", timeout=5, retries=3, backoff=0.01, log=messages.append) == b"ok"
+    assert len(calls) == 3
+    assert len(messages) == 2
+
+
+def test_read_bytes_raises_last_error_after_retries(monkeypatch):
+    def broken(path):
+        raise OSError("introuvable")
+
+    monkeypatch.setattr(network_io, "_read_file", broken)
+    with pytest.raises(OSError, match="introuvable"):
+        network_io.read_bytes("f", timeout=5, retries=2, backoff=0.01, log=_silent)
+
+
+def test_read_bytes_deadline_bounds_all_attempts(monkeypatch):
+    def hung(path):
+        time.sleep(2)
+        return b"trop tard"
+
+    monkeypatch.setattr(network_io, "_read_file", hung)
+    t0 = time.monotonic()
+    with pytest.raises(network_io.SourceTimeout):
+        network_io.read_bytes("f", timeout=0.2, retries=5, backoff=0.1, deadline=0.5, log=_silent)
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_read_excel_falls_back_to_snapshot(snapshots, monkeypatch):
+    path = str(snapshots / "Budget.xlsx")
+    with open(path, "wb") as f:
+        f.write(_xlsx([1, 2]))
+    df, info = network_io.read_excel_resilient(path, timeout=5, log=_silent)
+    assert not info["from_cache"] and df["Valeur"].tolist() == [1, 2]
+
+    def unreachable(path):
+        raise OSError("serveur injoignable")
+
+    monkeypatch.setattr(network_io, "_read_file", unreachable)
+    messages = []
+    df, info = network_io.read_excel_resilient(path, timeout=5, retries=1, log=messages.append)
+    assert info["from_cache"] and "injoignable" in info["error"]
+    assert df["Valeur"].tolist() == [1, 2]
+    assert any("Repli" in m for m in messages)
+    assert "cache-age" in network_io.fallback_warning("Budget", info)
+
+
+def test_read_excel_without_snapshot_is_unavailable(snapshots):
+    probe = {"exists": False, "size": None, "mtime": None, "error": "fichier introuvable"}
+    with pytest.raises(network_io.SourceUnavailable, match="introuvable"):
+        network_io.read_excel_resilient(str(snapshots / "Feries.xlsx"), probe=probe, log=_silent)
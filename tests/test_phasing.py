@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics
+import phasing
+
+PERIODS = [(2025, 1), (2025, 2), (2025, 3)]
+BUDGETS = np.array([100000.0, 80000.0, 120000.0])
+
+
+def _calendar():
+    days, bounds = metrics.build_calendar(PERIODS)
+    working = np.asarray(days.weekday < 5)
+    return days, bounds, working
+
+
+def _phase(config, default=phasing.DEFAULT_PROFILE, budgets=BUDGETS):
+    days, bounds, working = _calendar()
+    years = np.array([y for y, _ in PERIODS])
+    history = np.where(working, np.linspace(1.0, 2.0, len(days)), 0.0)
+    complete = np.ones(len(PERIODS), dtype=bool)
+    daily, cumul = phasing.phase_budget(days, working, bounds, budgets, years, config, default,
+                                        history_values=history, complete=complete)
+    return daily, cumul, bounds, working
+
+
+@pytest.mark.parametrize("profile", list(phasing.PROFILES))
+def test_profiles_sum_to_monthly_budget(profile):
+    config = {2025: phasing.year_profile(profile, [1.0, 2.0, 1.0, 1.0, 3.0], ramp=2.0)}
+    daily, cumul, bounds, working = _phase(config)
+    totals = np.add.reduceat(daily, bounds[:-1])
+    np.testing.assert_allclose(totals, BUDGETS)
+    np.testing.assert_allclose(cumul[bounds[1:] - 1], BUDGETS)
+    assert (daily[~working] == 0).all()
+
+
+def test_uniform_profile_is_flat_on_working_days():
+    daily, _, bounds, working = _phase({})
+    january = daily[bounds[0]:bounds[1]][working[bounds[0]:bounds[1]]]
+    np.testing.assert_allclose(january, BUDGETS[0] / working[bounds[0]:bounds[1]].sum())
+
+
+def test_end_of_month_ramp_increases():
+    daily, _, bounds, working = _phase({2025: phasing.year_profile("fin_de_mois", ramp=1.0)})
+    january = daily[bounds[0]:bounds[1]][working[bounds[0]:bounds[1]]]
+    assert (np.diff(january) > 0).all()
+    assert january[-1] == pytest.approx(2 * january[0])
+
+
+def test_scenario_matrix_matches_single_budget():
+    matrix = np.vstack([BUDGETS, BUDGETS * 0.5])
+    daily, cumul, _, _ = _phase({}, budgets=matrix)
+    single, _, _, _ = _phase({})
+    np.testing.assert_allclose(daily[0], single)
+    np.testing.assert_allclose(daily[1], single * 0.5)
+
+
+def test_parse_config_rejects_unknown_profile():
+    sheet = pd.DataFrame({"Annee": [2025, 2026], "Profil": ["Fin de mois", "inconnu"]})
+    config, findings = phasing.parse_config(sheet)
+    assert config[2025]["profile"] == "fin_de_mois"
+    assert 2026 not in config
+    assert findings[0]["check"] == "phasage_invalide"
+
+
+@pytest.mark.parametrize("row", [
+    {"Profil": "jours_semaine", "Lun": -1.0, "Mar": 1, "Mer": 1, "Jeu": 1, "Ven": 1},
+    {"Profil": "jours_semaine", "Lun": 0, "Mar": 0, "Mer": 0, "Jeu": 0, "Ven": 0},
+    {"Profil": "fin_de_mois", "Rampe": -1.0},
+    {"Profil": "fin_de_mois", "Rampe": -3.0},
+])
+def test_parse_config_invalid_weights_fall_back_to_uniform(row):
+    config, findings = phasing.parse_config(pd.DataFrame([dict(row, Annee=2025)]))
+    assert config[2025] == phasing.year_profile("uniforme")
+    assert findings[0]["check"] == "phasage_invalide"
+
+    daily, _, bounds, working = _phase(config)
+    np.testing.assert_allclose(np.add.reduceat(daily, bounds[:-1]), BUDGETS)
+    assert (daily >= 0).all()
+
+
+def test_parse_config_accepts_decreasing_ramp():
+    config, findings = phasing.parse_config(pd.DataFrame({"Annee": [2025], "Profil": ["fin_de_mois"],
+                                                          "Rampe": [-0.5]}))
+    assert config[2025]["ramp"] == -0.5
+    assert findings == []
+    daily, _, _, _ = _phase(config)
+    assert (daily >= 0).all()
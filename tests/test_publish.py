@@ -0,0 +1,74 @@
+import os
+import json
+
+import pytest
+
+import publish
+import spa_cache
+
+
+def _build(payload, shell="<html></html>"):
+    sections = spa_cache.split_payload(payload)
+    manifest = spa_cache.build_manifest(sections, "01/03/2025")
+    manifest["shell"] = spa_cache.shell_version(shell)
+    manifest["content"] = spa_cache.content_hash(manifest)
+    return shell, sections, manifest
+
+
+def _mtimes(out_dir):
+    """Date de modification de chaque fichier publié (chemin relatif -> mtime_ns)."""
+    result = {}
+    for root, _, files in os.walk(out_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            result[os.path.relpath(path, out_dir)] = os.stat(path).st_mtime_ns
+    return result
+
+
+def _age(out_dir):
+    """Recule la date de tous les fichiers : une réécriture devient visible."""
+    for rel in _mtimes(out_dir):
+        os.utime(os.path.join(out_dir, rel), ns=(1, 1))
+
+
+@pytest.fixture
+def payload():
+    return {"DB_DATA": {"2024": {"1": 10}, "2025": {"1": 20}}, "DB_META": {"a": 1}}
+
+
+def test_unchanged_content_writes_nothing(tmp_path, payload):
+    out = str(tmp_path)
+    assert publish.publish(*_build(payload), out_dir=out)
+    _age(out)
+    before = _mtimes(out)
+
+    assert not publish.publish(*_build(payload), out_dir=out)
+    assert _mtimes(out) == before
+
+
+def test_only_changed_sections_are_rewritten(tmp_path, payload):
+    out = str(tmp_path)
+    publish.publish(*_build(payload), out_dir=out)
+    _age(out)
+
+    payload["DB_DATA"]["2025"] = {"1": 25}
+    assert publish.publish(*_build(payload), out_dir=out)
+    after = _mtimes(out)
+    rewritten = {rel for rel, mtime in after.items() if mtime != 1}
+    assert spa_cache.section_file("DB_DATA.2025") in rewritten
+    assert spa_cache.section_file("DB_DATA.2024") not in rewritten
+    assert spa_cache.section_file("DB_META") not in rewritten
+
+    history = json.load(open(os.path.join(out, publish.HISTORY_FILE), encoding="utf-8"))
+    assert [v["sections_written"] for v in history["versions"]] == [1, 3]
+    assert "last_check" not in history
+
+
+def test_removed_sections_are_pruned(tmp_path, payload):
+    out = str(tmp_path)
+    publish.publish(*_build(payload), out_dir=out)
+
+    del payload["DB_DATA"]["2024"]
+    publish.publish(*_build(payload), out_dir=out)
+    files = sorted(os.listdir(os.path.join(out, spa_cache.DATA_DIR)))
+    assert files == ["DB_DATA.2025.json", "DB_META.json"]
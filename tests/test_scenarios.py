@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+import scenarios
+
+
+def _sheet(rows):
+    return pd.DataFrame(rows)
+
+
+BUDGET = _sheet([[1, 2025, "Janvier", 100.0], [2, 2025, "Février", 110.0]])
+
+
+def test_only_prefixed_sheets_are_scenarios():
+    sheets = {
+        "Budget": BUDGET,
+        "Scénario Révisé": _sheet([[1, 2025, "Janvier", 90.0]]),
+        "Calculs": _sheet([[1, 2, 3, 4]]),
+        "Phasage": _sheet([["Annee", "Profil"], [2025, "uniforme"]]),
+    }
+    names = [name for name, _ in scenarios.split_sheets(sheets)]
+    assert names == ["Budget", "Révisé"]
+
+
+def test_fifth_column_names_scenarios():
+    first = _sheet([[1, 2025, "Janvier", 100.0, None], [1, 2025, "Janvier", 95.0, "Prévision"]])
+    split = scenarios.split_sheets({"Budget": first})
+    assert [name for name, _ in split] == ["Budget", "Prévision"]
+    assert split[1][1]["Budget"].tolist() == [95.0]
+
+
+def test_key_collision_is_rejected():
+    sheets = {
+        "Budget": _sheet([[1, 2025, "Janvier", 100.0, "Révisé"]]),
+        "Scénario revise": _sheet([[1, 2025, "Janvier", 90.0]]),
+    }
+    with pytest.raises(ValueError, match="revise"):
+        scenarios.split_sheets(sheets)
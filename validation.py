@@ -0,0 +1,234 @@
+"""
+Contrôles de qualité des données après chargement.
+
+Chaque source est nettoyée et contrôlée en un seul passage vectorisé ; les
+anomalies sont remontées sous forme de constats structurés (affichés dans le
+panneau "Qualité des données" du dashboard) au lieu d'être ignorées en silence.
+
+Constat : {"source", "check", "severity", "count", "message", "examples"}
+severity : "error" (lignes écartées), "warning" (à vérifier), "info"
+"""
+import html
+
+import numpy as np
+import pandas as pd
+
+import metrics
+import feries
+from common import finding, MAX_EXAMPLES
+
+ZSCORE_THRESHOLD = 3.0
+AMOUNT_COLUMNS = metrics.metric_columns()
+
+SEVERITY_ORDER = {"error": 0, "warning": 1, "info": 2}
+
+
+def _fmt_date(ts):
+    return ts.strftime("%d/%m/%Y")
+
+
+def _excel_row(idx):
+    # Ligne Excel = index pandas + 2 (en-tête + base 1)
+    return int(idx) + 2
+
+
+# ---------------------------------------------------------
+# RESULTATS
+# ---------------------------------------------------------
+def prepare_results(df_raw, feries_overrides=None):
+    """
+    Convertit dates et montants de resultat.xls et contrôle en un seul passage :
+    dates invalides, montants non numériques ou négatifs, doublons de jour,
+    saisies un week-end / jour férié, valeurs aberrantes par jour de semaine.
+    Retourne (df nettoyé, constats).
+    """
+    findings = []
+    if df_raw.empty:
+        return df_raw, findings
+
+    df = df_raw.copy()
+    raw_dates = df["datj"]
+    df["datj"] = pd.to_datetime(raw_dates, errors="coerce")
+    amounts = df[AMOUNT_COLUMNS].apply(pd.to_numeric, errors="coerce")
+
+    # 1. Dates invalides (lignes écartées)
+    bad_dates = df["datj"].isna()
+    if bad_dates.any():
+        examples = [f"ligne {_excel_row(i)} : {raw_dates[i]!r}" for i in df.index[bad_dates][:MAX_EXAMPLES]]
+        findings.append(finding("Résultats", "dates_invalides", "error", bad_dates.sum(),
+                                "Lignes écartées : date absente ou illisible", examples))
+
+    # 2. Montants non numériques (remplacés par 0)
+    bad_amounts = amounts.isna() & df[AMOUNT_COLUMNS].notna()
+    bad_rows = bad_amounts.any(axis=1) & ~bad_dates
+    if bad_rows.any():
+        examples = []
+        for i in df.index[bad_rows][:MAX_EXAMPLES]:
+            cols = [c for c in AMOUNT_COLUMNS if bad_amounts.at[i, c]]
+            examples.append(f"ligne {_excel_row(i)} : " + ", ".join(f"{c}={df.at[i, c]!r}" for c in cols))
+        findings.append(finding("Résultats", "montants_invalides", "error", bad_rows.sum(),
+                                "Montants non numériques comptés à 0", examples))
+
+    df[AMOUNT_COLUMNS] = amounts.fillna(0.0)
+    df = df.loc[~bad_dates]
+    if df.empty:
+        return df, findings
+
+    dates = df["datj"]
+    values = df[AMOUNT_COLUMNS]
+    weekday = dates.dt.weekday
+    has_amount = (values != 0).any(axis=1)
+
+    # 3. Montants négatifs
+    negative = (values < 0).any(axis=1)
+    if negative.any():
+        examples = [f"{_fmt_date(dates[i])} : " + ", ".join(f"{c}={values.at[i, c]:,.2f}" for c in AMOUNT_COLUMNS if values.at[i, c] < 0)
+                    for i in df.index[negative][:MAX_EXAMPLES]]
+        findings.append(finding("Résultats", "montants_negatifs", "warning", negative.sum(),
+                                "Montants négatifs (avoirs, corrections ?) intégrés aux cumuls", examples))
+
+    # 4. Doublons de jour (les montants sont additionnés)
+    duplicated = dates.duplicated(keep=False)
+    if duplicated.any():
+        dup_days = dates[duplicated].drop_duplicates()
+        findings.append(finding("Résultats", "doublons_jour", "warning", len(dup_days),
+                                "Jours présents sur plusieurs lignes (montants additionnés)",
+                                [_fmt_date(d) for d in dup_days[:MAX_EXAMPLES]]))
+
+    # 5. Activité un week-end ou un jour férié (calendrier calculé des années présentes)
+    holidays = feries.holiday_index(dates.dt.year.dropna().unique(), feries_overrides)
+    is_ferie = dates.dt.normalize().isin(holidays)
+    off_day = has_amount & (feries.is_rest_day(weekday, feries_overrides) | is_ferie)
+    if off_day.any():
+        examples = [f"{_fmt_date(dates[i])} ({'férié' if is_ferie[i] else 'week-end'})" for i in df.index[off_day][:MAX_EXAMPLES]]
+        findings.append(finding("Résultats", "jour_non_ouvre", "info", off_day.sum(),
+                                "Montants saisis un jour non ouvré (rattachés au mois mais hors budget)", examples))
+
+    # 6. Valeurs aberrantes : z-score par jour de semaine, jours avec activité uniquement
+    active = values.where(values != 0)
+    grouped = active.groupby(weekday)
+    mean = grouped.transform("mean")
+    std = grouped.transform("std").replace(0, np.nan)
+    zscores = (active - mean) / std
+    outliers = zscores.abs() > ZSCORE_THRESHOLD
+    outlier_rows = outliers.any(axis=1)
+    if outlier_rows.any():
+        examples = []
+        for i in df.index[outlier_rows][:MAX_EXAMPLES]:
+            cols = [c for c in AMOUNT_COLUMNS if outliers.at[i, c]]
+            examples.append(f"{_fmt_date(dates[i])} : " + ", ".join(f"{c}={values.at[i, c]:,.0f} (z={zscores.at[i, c]:.1f})" for c in cols))
+        findings.append(finding("Résultats", "valeurs_aberrantes", "warning", outlier_rows.sum(),
+                                f"Montants à plus de {ZSCORE_THRESHOLD:g} écarts-types de la moyenne du même jour de semaine", examples))
+
+    return df, findings
+
+
+# ---------------------------------------------------------
+# BUDGET
+# ---------------------------------------------------------
+def prepare_budget(df_raw, source="Budget"):
+    """
+    Convertit les colonnes MoisNum / Annee / Budget et écarte les lignes
+    inexploitables (une éventuelle ligne d'en-tête en tête de fichier est ignorée).
+    Retourne (df nettoyé, constats).
+    """
+    findings = []
+    if df_raw.empty:
+        return df_raw, findings
+
+    num = df_raw[["MoisNum", "Annee", "Budget"]].apply(pd.to_numeric, errors="coerce")
+    valid = num.notna().all(axis=1) & num["MoisNum"].between(1, 12)
+    header = num.isna().all(axis=1) & (df_raw.index == df_raw.index[0])
+    invalid = ~valid & ~header
+
+    if invalid.any():
+        examples = [f"ligne {int(i) + 1} : " + ", ".join(str(v) for v in df_raw.loc[i].tolist()) for i in df_raw.index[invalid][:MAX_EXAMPLES]]
+        findings.append(finding(source, "lignes_invalides", "error", invalid.sum(),
+                                "Lignes écartées : mois, année ou montant illisible", examples))
+
+    df = df_raw.loc[valid].copy()
+    df["MoisNum"] = num.loc[valid, "MoisNum"].astype(int)
+    df["Annee"] = num.loc[valid, "Annee"].astype(int)
+    df["Budget"] = num.loc[valid, "Budget"].astype(float)
+
+    duplicated = df.duplicated(subset=["Annee", "MoisNum"], keep="first")
+    if duplicated.any():
+        findings.append(finding(source, "doublons_mois", "warning", duplicated.sum(),
+                                "Mois budgétés plusieurs fois (seule la première ligne est retenue)",
+                                [f"{m:02d}/{y}" for y, m in zip(df.loc[duplicated, "Annee"], df.loc[duplicated, "MoisNum"])]))
+        df = df.loc[~duplicated]
+
+    return df, findings
+
+
+# ---------------------------------------------------------
+# COUVERTURE BUDGET / RESULTATS
+# ---------------------------------------------------------
+def check_coverage(df_budget, df_res):
+    """Mois avec résultats mais sans budget, et mois écoulés budgétés mais sans résultats."""
+    findings = []
+    budget_periods = set()
+    if not df_budget.empty:
+        budget_periods = set(zip(df_budget["Annee"], df_budget["MoisNum"]))
+    result_periods = set()
+    if not df_res.empty:
+        result_periods = set(zip(df_res["datj"].dt.year, df_res["datj"].dt.month))
+
+    if not budget_periods or not result_periods:
+        return findings
+
+    no_budget = sorted(result_periods - budget_periods)
+    if no_budget:
+        findings.append(finding("Budget", "mois_sans_budget", "warning", len(no_budget),
+                                "Mois avec résultats mais sans budget (taux de réalisation à 0)",
+                                [f"{m:02d}/{y}" for y, m in no_budget]))
+
+    # Les mois futurs budgétés n'ont naturellement pas encore de résultats
+    last_period = max(result_periods)
+    no_results = sorted(p for p in budget_periods - result_periods if p <= last_period)
+    if no_results:
+        findings.append(finding("Résultats", "mois_sans_resultats", "warning", len(no_results),
+                                "Mois écoulés budgétés mais sans aucun résultat",
+                                [f"{m:02d}/{y}" for y, m in no_results]))
+    return findings
+
+
+# ---------------------------------------------------------
+# RESTITUTION
+# ---------------------------------------------------------
+def print_report(findings):
+    if not findings:
+        print("Qualité des données : aucun problème détecté")
+        return
+    print(f"Qualité des données : {len(findings)} constat(s)")
+    for f in sorted(findings, key=lambda f: SEVERITY_ORDER[f["severity"]]):
+        print(f"  [{f['severity'].upper()}] {f['source']} - {f['message']} : {f['count']}")
+        for ex in f["examples"]:
+            print(f"      {ex}")
+
+
+def render_html(findings):
+    """Panneau HTML "Qualité des données" pour la page d'accueil du dashboard."""
+    colors = {"error": "#e74c3c", "warning": "#f39c12", "info": "#3498db"}
+    labels = {"error": "Erreur", "warning": "Alerte", "info": "Info"}
+
+    if not findings:
+        return '<div class="quality-panel quality-ok">✔ Qualité des données : aucun problème détecté</div>'
+
+    counts = {s: sum(1 for f in findings if f["severity"] == s) for s in SEVERITY_ORDER}
+    summary = " • ".join(f"{counts[s]} {labels[s].lower()}(s)" for s in SEVERITY_ORDER if counts[s])
+    rows = []
+    for f in sorted(findings, key=lambda f: SEVERITY_ORDER[f["severity"]]):
+        examples = "<br>".join(html.escape(ex) for ex in f["examples"])
+        rows.append(
+            f'<tr><td><span class="quality-badge" style="background:{colors[f["severity"]]}">{labels[f["severity"]]}</span></td>'
+            f'<td>{html.escape(f["source"])}</td><td>{html.escape(f["message"])}</td>'
+            f'<td class="metric-val">{f["count"]}</td><td class="quality-examples">{examples}</td></tr>'
+        )
+    return (
+        '<details class="quality-panel">'
+        f'<summary>Qualité des données : {summary}</summary>'
+        '<table class="quality-table"><thead><tr><th></th><th>Source</th><th>Contrôle</th><th>Nb</th><th>Exemples</th></tr></thead>'
+        f'<tbody>{"".join(rows)}</tbody></table>'
+        '</details>'
+    )